@@ -17,12 +17,34 @@ Features:
     - File metadata collection (size, extension, last modified date)
     - Owner information retrieval
     - Excel output with auto-filter and formatted headers
-    - Error logging for access-denied scenarios
+    - Summary sheet computed during the scan in fixed memory: bytes by
+      extension, age and owner, largest files and folders, explicit versus
+      inherited permission counts
+    - Error logging for access-denied scenarios; access-denied subtrees fail
+      fast (after N denied items in a row, or a denied folder listing) and
+      are listed without permissions or skipped (--on-denied), with one
+      error entry per subtree
     - Progress tracking via console and log file
+    - Record stream (iter_audit_records) shared with the SharePoint upload
+      pipeline (sp_upload.py --scan)
+    - Compact inventory store (--inventory): typed arrays, interned folder
+      paths, extensions and ACLs (about 60 bytes per item), saved to disk and
+      memory-mapped for later processing or report export (--from-inventory)
+    - Sampling mode (--sample): estimates file count, bytes, extension mix
+      and the share of explicit permissions with 95% confidence intervals
+      from a randomized partial traversal, within a time budget
+    - Scan catalog (--catalog): SQLite database holding many scans, with
+      folders, accounts and ACLs stored once and indexed by path, owner,
+      extension and size; the query subcommand answers questions such as
+      "files under X with explicit permissions owned by Y" or "growth of X
+      between scans" and exports the matches as upload manifests
 
 Output:
     - Excel file (.xlsx) with file/folder listing and permissions
     - Log file with detailed scan progress and errors
+    - Inventory folder (with --inventory) for in-process processing of the scan
+    - FileAudit_Sample_*.xlsx (with --sample) with estimates and intervals
+    - SQLite catalog (with --catalog) for the query subcommand
 
 Requirements:
     pip install openpyxl pywin32
@@ -33,6 +55,12 @@ Usage:
     python file_server_audit.py "D:\\Data" -x "*\\Archive" -x "*\\Backup"
     python file_server_audit.py "D:\\Data" --exclude-file exclusions.txt
     python file_server_audit.py "D:\\Data" -x "*\\Temp" -e exclusions.txt
+    python file_server_audit.py "D:\\Data" --inventory
+    python file_server_audit.py --from-inventory output\\inventory_D_Data_20250101_120000
+    python file_server_audit.py "\\\\server\\share" --sample --time-budget 5
+    python file_server_audit.py "D:\\Data" --catalog catalog.db
+    python file_server_audit.py query catalog.db --under "D:\\Data\\HR" --explicit --owner "CONTOSO\\jdoe"
+    python file_server_audit.py query catalog.db --under "D:\\Data\\HR" --manifest hr.xlsx --target-folder HR
 
 Exclusion Options:
     -x, --exclude       Exclude a folder path pattern (can be used multiple times)
@@ -68,9 +96,18 @@ is strictly prohibited without prior written permission from the author.
 
 import os
 import sys
+import csv
+import json
+import mmap
+import sqlite3
 import argparse
 import logging
 import fnmatch
+import heapq
+import math
+import random
+import time
+from array import array
 from datetime import datetime
 from pathlib import Path
 
@@ -79,8 +116,9 @@ try:
     import win32api
     import ntsecuritycon as con
 except ImportError:
-    print("ERROR: pywin32 is not installed. Please run: pip install pywin32")
-    sys.exit(1)
+    # Only needed for permissions; the record stream can be consumed without it
+    # (see iter_audit_records). main() still requires it.
+    win32security = None
 
 try:
     from openpyxl import Workbook
@@ -92,7 +130,7 @@ except ImportError:
 
 
 # Permission mapping for common access rights
-PERMISSION_FLAGS = {
+PERMISSION_FLAGS = {} if win32security is None else {
     con.FILE_READ_DATA: "Read",
     con.FILE_WRITE_DATA: "Write",
     con.FILE_APPEND_DATA: "Append",
@@ -110,13 +148,93 @@ PERMISSION_FLAGS = {
 }
 
 # Common permission combinations
-GENERIC_PERMISSIONS = {
+GENERIC_PERMISSIONS = {} if win32security is None else {
     con.FILE_ALL_ACCESS: "FullControl",
     con.FILE_GENERIC_READ: "Read",
     con.FILE_GENERIC_WRITE: "Write",
     con.FILE_GENERIC_EXECUTE: "Execute",
 }
 
+# Compact inventory store (see InventoryStore)
+ITEM_TYPES = ["Folder", "File"]  # Item type code -> record type
+INVENTORY_COLUMNS = [  # (column, array typecode) - one value per folder or file
+    ('parent', 'i'),     # Folder ID of the containing folder
+    ('name_end', 'q'),   # End offset of the name in the name heap
+    ('item_type', 'b'),  # Index into ITEM_TYPES
+    ('size', 'q'),
+    ('modified', 'q'),   # Epoch seconds, -1 if unknown
+    ('extension', 'i'),  # Extension ID
+    ('acl', 'i'),        # ACL ID (owner and permissions)
+]
+FOLDER_COLUMNS = [  # (column, array typecode) - one value per folder
+    ('folder_parent', 'i'),  # Parent folder ID, -1 for a scan parent (stored as a full path)
+    ('folder_item', 'q'),    # Item index of the folder itself, -1 for a scan parent
+]
+INVENTORY_PATH_CACHE_SIZE = 100000  # Folder paths kept while exporting
+
+# Report columns (record fields, in sheet column order)
+REPORT_DATA_FIELDS = ['folder_path', 'name', 'record_type', 'extension', 'size',
+                      'size_formatted', 'modified', 'owner', 'permissions']
+REPORT_ERROR_FIELDS = ['path', 'error_type', 'error_message', 'timestamp']
+
+# Access-denied subtrees (see iter_audit_records)
+ERROR_ACCESS_DENIED = 5  # Windows error code
+DENIED_THRESHOLD = 20  # Access-denied items in a row that mark a folder as denied
+DENIED_MODES = ['inventory', 'skip']  # Denied subtree: list without permissions, or skip
+
+# Summary sheet (streaming analytics, fixed memory)
+SUMMARY_TOP_N = 25  # Largest files and folders listed
+SUMMARY_MAX_GROUPS = 1000  # Distinct extensions / owners counted; the rest go to "(other)"
+AGE_BUCKETS = [  # (maximum age in days, label); files older than the last go to the last label
+    (365, "< 1 year"),
+    (3 * 365, "1-3 years"),
+    (5 * 365, "3-5 years"),
+    (10 * 365, "5-10 years"),
+    (None, "10+ years"),
+]
+
+# Sampling mode (--sample): repeated random probes, each an unbiased estimate
+SAMPLE_DEFAULT_FRACTION = 0.1  # Share of subfolders descended into at each level (at least one)
+SAMPLE_DEFAULT_MINUTES = 10  # Time budget
+SAMPLE_MAX_PROBES = 10000
+SAMPLE_ACL_FILES_PER_FOLDER = 5  # Files per listed folder whose permissions are read
+SAMPLE_CACHE_FOLDERS = 100000  # Folder listings kept for later probes
+SAMPLE_Z = 1.96  # 95% confidence intervals
+SAMPLE_TOP_EXTENSIONS = 30  # Extensions listed in the sample report
+
+# Scan catalog (--catalog, query subcommand)
+CATALOG_BATCH_ROWS = 10000  # Rows per bulk insert
+CATALOG_COMMIT_ROWS = 500000  # Rows per transaction
+CATALOG_QUERY_LIMIT = 20  # Largest matching files listed by a query
+CATALOG_ANALYSIS_LIMIT = 1000  # Index rows sampled for planner statistics after each scan
+MANIFEST_COLUMNS = ['FileName', 'FilePath', 'TargetFolder']  # Upload manifest (sp_upload.py)
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id INTEGER PRIMARY KEY, root_path TEXT NOT NULL, started TEXT, finished TEXT,
+    folders INTEGER, files INTEGER, errors INTEGER, total_bytes INTEGER);
+CREATE TABLE IF NOT EXISTS folders (
+    folder_id INTEGER PRIMARY KEY, path TEXT NOT NULL, path_key TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS principals (
+    principal_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS acls (
+    acl_id INTEGER PRIMARY KEY, permissions TEXT NOT NULL UNIQUE, explicit INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS acl_entries (
+    acl_id INTEGER NOT NULL REFERENCES acls, principal_id INTEGER NOT NULL REFERENCES principals,
+    access_type TEXT, permission TEXT, inheritance TEXT);
+CREATE TABLE IF NOT EXISTS items (
+    scan_id INTEGER NOT NULL REFERENCES scans, folder_id INTEGER NOT NULL REFERENCES folders,
+    name TEXT NOT NULL, item_type TEXT NOT NULL, extension TEXT, size INTEGER, mtime INTEGER,
+    owner_id INTEGER REFERENCES principals, acl_id INTEGER REFERENCES acls);
+CREATE TABLE IF NOT EXISTS errors (
+    scan_id INTEGER NOT NULL REFERENCES scans, path TEXT, error_type TEXT, error_message TEXT,
+    timestamp TEXT);
+CREATE INDEX IF NOT EXISTS idx_items_folder ON items (scan_id, folder_id);
+CREATE INDEX IF NOT EXISTS idx_items_owner ON items (scan_id, owner_id);
+CREATE INDEX IF NOT EXISTS idx_items_extension ON items (scan_id, extension);
+CREATE INDEX IF NOT EXISTS idx_items_size ON items (scan_id, size);
+CREATE INDEX IF NOT EXISTS idx_acl_entries_principal ON acl_entries (principal_id);
+"""
+
 
 def load_exclusion_patterns(exclude_file, logger):
     """Load exclusion patterns from a text file.
@@ -367,14 +485,16 @@ def get_file_info(path, is_dir):
             'size': size,
             'size_formatted': format_size(size) if not is_dir else "",
             'extension': extension,
-            'modified': modified_time.strftime('%Y-%m-%d %H:%M:%S')
+            'modified': modified_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'mtime': int(stat_info.st_mtime)
         }
     except Exception:
         return {
             'size': 0,
             'size_formatted': "",
             'extension': "",
-            'modified': ""
+            'modified': "",
+            'mtime': None
         }
 
 
@@ -457,27 +577,100 @@ def setup_excel_workbook():
     return wb, ws_data, ws_errors
 
 
-def scan_directory(root_path, wb, ws_data, ws_errors, logger, exclusion_patterns=None):
-    """Scan directory and write results to Excel.
+def get_item_record(folder_path, name, item_type, path, logger, include_permissions=True):
+    """Build the record for one folder or file (raises if permissions cannot be read)."""
+    owner, permissions = "", []
+    if include_permissions:
+        owner, permissions = get_permissions(path, logger)
+    file_info = get_file_info(path, item_type == "Folder")
+
+    return {
+        'record_type': item_type,
+        'folder_path': folder_path,
+        'name': name,
+        'extension': file_info['extension'],
+        'size': file_info['size'],
+        'size_formatted': file_info['size_formatted'],
+        'modified': file_info['modified'],
+        'mtime': file_info['mtime'],
+        'owner': owner,
+        'permissions': format_permissions(permissions)
+    }
+
+
+def get_error_record(path, error):
+    """Build the record for a path that could not be read."""
+    return {
+        'record_type': "Error",
+        'path': path,
+        'error_type': type(error).__name__,
+        'error_message': str(error),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def is_access_denied(error):
+    """True for an access-denied failure (PermissionError, or Windows error 5 from pywin32)."""
+    return isinstance(error, PermissionError) or getattr(error, 'winerror', None) == ERROR_ACCESS_DENIED
+
+
+def get_denied_subtree_record(subtree):
+    """Build the one error record that stands for an access-denied subtree."""
+    if subtree['mode'] == 'listing':
+        message = "Folder listing denied; contents not scanned"
+    else:
+        action = ("scanned without owner and permissions" if subtree['mode'] == 'inventory'
+                  else "skipped")
+        message = (f"Access denied on {subtree['consecutive']} items in a row; subtree {action}: "
+                   f"{subtree['items']:,} items listed without permissions, "
+                   f"{subtree['skipped']:,} items skipped, "
+                   f"{subtree['unlisted']:,} folders could not be listed")
+    return {
+        'record_type': "Error",
+        'path': subtree['path'],
+        'error_type': "AccessDeniedSubtree",
+        'error_message': message,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def iter_audit_records(root_path, logger, exclusion_patterns=None, stats=None,
+                       include_permissions=True, denied_threshold=DENIED_THRESHOLD,
+                       denied_mode=DENIED_MODES[0]):
+    """Scan a directory tree and yield one record per folder, file or error.
+
+    Records are plain dicts (see get_item_record and get_error_record) yielded
+    while the walk is in progress, so consumers such as the Excel writer or
+    the SharePoint upload pipeline can start before the scan finishes.
+
+    Access-denied subtrees fail fast: once denied_threshold items in a row
+    of one folder are denied, that folder and everything below it are
+    either listed without owner and permissions ('inventory', one cheap
+    stat per item) or skipped ('skip'). A folder whose listing is denied is
+    reported instead of being passed over silently by os.walk. Either way
+    the subtree gets a single error record (see get_denied_subtree_record)
+    with item counts, emitted once the walk has left it, rather than one
+    error per item.
 
     Args:
         root_path: Root directory to scan
-        wb: Excel workbook
-        ws_data: Data worksheet
-        ws_errors: Errors worksheet
         logger: Logger instance
         exclusion_patterns: List of patterns to exclude (optional)
+        stats: Dict updated in place with folders/files/errors/excluded/denied_subtrees counts
+        include_permissions: Read owner and NTFS permissions (needs pywin32)
+        denied_threshold: Consecutive access-denied items that mark a folder as denied
+        denied_mode: 'inventory' or 'skip' (see DENIED_MODES)
     """
     if exclusion_patterns is None:
         exclusion_patterns = []
+    if stats is None:
+        stats = {}
+    for key in ('folders', 'files', 'errors', 'excluded', 'denied_subtrees'):
+        stats.setdefault(key, 0)
 
-    data_row = 2
-    error_row = 2
-
-    folder_count = 0
-    file_count = 0
-    error_count = 0
-    excluded_count = 0
+    def progress():
+        return (f"Progress: {stats['folders']} folders, {stats['files']} files scanned, "
+                f"{stats['excluded']} excluded...")
 
     logger.info(f"Starting scan of: {root_path}")
     if exclusion_patterns:
@@ -486,117 +679,1246 @@ def scan_directory(root_path, wb, ws_data, ws_errors, logger, exclusion_patterns
 
     # First, process the root folder itself
     try:
-        owner, permissions = get_permissions(root_path, logger)
-        file_info = get_file_info(root_path, True)
-
         # For root folder, show its parent directory as the folder path
         root_parent = os.path.dirname(root_path) or root_path
-        ws_data.cell(row=data_row, column=1, value=root_parent)
-        ws_data.cell(row=data_row, column=2, value=os.path.basename(root_path) or root_path)
-        ws_data.cell(row=data_row, column=3, value="Folder")
-        ws_data.cell(row=data_row, column=4, value="")
-        ws_data.cell(row=data_row, column=5, value=0)
-        ws_data.cell(row=data_row, column=6, value="")
-        ws_data.cell(row=data_row, column=7, value=file_info['modified'])
-        ws_data.cell(row=data_row, column=8, value=owner)
-        ws_data.cell(row=data_row, column=9, value=format_permissions(permissions))
-
-        data_row += 1
-        folder_count += 1
+        record = get_item_record(root_parent, os.path.basename(root_path) or root_path, "Folder",
+                                 root_path, logger, include_permissions)
+        stats['folders'] += 1
+        yield record
 
     except Exception as e:
-        ws_errors.cell(row=error_row, column=1, value=root_path)
-        ws_errors.cell(row=error_row, column=2, value=type(e).__name__)
-        ws_errors.cell(row=error_row, column=3, value=str(e))
-        ws_errors.cell(row=error_row, column=4, value=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        error_row += 1
-        error_count += 1
+        stats['errors'] += 1
         logger.warning(f"Error accessing root path: {str(e)}")
+        yield get_error_record(root_path, e)
+
+    # Folders os.walk could not list (reported through onerror instead of raised)
+    unlisted = []
+    # The denied subtree being walked: os.walk is top-down and depth-first, so
+    # a subtree is finished as soon as the walk reaches a folder outside it
+    denied = None
+
+    def in_subtree(path, subtree):
+        return path == subtree['path'] or path.startswith(subtree['path'].rstrip(os.sep) + os.sep)
+
+    def close_denied():
+        nonlocal denied
+        record, denied = get_denied_subtree_record(denied), None
+        stats['errors'] += 1
+        stats['denied_subtrees'] += 1
+        logger.warning(f"{record['path']}: {record['error_message']}")
+        return record
+
+    def drain_unlisted():
+        nonlocal denied
+        for path, error in unlisted:
+            if denied is not None and in_subtree(path, denied):
+                denied['unlisted'] += 1
+                continue
+            if denied is not None:
+                yield close_denied()
+            if path == root_path:
+                stats['errors'] += 1
+                logger.warning(f"Error listing root path: {str(error)}")
+                yield get_error_record(path, error)
+            else:
+                denied = {'path': path, 'mode': 'listing'}
+                yield close_denied()
+        unlisted.clear()
 
     # Walk through directory tree
-    for current_dir, subdirs, files in os.walk(root_path):
+    for current_dir, subdirs, files in os.walk(root_path, onerror=lambda e: unlisted.append((e.filename, e))):
+        yield from drain_unlisted()
+        if denied is not None and not in_subtree(current_dir, denied):
+            yield close_denied()
+
         # Filter out excluded subdirectories (modifying subdirs in-place skips them in os.walk)
-        excluded_subdirs = []
         for subdir in subdirs[:]:  # Use slice copy to allow modification during iteration
             folder_path = os.path.join(current_dir, subdir)
             if is_path_excluded(folder_path, exclusion_patterns):
                 subdirs.remove(subdir)  # This prevents os.walk from descending into this folder
-                excluded_subdirs.append(subdir)
-                excluded_count += 1
+                stats['excluded'] += 1
                 logger.info(f"Excluded folder: {folder_path}")
 
-        # Process non-excluded subdirectories
-        for subdir in subdirs:
-            folder_path = os.path.join(current_dir, subdir)
-            folder_count += 1
+        # Access-denied items of this folder in a row, held back until the run is
+        # either broken (reported one by one) or long enough to deny the folder
+        held = []
+        items = [(subdir, "Folder") for subdir in subdirs] + [(filename, "File") for filename in files]
+        for index, (name, item_type) in enumerate(items):
+            if denied is not None and denied['mode'] == 'skip':
+                # Denied in this folder: skip the rest of it and everything below it
+                denied['skipped'] += len(items) - index
+                break
+
+            item_path = os.path.join(current_dir, name)
+            if item_type == "Folder":
+                stats['folders'] += 1
+                if stats['folders'] % 100 == 0:
+                    logger.info(progress())
+            else:
+                stats['files'] += 1
+                if stats['files'] % 500 == 0:
+                    logger.info(progress())
+
+            # Folder path is the containing directory (current_dir)
+            read_permissions = include_permissions and denied is None
+            try:
+                record = get_item_record(current_dir, name, item_type, item_path, logger, read_permissions)
+            except Exception as e:
+                logger.debug(f"Error on {item_type.lower()} {item_path}: {str(e)}")
+                if not is_access_denied(e):
+                    stats['errors'] += 1
+                    yield get_error_record(item_path, e)
+                    continue
+                held.append((name, item_type, item_path, e))
+                if len(held) < denied_threshold:
+                    continue
+                # Denied folder: fold the held failures into one subtree entry
+                denied = {'path': current_dir, 'mode': denied_mode, 'consecutive': len(held),
+                          'items': 0, 'skipped': 0, 'unlisted': 0}
+                logger.info(f"Access denied on {len(held)} items in a row, "
+                            f"{'listing without permissions' if denied_mode == 'inventory' else 'skipping'}: "
+                            f"{current_dir}")
+                if denied_mode == 'inventory':
+                    for held_name, held_type, held_path, _ in held:
+                        denied['items'] += 1
+                        yield get_item_record(current_dir, held_name, held_type, held_path, logger, False)
+                else:
+                    denied['skipped'] += len(held)
+                    subdirs[:] = []
+                held = []
+                continue
+
+            for held_name, held_type, held_path, error in held:
+                stats['errors'] += 1
+                yield get_error_record(held_path, error)
+            held = []
+            if denied is not None:
+                denied['items'] += 1
+            yield record
+
+        for held_name, held_type, held_path, error in held:
+            stats['errors'] += 1
+            yield get_error_record(held_path, error)
+
+    yield from drain_unlisted()
+    if denied is not None:
+        yield close_denied()
+
+
+class InventoryStore:
+    """Compact in-memory inventory of scan records, for processing a scan in-process.
+
+    Instead of one dict of strings per item, each field is held in a typed
+    array (see INVENTORY_COLUMNS), about 60 bytes per item, so 10 million
+    items fit in well under 1 GB:
+
+        - Folder paths are interned as folder IDs in a parent-pointer table;
+          a path is rebuilt from the folder names only when it is needed
+        - Names are kept UTF-8 encoded in one shared heap
+        - Extensions and ACLs (owner and permissions, mostly inherited and
+          repeated) are stored once and referenced by ID
+        - Error records (few) are kept as they are
+
+    An inventory can be saved to a folder (one file per column) and opened
+    again memory-mapped, read-only, so it can be larger than memory.
+    Records are rebuilt in the audit record format (iter_records), for export
+    to the Excel report.
+    """
 
-            if folder_count % 100 == 0:
-                logger.info(f"Progress: {folder_count} folders, {file_count} files scanned, {excluded_count} excluded...")
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode in INVENTORY_COLUMNS}
+        self.folders = {name: array(typecode) for name, typecode in FOLDER_COLUMNS}
+        self.names = bytearray()
+        self.scan_parents = {}  # Folder ID -> full path, for folders whose parent was not scanned
+        self.extensions = [""]
+        self.acls = [("", "")]
+        self.errors = []
+        self.info = {}  # Saved with the inventory, e.g. root path and scan time
+        self._extension_ids = {"": 0}
+        self._acl_ids = {("", ""): 0}
+        self._pending_folders = {}  # Path of a folder found but not yet walked -> folder ID
+        self._current_path = None
+        self._current_id = -1
+        self._path_cache = {}
+        self._mapped = []
+
+    def __len__(self):
+        return len(self.columns['parent'])
+
+    @staticmethod
+    def _intern(value, ids, table):
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(table)
+            table.append(value)
+        return value_id
+
+    def _add_folder(self, parent_id, item_index):
+        self.folders['folder_parent'].append(parent_id)
+        self.folders['folder_item'].append(item_index)
+        return len(self.folders['folder_parent']) - 1
+
+    def _folder_id(self, folder_path):
+        """Folder ID for a record's folder path (scan records arrive folder by folder)."""
+        if folder_path == self._current_path:
+            return self._current_id
+        folder_id = self._pending_folders.pop(folder_path, None)
+        if folder_id is None:
+            folder_id = self._add_folder(-1, -1)
+            self.scan_parents[folder_id] = folder_path
+        self._current_path, self._current_id = folder_path, folder_id
+        return folder_id
+
+    def add(self, record):
+        """Add one audit record (see get_item_record and get_error_record)."""
+        if self._mapped:
+            raise ValueError("A memory-mapped inventory is read-only")
+        if record['record_type'] == "Error":
+            self.errors.append(record)
+            return
+
+        columns = self.columns
+        folder_path, name = record['folder_path'], record['name']
+        parent_id = self._folder_id(folder_path)
+        if record['record_type'] == "Folder":
+            self._pending_folders[os.path.join(folder_path, name)] = self._add_folder(parent_id, len(self))
+
+        self.names += name.encode('utf-8', 'surrogatepass')
+        columns['parent'].append(parent_id)
+        columns['name_end'].append(len(self.names))
+        columns['item_type'].append(ITEM_TYPES.index(record['record_type']))
+        columns['size'].append(record['size'] or 0)
+        mtime = record.get('mtime')
+        columns['modified'].append(-1 if mtime is None else mtime)
+        columns['extension'].append(self._intern(record['extension'], self._extension_ids,
+                                                 self.extensions))
+        columns['acl'].append(self._intern((record['owner'], record['permissions']),
+                                           self._acl_ids, self.acls))
+
+    def name(self, index):
+        end = self.columns['name_end'][index]
+        start = self.columns['name_end'][index - 1] if index else 0
+        return bytes(self.names[start:end]).decode('utf-8', 'surrogatepass')
+
+    def folder_path(self, folder_id):
+        """Full path of a folder, rebuilt from the parent-pointer table."""
+        path = self._path_cache.get(folder_id)
+        if path is None:
+            if folder_id in self.scan_parents:
+                path = self.scan_parents[folder_id]
+            else:
+                path = os.path.join(self.folder_path(self.folders['folder_parent'][folder_id]),
+                                    self.name(self.folders['folder_item'][folder_id]))
+            if len(self._path_cache) >= INVENTORY_PATH_CACHE_SIZE:
+                self._path_cache.clear()
+            self._path_cache[folder_id] = path
+        return path
+
+    def folder_sizes(self):
+        """Total file bytes below each folder (array indexed by folder ID).
+
+        Folders are numbered as they are found, parents before children, so
+        one pass over the files and one reverse pass over the folders add up
+        the whole tree.
+        """
+        totals = array('q', bytes(8 * len(self.folders['folder_parent'])))
+        columns = self.columns
+        for parent, item_type, size in zip(columns['parent'], columns['item_type'], columns['size']):
+            if item_type:
+                totals[parent] += size
+        folder_parent = self.folders['folder_parent']
+        for folder_id in range(len(totals) - 1, -1, -1):
+            if folder_parent[folder_id] >= 0:
+                totals[folder_parent[folder_id]] += totals[folder_id]
+        return totals
+
+    def iter_records(self):
+        """Yield the stored items, then the errors, as audit records."""
+        columns = self.columns
+        for index, (parent, item_type, size, modified, extension, acl) in enumerate(zip(
+                columns['parent'], columns['item_type'], columns['size'], columns['modified'],
+                columns['extension'], columns['acl'])):
+            is_folder = item_type == 0
+            owner, permissions = self.acls[acl]
+            yield {
+                'record_type': ITEM_TYPES[item_type],
+                'folder_path': self.folder_path(parent),
+                'name': self.name(index),
+                'extension': self.extensions[extension],
+                'size': size,
+                'size_formatted': "" if is_folder else format_size(size),
+                'modified': datetime.fromtimestamp(modified).strftime('%Y-%m-%d %H:%M:%S')
+                if modified >= 0 else "",
+                'mtime': modified if modified >= 0 else None,
+                'owner': owner,
+                'permissions': permissions
+            }
+        yield from self.errors
+
+    def memory_bytes(self):
+        """Approximate memory held by the columns, names and lookup tables."""
+        total = len(self.names)
+        for column in list(self.columns.values()) + list(self.folders.values()):
+            total += len(column) * column.itemsize
+        total += sum(len(extension) for extension in self.extensions)
+        total += sum(len(owner) + len(permissions) for owner, permissions in self.acls)
+        return total
+
+    def save(self, inventory_dir):
+        """Write the inventory to a folder: one binary file per column, plus tables."""
+        inventory_dir = Path(inventory_dir)
+        inventory_dir.mkdir(parents=True, exist_ok=True)
+        for name, column in list(self.columns.items()) + list(self.folders.items()):
+            with open(inventory_dir / f"{name}.bin", 'wb') as f:
+                f.write(column)
+        with open(inventory_dir / "names.bin", 'wb') as f:
+            f.write(self.names)
+        with open(inventory_dir / "tables.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'info': self.info,
+                'items': len(self),
+                'scan_parents': {str(folder_id): path for folder_id, path in self.scan_parents.items()},
+                'extensions': self.extensions,
+                'acls': self.acls,
+                'errors': self.errors,
+            }, f, ensure_ascii=False)
+        return inventory_dir
+
+    @classmethod
+    def open(cls, inventory_dir):
+        """Open a saved inventory, memory-mapped and read-only."""
+        inventory_dir = Path(inventory_dir)
+        with open(inventory_dir / "tables.json", 'r', encoding='utf-8') as f:
+            tables = json.load(f)
+
+        store = cls()
+
+        def load(name, typecode):
+            with open(inventory_dir / f"{name}.bin", 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return array(typecode) if typecode else bytearray()
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            store._mapped.append(mapped)
+            return memoryview(mapped).cast(typecode) if typecode else memoryview(mapped)
+
+        store.columns = {name: load(name, typecode) for name, typecode in INVENTORY_COLUMNS}
+        store.folders = {name: load(name, typecode) for name, typecode in FOLDER_COLUMNS}
+        store.names = load("names", None)
+        store.scan_parents = {int(folder_id): path for folder_id, path in tables['scan_parents'].items()}
+        store.extensions = tables['extensions']
+        store.acls = [tuple(acl) for acl in tables['acls']]
+        store.errors = tables['errors']
+        store.info = tables.get('info', {})
+        return store
+
+
+class AuditSummary:
+    """Migration-planning numbers computed while the records stream past.
+
+    Bytes and file counts by extension, by age (last modified) and by owner,
+    the largest files and folders (bounded heaps of SUMMARY_TOP_N), and the
+    number of items with explicit versus only inherited permissions. Memory
+    does not grow with the item count: groups are capped at
+    SUMMARY_MAX_GROUPS, and folder totals are kept only for the folders on
+    the current walk path (os.walk is depth-first, so a folder's subtree is
+    finished once the walk leaves it).
+    """
 
+    def __init__(self, root_path, now=None):
+        self.root_path = root_path
+        self.now = now or time.time()
+        self.files = 0
+        self.folders = 0
+        self.total_bytes = 0
+        self.extensions = {}  # Extension -> [files, bytes]
+        self.owners = {}  # Owner -> [files, bytes]
+        self.ages = {label: [0, 0] for _, label in AGE_BUCKETS + [(None, "Unknown")]}
+        self.permissions = {"Explicit": 0, "Inherited only": 0, "Not read": 0}
+        self.largest_files = []  # Min-heap of (size, path)
+        self.largest_folders = []  # Min-heap of (total size, path)
+        self._folder_stack = []  # [path, total bytes] from the scan root to the current folder
+
+    @staticmethod
+    def _add_group(groups, key, size):
+        group = groups.get(key)
+        if group is None:
+            key = key if len(groups) < SUMMARY_MAX_GROUPS else "(other)"
+            group = groups.setdefault(key, [0, 0])
+        group[0] += 1
+        group[1] += size
+
+    @staticmethod
+    def _push_top(heap, size, path):
+        if len(heap) < SUMMARY_TOP_N:
+            heapq.heappush(heap, (size, path))
+        elif size > heap[0][0]:
+            heapq.heapreplace(heap, (size, path))
+
+    def _close_folder(self):
+        path, total = self._folder_stack.pop()
+        self._push_top(self.largest_folders, total, path)
+        if self._folder_stack:
+            self._folder_stack[-1][1] += total
+
+    def _enter_folder(self, folder_path):
+        """Make folder_path the current folder, closing folders the walk has left."""
+        stack = self._folder_stack
+        if stack and stack[-1][0] == folder_path:
+            return
+        while stack and not folder_path.startswith(stack[-1][0].rstrip(os.sep) + os.sep):
+            self._close_folder()
+        if folder_path == self.root_path or folder_path.startswith(self.root_path.rstrip(os.sep) + os.sep):
+            stack.append([folder_path, 0])
+
+    def add(self, record):
+        if record['record_type'] == "Error":
+            return
+
+        permissions = record['permissions']
+        if "(Explicit)" in permissions:
+            self.permissions["Explicit"] += 1
+        elif permissions:
+            self.permissions["Inherited only"] += 1
+        else:
+            self.permissions["Not read"] += 1
+
+        self._enter_folder(record['folder_path'])
+        if record['record_type'] == "Folder":
+            self.folders += 1
+            return
+
+        size = record['size'] or 0
+        self.files += 1
+        self.total_bytes += size
+        self._add_group(self.extensions, record['extension'] or "(none)", size)
+        self._add_group(self.owners, record['owner'] or "(unknown)", size)
+
+        mtime = record.get('mtime')
+        if mtime is None:
+            age_label = "Unknown"
+        else:
+            age_days = (self.now - mtime) / 86400
+            age_label = next(label for days, label in AGE_BUCKETS if days is None or age_days < days)
+        self.ages[age_label][0] += 1
+        self.ages[age_label][1] += size
+
+        if len(self.largest_files) < SUMMARY_TOP_N or size > self.largest_files[0][0]:
+            self._push_top(self.largest_files, size, os.path.join(record['folder_path'], record['name']))
+
+        if self._folder_stack and self._folder_stack[-1][0] == record['folder_path']:
+            self._folder_stack[-1][1] += size
+
+    def finish(self):
+        """Close the folders still open at the end of the walk."""
+        while self._folder_stack:
+            self._close_folder()
+
+    def write_sheet(self, wb):
+        """Write the Summary sheet (first sheet of the workbook)."""
+        self.finish()
+        ws = wb.create_sheet("Summary", 0)
+        title_font = Font(bold=True, size=12)
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        row = 1
+
+        def section(title, headers, rows):
+            nonlocal row
+            ws.cell(row=row, column=1, value=title).font = title_font
+            row += 1
+            for col, header in enumerate(headers, 1):
+                cell = ws.cell(row=row, column=col, value=header)
+                cell.font = header_font
+                cell.fill = header_fill
+            row += 1
+            for values in rows:
+                for col, value in enumerate(values, 1):
+                    ws.cell(row=row, column=col, value=value)
+                row += 1
+            row += 1
+
+        def share(size):
+            return round(100 * size / self.total_bytes, 1) if self.total_bytes else 0
+
+        def group_rows(groups):
+            ordered = sorted(groups.items(), key=lambda item: item[1][1], reverse=True)
+            return [(key, files, size, format_size(size), share(size))
+                    for key, (files, size) in ordered]
+
+        group_headers = ["Files", "Size (Bytes)", "Size (Formatted)", "% of Bytes"]
+        section("Totals", ["Measure", "Value"], [
+            ("Root Path", self.root_path),
+            ("Folders", self.folders),
+            ("Files", self.files),
+            ("Total Size (Bytes)", self.total_bytes),
+            ("Total Size (Formatted)", format_size(self.total_bytes)),
+        ])
+        section("Permissions (files and folders)", ["Items", "Count"],
+                list(self.permissions.items()))
+        section("Size by Age (Last Modified)", ["Age"] + group_headers,
+                [(label, files, size, format_size(size), share(size))
+                 for label, (files, size) in self.ages.items()])
+        section("Size by Extension", ["Extension"] + group_headers, group_rows(self.extensions))
+        section("Size by Owner", ["Owner"] + group_headers, group_rows(self.owners))
+        section(f"Largest Files (Top {SUMMARY_TOP_N})", ["Path", "Size (Bytes)", "Size (Formatted)"],
+                [(path, size, format_size(size)) for size, path in sorted(self.largest_files, reverse=True)])
+        section(f"Largest Folders (Top {SUMMARY_TOP_N}, including subfolders)",
+                ["Path", "Size (Bytes)", "Size (Formatted)"],
+                [(path, size, format_size(size)) for size, path in sorted(self.largest_folders, reverse=True)])
+
+        for col, width in enumerate([80, 15, 18, 18, 12], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        return ws
+
+
+def list_sample_folder(path, exclusion_patterns, include_permissions, rng, logger, stats):
+    """List one folder for sampling: subfolders, file totals by extension and an ACL sample.
+
+    Permissions are read for the folder itself and for a random sample of up
+    to SAMPLE_ACL_FILES_PER_FOLDER of its files (reservoir sampling, so the
+    file list is never held in memory).
+    """
+    info = {'subdirs': [], 'files': 0, 'bytes': 0, 'extensions': {},
+            'folder_explicit': 0, 'acl_files_checked': 0, 'acl_files_explicit': 0}
+    acl_sample = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if is_path_excluded(entry.path, exclusion_patterns):
+                            stats['excluded'] += 1
+                        else:
+                            info['subdirs'].append(entry.path)
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError as e:
+                    stats['errors'] += 1
+                    logger.debug(f"Error on {entry.path}: {str(e)}")
+                    continue
+
+                info['files'] += 1
+                info['bytes'] += size
+                extension = info['extensions'].setdefault(Path(entry.name).suffix.lower(), [0, 0])
+                extension[0] += 1
+                extension[1] += size
+                if len(acl_sample) < SAMPLE_ACL_FILES_PER_FOLDER:
+                    acl_sample.append(entry.path)
+                else:
+                    slot = rng.randrange(info['files'])
+                    if slot < SAMPLE_ACL_FILES_PER_FOLDER:
+                        acl_sample[slot] = entry.path
+    except OSError as e:
+        stats['errors'] += 1
+        logger.debug(f"Error listing {path}: {str(e)}")
+
+    if include_permissions:
+        def is_explicit(item_path):
+            _, permissions = get_permissions(item_path, logger)
+            return any(perm['inheritance'] == "Explicit" for perm in permissions)
+
+        try:
+            info['folder_explicit'] = int(is_explicit(path))
+        except Exception:
+            stats['errors'] += 1
+        for file_path in acl_sample:
             try:
-                owner, permissions = get_permissions(folder_path, logger)
-                file_info = get_file_info(folder_path, True)
-
-                # Folder path is the parent directory (current_dir)
-                ws_data.cell(row=data_row, column=1, value=current_dir)
-                ws_data.cell(row=data_row, column=2, value=subdir)
-                ws_data.cell(row=data_row, column=3, value="Folder")
-                ws_data.cell(row=data_row, column=4, value="")
-                ws_data.cell(row=data_row, column=5, value=0)
-                ws_data.cell(row=data_row, column=6, value="")
-                ws_data.cell(row=data_row, column=7, value=file_info['modified'])
-                ws_data.cell(row=data_row, column=8, value=owner)
-                ws_data.cell(row=data_row, column=9, value=format_permissions(permissions))
-
-                data_row += 1
+                info['acl_files_explicit'] += int(is_explicit(file_path))
+                info['acl_files_checked'] += 1
+            except Exception:
+                stats['errors'] += 1
 
-            except Exception as e:
-                ws_errors.cell(row=error_row, column=1, value=folder_path)
-                ws_errors.cell(row=error_row, column=2, value=type(e).__name__)
-                ws_errors.cell(row=error_row, column=3, value=str(e))
-                ws_errors.cell(row=error_row, column=4, value=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                error_row += 1
-                error_count += 1
-                logger.debug(f"Error on folder {folder_path}: {str(e)}")
-
-        # Process files
-        for filename in files:
-            file_path = os.path.join(current_dir, filename)
-            file_count += 1
-
-            if file_count % 500 == 0:
-                logger.info(f"Progress: {folder_count} folders, {file_count} files scanned, {excluded_count} excluded...")
+    stats['listed'] += 1
+    return info
 
-            try:
-                owner, permissions = get_permissions(file_path, logger)
-                file_info = get_file_info(file_path, False)
-
-                # Folder path is the containing directory (current_dir)
-                ws_data.cell(row=data_row, column=1, value=current_dir)
-                ws_data.cell(row=data_row, column=2, value=filename)
-                ws_data.cell(row=data_row, column=3, value="File")
-                ws_data.cell(row=data_row, column=4, value=file_info['extension'])
-                ws_data.cell(row=data_row, column=5, value=file_info['size'])
-                ws_data.cell(row=data_row, column=6, value=file_info['size_formatted'])
-                ws_data.cell(row=data_row, column=7, value=file_info['modified'])
-                ws_data.cell(row=data_row, column=8, value=owner)
-                ws_data.cell(row=data_row, column=9, value=format_permissions(permissions))
-
-                data_row += 1
 
-            except Exception as e:
-                ws_errors.cell(row=error_row, column=1, value=file_path)
-                ws_errors.cell(row=error_row, column=2, value=type(e).__name__)
-                ws_errors.cell(row=error_row, column=3, value=str(e))
-                ws_errors.cell(row=error_row, column=4, value=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                error_row += 1
-                error_count += 1
-                logger.debug(f"Error on file {file_path}: {str(e)}")
+def acl_sample_variance(info):
+    """Variance of a listed folder's estimated explicit file count, files * explicit / checked.
+
+    The ACL sample is drawn without replacement, so the variance is zero when
+    every file was checked; a single checked file gives no spread of its own
+    and is bounded by the worst case, a share of one half.
+    """
+    files, checked = info['files'], info['acl_files_checked']
+    if not checked or checked >= files:
+        return 0.0
+    share = info['acl_files_explicit'] / checked
+    spread = share * (1 - share) / (checked - 1) if checked > 1 else 0.25
+    return files * files * (1 - checked / files) * spread
+
+
+class SampleEstimate:
+    """Running mean and variance of the per-probe estimates of several totals."""
+
+    def __init__(self):
+        self.probes = 0
+        self.sums = {}
+        self.squares = {}
+
+    def add(self, values):
+        self.probes += 1
+        for key, value in values.items():
+            self.sums[key] = self.sums.get(key, 0.0) + value
+            self.squares[key] = self.squares.get(key, 0.0) + value * value
+
+    def mean(self, key):
+        return self.sums.get(key, 0.0) / self.probes if self.probes else 0.0
+
+    def interval(self, key):
+        """(estimate, low, high) of a total, with a SAMPLE_Z confidence interval."""
+        mean = self.mean(key)
+        if self.probes < 2:
+            return mean, None, None
+        variance = max(0.0, (self.squares.get(key, 0.0) - self.probes * mean * mean) / (self.probes - 1))
+        margin = SAMPLE_Z * math.sqrt(variance / self.probes)
+        return mean, max(0.0, mean - margin), mean + margin
+
+
+def sample_directory(root_path, logger, exclusion_patterns=None, fraction=SAMPLE_DEFAULT_FRACTION,
+                     time_budget=SAMPLE_DEFAULT_MINUTES * 60, seed=None, include_permissions=True):
+    """Estimate file count, bytes, extension mix and explicit ACLs from random probes.
+
+    Each probe walks down from the root, descending at every level into a
+    random k = max(1, round(fraction * n)) of the n subfolders, and weights
+    every folder it lists by the inverse of its selection probability (the
+    product of n / k along its path). Each probe is an unbiased estimate of
+    the totals, so probes are repeated until the time budget runs out and
+    the estimate is their mean, with a confidence interval from their spread.
+    Folder listings are cached, so later probes mostly re-use earlier work.
+
+    A cached folder keeps its ACL sample, so every probe sees the same
+    per-folder explicit share and the probe spread misses that sampling
+    error. It is added separately: the weight each listing received across
+    all probes, squared, times the variance of its ACL sample (see
+    acl_sample_variance), summed over listings. A partial last probe still
+    counts towards the weights, which only widens the interval slightly.
+    """
+    if exclusion_patterns is None:
+        exclusion_patterns = []
+    rng = random.Random(seed)
+    stats = {'listed': 0, 'errors': 0, 'excluded': 0}
+    cache = {}
+    acl_variance = 0.0
+    estimate = SampleEstimate()
+    extensions = SampleEstimate()
+    deadline = time.monotonic() + time_budget
+
+    logger.info(f"Sampling: {root_path} ({fraction:.0%} of subfolders per level, "
+                f"time budget {time_budget / 60:.0f} min)")
+    logger.info("-" * 60)
+
+    while estimate.probes < SAMPLE_MAX_PROBES and time.monotonic() < deadline:
+        totals = {'folders': 0.0, 'files': 0.0, 'bytes': 0.0, 'explicit': 0.0}
+        probe_extensions = {}
+        stack = [(root_path, 1.0)]
+        while stack:
+            if time.monotonic() >= deadline:
+                break  # A partial probe would be biased; discard it
+            path, weight = stack.pop()
+            info = cache.get(path)
+            if info is None:
+                if len(cache) >= SAMPLE_CACHE_FOLDERS:
+                    acl_variance += sum(entry['weight'] ** 2 * acl_sample_variance(entry)
+                                        for entry in cache.values())
+                    cache.clear()
+                info = cache[path] = list_sample_folder(path, exclusion_patterns, include_permissions,
+                                                        rng, logger, stats)
+                info['weight'] = 0.0
+
+            info['weight'] += weight
+            totals['folders'] += weight
+            totals['files'] += weight * info['files']
+            totals['bytes'] += weight * info['bytes']
+            explicit = info['folder_explicit']
+            if info['acl_files_checked']:
+                explicit += info['files'] * info['acl_files_explicit'] / info['acl_files_checked']
+            totals['explicit'] += weight * explicit
+            for name, (files, size) in info['extensions'].items():
+                key = name or "(none)"
+                probe_extensions[f"{key}|files"] = probe_extensions.get(f"{key}|files", 0.0) + weight * files
+                probe_extensions[f"{key}|bytes"] = probe_extensions.get(f"{key}|bytes", 0.0) + weight * size
+
+            subdirs = info['subdirs']
+            if subdirs:
+                count = max(1, round(fraction * len(subdirs)))
+                for subdir in rng.sample(subdirs, count):
+                    stack.append((subdir, weight * len(subdirs) / count))
+        else:
+            totals['items'] = totals['folders'] + totals['files']
+            totals['explicit_x_items'] = totals['explicit'] * totals['items']
+            estimate.add(totals)
+            extensions.add(probe_extensions)
+            if estimate.probes % 100 == 0:
+                files, low, high = estimate.interval('files')
+                logger.info(f"Progress: {estimate.probes} probes, {stats['listed']} folders listed, "
+                            f"~{files:,.0f} files (95% CI {low:,.0f} - {high:,.0f})")
+
+    acl_variance += sum(entry['weight'] ** 2 * acl_sample_variance(entry) for entry in cache.values())
+    return {
+        'root_path': root_path,
+        'fraction': fraction,
+        'seed': seed,
+        'permissions_read': include_permissions,
+        'stats': stats,
+        'estimate': estimate,
+        'extensions': extensions,
+        # Variance of the mean explicit total from the per-folder ACL samples
+        'explicit_acl_variance': acl_variance / estimate.probes ** 2 if estimate.probes else 0.0,
+    }
+
+
+def get_sample_rows(result):
+    """Estimate rows: (measure, estimate, CI low, CI high) for the sample report and log."""
+    estimate = result['estimate']
+    rows = [(label,) + estimate.interval(key) for key, label in
+            [('folders', "Folders"), ('files', "Files"), ('bytes', "Total Size (Bytes)")]]
+
+    # Explicit share is a ratio of two totals: interval by linearization,
+    # Var(r) ~ (Var(e) - 2r Cov(e, n) + r^2 Var(n)) / (probes * n^2), plus the
+    # ACL sampling variance of e, which the probe spread does not see, over n^2
+    items = estimate.mean('items')
+    if result['permissions_read'] and estimate.probes >= 2 and items:
+        probes = estimate.probes
+        ratio = estimate.mean('explicit') / items
+        def variance(key):
+            return (estimate.squares.get(key, 0.0) - probes * estimate.mean(key) ** 2) / (probes - 1)
+        covariance = (estimate.sums.get('explicit_x_items', 0.0)
+                      - probes * estimate.mean('explicit') * items) / (probes - 1)
+        ratio_variance = max(0.0, variance('explicit') - 2 * ratio * covariance
+                             + ratio * ratio * variance('items')) / (probes * items * items)
+        ratio_variance += result['explicit_acl_variance'] / (items * items)
+        margin = SAMPLE_Z * math.sqrt(ratio_variance)
+        rows.append(("Items With Explicit Permissions (%)", 100 * ratio,
+                     100 * max(0.0, ratio - margin), 100 * min(1.0, ratio + margin)))
+    return rows
+
+
+def log_sample(result, logger):
+    """Log the sampling estimates and the leading extensions."""
+    estimate, extensions = result['estimate'], result['extensions']
+    logger.info("=" * 60)
+    logger.info("SAMPLE ESTIMATES (95% confidence)")
+    logger.info("=" * 60)
+    for label, value, low, high in get_sample_rows(result):
+        if low is None:
+            logger.info(f"{label}: ~{value:,.0f} (too few probes for an interval)")
+        elif label.endswith("(%)"):
+            logger.info(f"{label}: ~{value:.1f}% ({low:.1f}% - {high:.1f}%)")
+        elif label.startswith("Total Size"):
+            logger.info(f"Total Size: ~{format_size(value)} ({format_size(low)} - {format_size(high)})")
+        else:
+            logger.info(f"{label}: ~{value:,.0f} ({low:,.0f} - {high:,.0f})")
+    if not result['permissions_read']:
+        logger.info("Explicit permissions: not estimated (pywin32 not installed)")
+
+    total_bytes = estimate.mean('bytes')
+    names = {key.rsplit('|', 1)[0] for key in extensions.sums}
+    ordered = sorted(names, key=lambda name: extensions.mean(f"{name}|bytes"), reverse=True)
+    if total_bytes and ordered:
+        logger.info("Top extensions by size: " + ", ".join(
+            f"{name} {100 * extensions.mean(f'{name}|bytes') / total_bytes:.0f}%" for name in ordered[:5]))
+
+
+def write_sample_report(result, output_file):
+    """Write the sampling estimates to an Excel file."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sample Estimates"
+    title_font = Font(bold=True, size=12)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    row = 1
+
+    def section(title, headers, rows):
+        nonlocal row
+        ws.cell(row=row, column=1, value=title).font = title_font
+        row += 1
+        for col, header in enumerate(headers, 1):
+            cell = ws.cell(row=row, column=col, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+        row += 1
+        for values in rows:
+            for col, value in enumerate(values, 1):
+                ws.cell(row=row, column=col, value=round(value) if isinstance(value, float) else value)
+            row += 1
+        row += 1
+
+    estimate, extensions, stats = result['estimate'], result['extensions'], result['stats']
+    section("Sampling", ["Setting", "Value"], [
+        ("Root Path", result['root_path']),
+        ("Subfolders Sampled per Level", f"{result['fraction']:.0%}"),
+        ("Probes", estimate.probes),
+        ("Folders Listed", stats['listed']),
+        ("Folders Excluded", stats['excluded']),
+        ("Errors", stats['errors']),
+        ("Seed", result['seed'] if result['seed'] is not None else "(random)"),
+        ("Permissions Read", "Yes" if result['permissions_read'] else "No (pywin32 not installed)"),
+    ])
+    section("Estimates (95% confidence)",
+            ["Measure", "Estimate", "95% CI Low", "95% CI High"], get_sample_rows(result))
+
+    total_bytes = estimate.mean('bytes')
+    names = {key.rsplit('|', 1)[0] for key in extensions.sums}
+    ordered = sorted(names, key=lambda name: extensions.mean(f"{name}|bytes"), reverse=True)
+    extension_rows = []
+    for name in ordered[:SAMPLE_TOP_EXTENSIONS]:
+        size, low, high = extensions.interval(f"{name}|bytes")
+        extension_rows.append((name, extensions.mean(f"{name}|files"), size, low, high,
+                               format_size(size),
+                               round(100 * size / total_bytes, 1) if total_bytes else 0))
+    section(f"Extension Mix (Top {SAMPLE_TOP_EXTENSIONS} by Bytes)",
+            ["Extension", "Files", "Size (Bytes)", "95% CI Low", "95% CI High", "Size (Formatted)",
+             "% of Bytes"], extension_rows)
+
+    for col, width in enumerate([40, 18, 18, 18, 18, 18, 12], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    wb.save(output_file)
+    return output_file
+
+
+def catalog_path_key(path):
+    """Case-insensitive, backslash-separated key of a folder path (as in exclusion matching)."""
+    return os.path.normpath(path).replace('/', '\\').rstrip('\\').lower()
+
+
+def parse_permissions(permissions):
+    """Split a formatted permissions string (see format_permissions) into ACE tuples
+    (account, access_type, permission, inheritance)."""
+    entries = []
+    for entry in permissions.split("; ") if permissions else []:
+        rest, _, inheritance = entry[:-1].rpartition("(")
+        account, access_type, permission = (rest.rsplit(":", 2) + ["", ""])[:3]
+        entries.append((account, access_type, permission, inheritance))
+    return entries
+
+
+class ScanCatalog:
+    """SQLite catalog of scans, for querying a scan (or comparing scans) without Excel.
+
+    Tables (see CATALOG_SCHEMA):
+
+        scans        One row per scan: root path, times and totals
+        folders      Each folder path once, shared by all scans, with a
+                     case-insensitive path key so "everything under X" is an
+                     index range scan
+        principals   Account names (owners and ACE accounts), stored once
+        acls         Each distinct permission set once, with an explicit flag;
+                     acl_entries holds its ACEs by principal
+        items        One row per folder or file per scan: folder, name, type,
+                     extension, size, modified time, owner and ACL IDs
+        errors       Error records per scan
+
+    Records are added in bulk (executemany in batches of CATALOG_BATCH_ROWS,
+    committed every CATALOG_COMMIT_ROWS), so a catalog sink costs little on
+    top of the scan itself.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = str(db_file)
+        self.conn = sqlite3.connect(self.db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(CATALOG_SCHEMA)
+        self.scan_id = None
+        self._principal_ids = dict(self.conn.execute("SELECT name, principal_id FROM principals"))
+        self._acl_ids = dict(self.conn.execute("SELECT permissions, acl_id FROM acls"))
+        self._folder_key = None
+        self._folder_id = None
+        self._items = []
+        self._errors = []
+        self._uncommitted = 0
+        self.totals = {'folders': 0, 'files': 0, 'errors': 0, 'bytes': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def start_scan(self, root_path, started=None):
+        """Register a new scan; records added from now on belong to it."""
+        started = started or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cursor = self.conn.execute("INSERT INTO scans (root_path, started) VALUES (?, ?)",
+                                   (root_path, started))
+        self.scan_id = cursor.lastrowid
+        return self.scan_id
+
+    def _principal(self, name):
+        principal_id = self._principal_ids.get(name)
+        if principal_id is None:
+            cursor = self.conn.execute("INSERT INTO principals (name) VALUES (?)", (name,))
+            principal_id = self._principal_ids[name] = cursor.lastrowid
+        return principal_id
+
+    def _acl(self, permissions):
+        acl_id = self._acl_ids.get(permissions)
+        if acl_id is None:
+            entries = parse_permissions(permissions)
+            explicit = int(any(entry[3] == "Explicit" for entry in entries))
+            cursor = self.conn.execute("INSERT INTO acls (permissions, explicit) VALUES (?, ?)",
+                                       (permissions, explicit))
+            acl_id = self._acl_ids[permissions] = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO acl_entries (acl_id, principal_id, access_type, permission, inheritance) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(acl_id, self._principal(account), access_type, permission, inheritance)
+                 for account, access_type, permission, inheritance in entries])
+        return acl_id
+
+    def _folder(self, folder_path):
+        # Records arrive grouped by folder, so one remembered folder covers most lookups
+        key = catalog_path_key(folder_path)
+        if key != self._folder_key:
+            self.conn.execute("INSERT OR IGNORE INTO folders (path, path_key) VALUES (?, ?)",
+                              (folder_path, key))
+            self._folder_id = self.conn.execute("SELECT folder_id FROM folders WHERE path_key = ?",
+                                                (key,)).fetchone()[0]
+            self._folder_key = key
+        return self._folder_id
+
+    def add(self, record):
+        """Add one audit record (folder, file or error) to the current scan."""
+        if record['record_type'] == "Error":
+            self._errors.append((self.scan_id, record['path'], record['error_type'],
+                                 record['error_message'], record['timestamp']))
+            self.totals['errors'] += 1
+        else:
+            is_file = record['record_type'] == "File"
+            self._items.append((
+                self.scan_id, self._folder(record['folder_path']), record['name'],
+                record['record_type'], record['extension'], record['size'], record.get('mtime'),
+                self._principal(record['owner']) if record['owner'] else None,
+                self._acl(record['permissions']) if record['permissions'] else None,
+            ))
+            self.totals['files' if is_file else 'folders'] += 1
+            self.totals['bytes'] += record['size'] if is_file else 0
+        if len(self._items) + len(self._errors) >= CATALOG_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows; commit once CATALOG_COMMIT_ROWS have accumulated."""
+        self.conn.executemany(
+            "INSERT INTO items (scan_id, folder_id, name, item_type, extension, size, mtime, "
+            "owner_id, acl_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._items)
+        self.conn.executemany(
+            "INSERT INTO errors (scan_id, path, error_type, error_message, timestamp) "
+            "VALUES (?, ?, ?, ?, ?)", self._errors)
+        self._uncommitted += len(self._items) + len(self._errors)
+        self._items = []
+        self._errors = []
+        if self._uncommitted >= CATALOG_COMMIT_ROWS:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def finish(self):
+        """Write the remaining rows and the scan totals."""
+        self.flush()
+        self.conn.execute(
+            "UPDATE scans SET finished = ?, folders = ?, files = ?, errors = ?, total_bytes = ? "
+            "WHERE scan_id = ?",
+            (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), self.totals['folders'], self.totals['files'],
+             self.totals['errors'], self.totals['bytes'], self.scan_id))
+        # Planner statistics (sampled, so cheap on large catalogs): without them path
+        # and owner queries may scan a whole scan's items instead of using the indexes
+        self.conn.execute(f"PRAGMA analysis_limit={CATALOG_ANALYSIS_LIMIT}")
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+        self._uncommitted = 0
+
+
+def get_catalog_filter(args, conn):
+    """Resolve the scan to query and build the filter clauses and their parameters.
+
+    The scan itself is not filtered here: the caller adds "i.scan_id = ?" for
+    a single scan, while --growth applies the same filters to every scan.
+    """
+    if args.scan is not None:
+        scan_id = args.scan
+    else:
+        row = conn.execute("SELECT MAX(scan_id) FROM scans").fetchone()
+        scan_id = row[0] if row else None
+    clauses = ["i.item_type = 'File'"]
+    params = []
+    if args.under:
+        key = catalog_path_key(args.under)
+        # Range on the path key: the folder itself and everything below it ('\\' + 1 is ']')
+        clauses.append("i.folder_id IN (SELECT folder_id FROM folders WHERE path_key = ? "
+                       "OR (path_key >= ? AND path_key < ?))")
+        params += [key, key + "\\", key + "]"]
+    if args.owner:
+        clauses.append("i.owner_id IN (SELECT principal_id FROM principals WHERE name = ? COLLATE NOCASE)")
+        params.append(args.owner)
+    if args.account:
+        clauses.append("i.acl_id IN (SELECT e.acl_id FROM acl_entries e JOIN principals p "
+                       "ON p.principal_id = e.principal_id WHERE p.name = ? COLLATE NOCASE)")
+        params.append(args.account)
+    if args.extension:
+        extensions = [ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in args.extension]
+        clauses.append(f"i.extension IN ({', '.join('?' * len(extensions))})")
+        params += extensions
+    if args.min_size_mb is not None:
+        clauses.append("i.size >= ?")
+        params.append(int(args.min_size_mb * 1024 * 1024))
+    if args.max_size_mb is not None:
+        clauses.append("i.size <= ?")
+        params.append(int(args.max_size_mb * 1024 * 1024))
+    if args.modified_before:
+        clauses.append("i.mtime < ?")
+        params.append(int(datetime.strptime(args.modified_before, '%Y-%m-%d').timestamp()))
+    if args.explicit:
+        clauses.append("i.acl_id IN (SELECT acl_id FROM acls WHERE explicit = 1)")
+    return scan_id, clauses, params
+
+
+def export_catalog_manifest(conn, where, params, manifest_file, base_path, target_folder):
+    """Write the matching files as an upload manifest (FileName, FilePath, TargetFolder)
+    for sp_upload.py; .xlsx or .csv by extension."""
+    base_length = len(catalog_path_key(base_path)) if base_path else None
+    target_root = '/'.join(part for part in (target_folder or '').replace('\\', '/').split('/') if part)
+    rows = conn.execute(f"SELECT f.path, i.name FROM items i JOIN folders f ON f.folder_id = i.folder_id "
+                        f"WHERE {where} ORDER BY f.path_key, i.name", params)
+
+    def manifest_rows():
+        for folder_path, name in rows:
+            relative = folder_path[base_length:] if base_length is not None else ""
+            parts = [part for part in relative.replace('\\', '/').split('/') if part]
+            yield [name, folder_path, '/'.join(([target_root] if target_root else []) + parts)]
+
+    count = 0
+    manifest_file = Path(manifest_file)
+    if manifest_file.suffix.lower() == ".csv":
+        with open(manifest_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(MANIFEST_COLUMNS)
+            for row in manifest_rows():
+                writer.writerow(row)
+                count += 1
+    else:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Manifest")
+        ws.append(MANIFEST_COLUMNS)
+        for row in manifest_rows():
+            ws.append(row)
+            count += 1
+        wb.save(manifest_file)
+    return count
+
+
+def query_catalog(argv):
+    """'query' subcommand: answer questions from a scan catalog, export upload manifests."""
+    parser = argparse.ArgumentParser(
+        prog='file_server_audit.py query',
+        description='Query a scan catalog (created with --catalog)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+    python file_server_audit.py query catalog.db --scans
+    python file_server_audit.py query catalog.db --under "D:\\Data\\Finance" --explicit --owner "CONTOSO\\jdoe"
+    python file_server_audit.py query catalog.db --under "D:\\Data\\Finance" --growth
+    python file_server_audit.py query catalog.db --extension pdf --min-size-mb 100 --limit 50
+    python file_server_audit.py query catalog.db --under "D:\\Data\\HR" --manifest hr_upload.xlsx --target-folder HR
+        '''
+    )
+    parser.add_argument('catalog', help='Catalog database file')
+    parser.add_argument('--scans', action='store_true', help='List the scans in the catalog')
+    parser.add_argument('--scan', type=int, metavar='SCAN_ID', help='Scan to query (default: latest)')
+    parser.add_argument('--under', metavar='PATH', help='Only files in or below this folder')
+    parser.add_argument('--owner', metavar='ACCOUNT', help='Only files owned by this account')
+    parser.add_argument('--account', metavar='ACCOUNT',
+                        help='Only files whose permissions include this account')
+    parser.add_argument('--extension', action='append', metavar='EXT',
+                        help='Only files with this extension (can be used multiple times)')
+    parser.add_argument('--min-size-mb', type=float, metavar='MB', help='Only files of at least this size')
+    parser.add_argument('--max-size-mb', type=float, metavar='MB', help='Only files of at most this size')
+    parser.add_argument('--modified-before', metavar='YYYY-MM-DD', help='Only files last modified before this date')
+    parser.add_argument('--explicit', action='store_true', help='Only files with explicit permissions')
+    parser.add_argument('--growth', action='store_true',
+                        help='Files and bytes matching the filters in every scan (e.g. folder growth)')
+    parser.add_argument('--limit', type=int, default=CATALOG_QUERY_LIMIT,
+                        help=f'Largest matching files listed (default: {CATALOG_QUERY_LIMIT})')
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='Export the matching files as an upload manifest (.xlsx or .csv) for sp_upload.py')
+    parser.add_argument('--target-folder', default='', metavar='FOLDER',
+                        help='Library folder the manifest maps --under (or the scan root) to')
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.catalog):
+        print(f"ERROR: Catalog not found: {args.catalog}")
+        sys.exit(1)
+    conn = sqlite3.connect(args.catalog)
+    started = time.perf_counter()
+
+    if args.scans:
+        print(f"{'Scan':>5}  {'Started':<19}  {'Folders':>10}  {'Files':>12}  {'Size':>10}  Root Path")
+        for scan_id, root_path, scan_started, folders, files, total_bytes in conn.execute(
+                "SELECT scan_id, root_path, started, folders, files, total_bytes FROM scans ORDER BY scan_id"):
+            print(f"{scan_id:>5}  {scan_started:<19}  {folders or 0:>10,}  {files or 0:>12,}  "
+                  f"{format_size(total_bytes or 0):>10}  {root_path}")
+        return
+
+    scan_id, filters, filter_params = get_catalog_filter(args, conn)
+    if scan_id is None:
+        print("ERROR: The catalog has no scans")
+        sys.exit(1)
+    from_items = "FROM items i JOIN folders f ON f.folder_id = i.folder_id"
+
+    if args.growth:
+        growth_where = " AND ".join(filters)
+        print(f"{'Scan':>5}  {'Started':<19}  {'Files':>12}  {'Size':>10}  {'Change':>11}")
+        previous = None
+        for row_scan, scan_started, files, total_bytes in conn.execute(
+                f"SELECT s.scan_id, s.started, COUNT(i.scan_id), COALESCE(SUM(i.size), 0) FROM scans s "
+                f"LEFT JOIN (SELECT i.scan_id, i.size {from_items} WHERE {growth_where}) i "
+                f"ON i.scan_id = s.scan_id GROUP BY s.scan_id ORDER BY s.scan_id", filter_params):
+            change = "" if previous is None else \
+                f"{'+' if total_bytes >= previous else '-'}{format_size(abs(total_bytes - previous))}"
+            print(f"{row_scan:>5}  {scan_started:<19}  {files:>12,}  {format_size(total_bytes):>10}  {change:>11}")
+            previous = total_bytes
+        print(f"({time.perf_counter() - started:.3f}s)")
+        return
+
+    where = " AND ".join(["i.scan_id = ?"] + filters)
+    params = [scan_id] + filter_params
+    files, total_bytes = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(i.size), 0) {from_items} WHERE {where}",
+                                      params).fetchone()
+    print(f"Scan {scan_id}: {files:,} matching files, {format_size(total_bytes)}")
+    for folder_path, name, size, owner in conn.execute(
+            f"SELECT f.path, i.name, i.size, p.name {from_items} "
+            f"LEFT JOIN principals p ON p.principal_id = i.owner_id "
+            f"WHERE {where} ORDER BY i.size DESC LIMIT {int(args.limit)}", params):
+        print(f"  {format_size(size):>10}  {owner or '':<24}  {os.path.join(folder_path, name)}")
+    print(f"({time.perf_counter() - started:.3f}s)")
+
+    if args.manifest:
+        base_path = args.under or conn.execute("SELECT root_path FROM scans WHERE scan_id = ?",
+                                               (scan_id,)).fetchone()[0]
+        count = export_catalog_manifest(conn, where, params, args.manifest, base_path, args.target_folder)
+        print(f"Manifest: {count:,} files written to {args.manifest}")
+
+
+def write_records(records, ws_data, ws_errors, inventory=None, summary=None, catalog=None):
+    """Write audit records to the data and error sheets (and add them to an inventory,
+    summary and catalog)."""
+    data_row = 2
+    error_row = 2
+
+    for record in records:
+        if inventory is not None:
+            inventory.add(record)
+        if catalog is not None:
+            catalog.add(record)
+        if summary is not None:
+            summary.add(record)
+        if record['record_type'] == "Error":
+            for col, key in enumerate(REPORT_ERROR_FIELDS, 1):
+                ws_errors.cell(row=error_row, column=col, value=record[key])
+            error_row += 1
+        else:
+            for col, key in enumerate(REPORT_DATA_FIELDS, 1):
+                ws_data.cell(row=data_row, column=col, value=record[key])
+            data_row += 1
+
+
+def scan_directory(root_path, wb, ws_data, ws_errors, logger, exclusion_patterns=None,
+                   inventory=None, catalog=None, denied_threshold=DENIED_THRESHOLD,
+                   denied_mode=DENIED_MODES[0]):
+    """Scan directory and write results to Excel.
+
+    Args:
+        root_path: Root directory to scan
+        wb: Excel workbook
+        ws_data: Data worksheet
+        ws_errors: Errors worksheet
+        logger: Logger instance
+        exclusion_patterns: List of patterns to exclude (optional)
+        inventory: InventoryStore that also receives every record (optional)
+        catalog: ScanCatalog that also receives every record, as a new scan (optional)
+        denied_threshold: Consecutive access-denied items that mark a folder as denied
+        denied_mode: Denied subtrees listed without permissions ('inventory') or skipped ('skip')
+
+    The Summary sheet (see AuditSummary) is computed during the scan and
+    added as the first sheet.
+    """
+    stats = {}
+    summary = AuditSummary(root_path)
+    write_records(iter_audit_records(root_path, logger, exclusion_patterns, stats,
+                                     denied_threshold=denied_threshold, denied_mode=denied_mode),
+                  ws_data, ws_errors, inventory, summary, catalog)
+    if catalog is not None:
+        catalog.finish()
+    summary.write_sheet(wb)
+    log_summary(summary, logger)
+    if stats['denied_subtrees']:
+        logger.info(f"Access-denied subtrees: {stats['denied_subtrees']:,} (one entry each in the Errors sheet)")
+    return stats['folders'], stats['files'], stats['errors'], stats['excluded']
+
+
+def log_summary(summary, logger):
+    """Log the headline numbers of the Summary sheet."""
+    items = summary.files + summary.folders
+    explicit = summary.permissions["Explicit"]
+    logger.info(f"Summary: {summary.files:,} files, {format_size(summary.total_bytes)}, "
+                f"{explicit:,} items with explicit permissions "
+                f"({100 * explicit / items if items else 0:.1f}%)")
+
+
+def get_safe_path_name(root_path):
+    """Root path as a short file name part."""
+    safe_path_name = root_path.replace("\\", "_").replace(":", "").replace("/", "_")
+    return safe_path_name[:50]
+
+
+def export_saved_inventory(inventory_dir, catalog_file=None):
+    """Write the Excel report of a saved inventory (no scan, no pywin32 needed), and
+    optionally add it to a scan catalog."""
+    script_dir = Path(__file__).parent.absolute()
+    output_dir = script_dir / "output"
+    output_dir.mkdir(exist_ok=True)
+    logger = setup_logging(output_dir)
+
+    logger.info("=" * 60)
+    logger.info("FILE SERVER AUDIT TOOL - INVENTORY EXPORT")
+    logger.info("=" * 60)
+    try:
+        inventory = InventoryStore.open(inventory_dir)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Failed to open inventory {inventory_dir}: {str(e)}")
+        sys.exit(1)
+
+    root_path = inventory.info.get('root_path', Path(inventory_dir).name)
+    logger.info(f"Inventory: {inventory_dir}")
+    logger.info(f"Root Path: {root_path} (scanned {inventory.info.get('scanned', 'unknown')})")
+    logger.info(f"Items: {len(inventory):,}, Errors: {len(inventory.errors):,}")
+
+    wb, ws_data, ws_errors = setup_excel_workbook()
+    scanned = inventory.info.get('scanned')
+    summary = AuditSummary(root_path, datetime.strptime(scanned, '%Y-%m-%d %H:%M:%S').timestamp()
+                           if scanned else None)
+    catalog = None
+    if catalog_file:
+        catalog = ScanCatalog(catalog_file)
+        catalog.start_scan(root_path, scanned)
+        logger.info(f"Catalog: {catalog_file} (scan {catalog.scan_id})")
+    write_records(inventory.iter_records(), ws_data, ws_errors, summary=summary, catalog=catalog)
+    if catalog is not None:
+        catalog.finish()
+        catalog.close()
+    summary.write_sheet(wb)
+    log_summary(summary, logger)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = output_dir / f"FileAudit_{get_safe_path_name(root_path)}_{timestamp}.xlsx"
+    logger.info("Saving Excel file...")
+    wb.save(output_file)
+    logger.info(f"Output File: {output_file}")
 
-    return folder_count, file_count, error_count, excluded_count
+    print(f"\nOutput saved to: {output_file}")
 
 
 def main():
+    # Subcommand: query a scan catalog
+    if len(sys.argv) > 1 and sys.argv[1] == 'query':
+        query_catalog(sys.argv[2:])
+        return
+
     # Parse command line arguments
     parser = argparse.ArgumentParser(
         description='File Server Audit Tool - Scans folders and generates Excel report with permissions',
@@ -608,6 +1930,12 @@ Examples:
     python file_server_audit.py "D:\\Data" -x "*\\Archive" -x "*\\Backup"
     python file_server_audit.py "D:\\Data" --exclude-file exclusions.txt
     python file_server_audit.py "D:\\Data" -x "*\\Temp" --exclude-file exclusions.txt
+    python file_server_audit.py "D:\\Data" --inventory
+    python file_server_audit.py --from-inventory output\\inventory_D_Data_20250101_120000
+    python file_server_audit.py "\\\\server\\share" --sample --time-budget 5
+    python file_server_audit.py "D:\\Data" --catalog catalog.db
+    python file_server_audit.py query catalog.db --under "D:\\Data\\HR" --explicit --owner "CONTOSO\\jdoe"
+    python file_server_audit.py query catalog.db --under "D:\\Data\\HR" --manifest hr.xlsx --target-folder HR
 
 Exclusion Options:
     -x, --exclude       Exclude a folder path pattern (can be used multiple times)
@@ -617,13 +1945,53 @@ Exclusion Options:
     Matching is case-insensitive.
         '''
     )
-    parser.add_argument('root_path', help='Root path to scan (local path or UNC path)')
+    parser.add_argument('root_path', nargs='?', help='Root path to scan (local path or UNC path)')
     parser.add_argument('--exclude', '-x', dest='exclude_patterns', action='append', default=[],
                         metavar='PATTERN', help='Folder path pattern to exclude (can be used multiple times)')
     parser.add_argument('--exclude-file', '-e', dest='exclude_file',
                         help='Path to text file containing folder paths to exclude (one per line)')
+    parser.add_argument('--inventory', action='store_true',
+                        help='Also keep a compact inventory of the scan and save it to the output '
+                             'folder (for later processing or report export)')
+    parser.add_argument('--from-inventory', metavar='INVENTORY_DIR',
+                        help='Write the Excel report from a saved inventory instead of scanning')
+    parser.add_argument('--on-denied', choices=DENIED_MODES, default=DENIED_MODES[0],
+                        help='Access-denied subtrees: list without owner and permissions (inventory, '
+                             'default) or skip them')
+    parser.add_argument('--denied-threshold', type=int, default=DENIED_THRESHOLD, metavar='N',
+                        help=f'Access-denied items in a row that mark a folder as denied '
+                             f'(default: {DENIED_THRESHOLD})')
+    parser.add_argument('--catalog', metavar='DB_FILE',
+                        help='Also add the scan to a SQLite catalog (created if missing; several scans '
+                             'per catalog), for the query subcommand')
+    parser.add_argument('--sample', action='store_true',
+                        help='Estimate totals from a randomized partial traversal instead of a full scan')
+    parser.add_argument('--sample-fraction', type=float, default=SAMPLE_DEFAULT_FRACTION, metavar='FRACTION',
+                        help=f'Share of subfolders descended into at each level '
+                             f'(default: {SAMPLE_DEFAULT_FRACTION})')
+    parser.add_argument('--time-budget', type=float, default=SAMPLE_DEFAULT_MINUTES, metavar='MINUTES',
+                        help=f'Sampling time budget in minutes (default: {SAMPLE_DEFAULT_MINUTES})')
+    parser.add_argument('--seed', type=int, help='Random seed for a reproducible sample')
 
     args = parser.parse_args()
+
+    if args.from_inventory:
+        export_saved_inventory(args.from_inventory, args.catalog)
+        return
+
+    if not args.root_path:
+        parser.error('root_path is required unless --from-inventory is used')
+
+    if args.sample and not 0 < args.sample_fraction <= 1:
+        parser.error('--sample-fraction must be greater than 0 and at most 1')
+
+    if args.denied_threshold < 1:
+        parser.error('--denied-threshold must be at least 1')
+
+    if win32security is None and not args.sample:
+        print("ERROR: pywin32 is not installed. Please run: pip install pywin32")
+        sys.exit(1)
+
     root_path = args.root_path
     exclude_file = args.exclude_file
     cli_exclude_patterns = args.exclude_patterns
@@ -673,24 +2041,56 @@ Exclusion Options:
     if exclusion_patterns:
         logger.info(f"Total exclusion patterns: {len(exclusion_patterns)}")
 
+    if args.sample:
+        # Permissions are sampled when pywin32 is available; totals do not need it
+        start_time = datetime.now()
+        result = sample_directory(root_path, logger, exclusion_patterns, args.sample_fraction,
+                                  args.time_budget * 60, args.seed,
+                                  include_permissions=win32security is not None)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_file = output_dir / f"FileAudit_Sample_{get_safe_path_name(root_path)}_{timestamp}.xlsx"
+        write_sample_report(result, output_file)
+        log_sample(result, logger)
+        logger.info(f"Probes: {result['estimate'].probes:,} ({result['stats']['listed']:,} folders listed, "
+                    f"{result['stats']['errors']:,} errors)")
+        logger.info(f"Duration: {datetime.now() - start_time}")
+        logger.info(f"Output File: {output_file}")
+        logger.info("=" * 60)
+        print(f"\nOutput saved to: {output_file}")
+        return
+
     # Setup Excel workbook
     wb, ws_data, ws_errors = setup_excel_workbook()
 
+    # Compact inventory of the scan, saved next to the report
+    inventory = InventoryStore() if args.inventory else None
+
     # Scan directory
     start_time = datetime.now()
+    catalog = None
+    if args.catalog:
+        catalog = ScanCatalog(args.catalog)
+        catalog.start_scan(root_path, start_time.strftime('%Y-%m-%d %H:%M:%S'))
+        logger.info(f"Catalog: {args.catalog} (scan {catalog.scan_id})")
     folder_count, file_count, error_count, excluded_count = scan_directory(
-        root_path, wb, ws_data, ws_errors, logger, exclusion_patterns
+        root_path, wb, ws_data, ws_errors, logger, exclusion_patterns, inventory, catalog,
+        args.denied_threshold, args.on_denied
     )
+    if catalog is not None:
+        catalog.close()
     end_time = datetime.now()
 
     # Generate output filename
-    safe_path_name = root_path.replace("\\", "_").replace(":", "").replace("/", "_")
-    if len(safe_path_name) > 50:
-        safe_path_name = safe_path_name[:50]
-
+    safe_path_name = get_safe_path_name(root_path)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     output_file = output_dir / f"FileAudit_{safe_path_name}_{timestamp}.xlsx"
 
+    if inventory is not None:
+        inventory.info = {'root_path': root_path, 'scanned': start_time.strftime('%Y-%m-%d %H:%M:%S')}
+        inventory_dir = inventory.save(output_dir / f"inventory_{safe_path_name}_{timestamp}")
+        logger.info(f"Inventory: {len(inventory):,} items, "
+                    f"{format_size(inventory.memory_bytes())} in memory, saved to {inventory_dir}")
+
     # Save workbook
     logger.info("-" * 60)
     logger.info("Saving Excel file...")
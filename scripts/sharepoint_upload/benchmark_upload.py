@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SharePoint Upload Benchmark Harness
+================================================================================
+
+Description:
+    Runs sp_upload.py against the local mock SharePoint server with synthetic
+    manifests and reports throughput, so worker counts, chunk sizes, metadata
+    batching and network conditions can be compared without a tenant.
+
+Features:
+    - Synthetic scenarios: many small files, a few huge files, deep folder
+      trees, and a mix of all three
+    - Parameter matrix: every combination of --workers and --chunk-mb
+    - Metadata batching: the same metadata applied to the files one update
+      per request versus in $batch groups (--metadata-batch, runs
+      sp_upload.py --metadata-only)
+    - Simulated network: per-request latency, shared bandwidth limit and
+      injected 429 / 503 throttling (see mock_sharepoint.py)
+    - Fresh mock server per run, so runs do not see each other's files
+    - Results table on the console and a CSV file in the output folder
+
+Requirements:
+    Same as sp_upload.py (the mock server uses the standard library only)
+
+Usage:
+    python benchmark_upload.py --scenario small
+    python benchmark_upload.py --scenario small --workers 1 4 8 16 --latency-ms 50
+    python benchmark_upload.py --scenario large --chunk-mb 10 50 100 --bandwidth-mbps 50
+    python benchmark_upload.py --scenario mixed --scale 0.1 --throttle-rate 0.02
+    python benchmark_upload.py --scenario small --metadata-batch 1 20 100 --latency-ms 50
+
+--------------------------------------------------------------------------------
+Author:     Ishak Ahmad (ishak.ahmad@gmail.com)
+Created:    2025
+Version:    1.0.0
+License:    Proprietary - All Rights Reserved
+
+Copyright (c) 2025 Ishak Ahmad. All rights reserved.
+================================================================================
+"""
+
+import sys
+import csv
+import json
+import random
+import shutil
+import argparse
+import tempfile
+import itertools
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from mock_sharepoint import MockSharePoint, MockServer
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+LIBRARY = "Documents"
+DEFAULT_WORKERS = [1, 4, 8]
+DEFAULT_CHUNK_MB = [10]
+DEFAULT_METADATA_BATCH = [1, 100]  # List item updates per request: one by one, and in $batch groups
+LARGE_FILE_MB = 300  # Above sp_upload's 250MB threshold, so uploaded in chunks
+
+# Scenario presets: (file count, min size KB, max size KB, folder depth, folder fan-out)
+SCENARIOS = {
+    'small': [(1000, 1, 64, 1, 10)],
+    'large': [(3, LARGE_FILE_MB * 1024, LARGE_FILE_MB * 1024, 1, 1)],
+    'deep': [(500, 4, 256, 8, 3)],
+    'mixed': [(500, 1, 64, 1, 10), (200, 256, 8192, 4, 3),
+              (2, LARGE_FILE_MB * 1024, LARGE_FILE_MB * 1024, 1, 1)],
+}
+
+DEPARTMENTS = ['Finance', 'HR', 'IT', 'Legal']
+
+# Runs sp_upload.main() with the chunk size under test
+BOOTSTRAP = (
+    "import sys, sp_upload\n"
+    "sp_upload.CHUNK_SIZE = int(sys.argv.pop(1))\n"
+    "sys.argv[0] = 'sp_upload.py'\n"
+    "sp_upload.main()\n"
+)
+
+# Runs sp_upload.main() --metadata-only with the batch size under test, timed
+METADATA_BOOTSTRAP = (
+    "import sys, time, sp_upload\n"
+    "sp_upload.METADATA_BATCH_SIZE = int(sys.argv.pop(1))\n"
+    "sys.argv[0] = 'sp_upload.py'\n"
+    "started = time.monotonic()\n"
+    "sp_upload.main()\n"
+    "print(f'Elapsed: {time.monotonic() - started:.3f}')\n"
+)
+
+
+def random_folder(rng, depth, fan_out):
+    """Pick a folder path of the given depth from a tree with the given fan-out."""
+    return '/'.join(f"L{level}_{rng.randrange(fan_out)}" for level in range(depth))
+
+
+def generate_dataset(scenario, scale, work_dir, seed=1):
+    """Write the synthetic files and a CSV manifest; return (manifest path, files, bytes)."""
+    rng = random.Random(seed)
+    data_dir = work_dir / 'data'
+    data_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = work_dir / 'manifest.csv'
+
+    file_count = 0
+    total_bytes = 0
+    with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['FilePath', 'FileName', 'TargetFolder', 'Department', 'DocumentDate'])
+
+        for group, (count, min_kb, max_kb, depth, fan_out) in enumerate(SCENARIOS[scenario]):
+            for n in range(max(1, int(count * scale))):
+                size = rng.randint(min_kb, max_kb) * 1024
+                file_name = f"g{group}_{n:06d}.bin"
+                local_path = data_dir / file_name
+
+                with open(local_path, 'wb') as data_file:
+                    if size > 1024 * 1024:
+                        data_file.truncate(size)  # Sparse: content does not matter to the mock
+                    else:
+                        data_file.write(rng.randbytes(size))
+
+                writer.writerow([str(data_dir), file_name, random_folder(rng, depth, fan_out),
+                                 rng.choice(DEPARTMENTS),
+                                 f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"])
+                file_count += 1
+                total_bytes += size
+
+    return manifest_path, file_count, total_bytes
+
+
+def start_mock(args):
+    """Start a fresh mock server with the simulated network settings."""
+    mock = MockSharePoint(library=LIBRARY, latency_ms=args.latency_ms,
+                          bandwidth_mbps=args.bandwidth_mbps, throttle_rate=args.throttle_rate,
+                          throttle_status=args.throttle_status, retry_after=args.retry_after)
+    server = MockServer(mock, port=0)
+    server.start_background()
+    return mock, server
+
+
+def write_run_files(work_dir, server):
+    """Write the config and column mapping of a run; return their paths."""
+    config_path = work_dir / 'config.json'
+    with open(config_path, 'w') as f:
+        json.dump({'site_url': server.site_url, 'client_id': 'benchmark',
+                   'client_secret': 'benchmark', 'access_token': 'benchmark'}, f)
+
+    mapping_path = work_dir / 'column_mapping.json'
+    with open(mapping_path, 'w') as f:
+        json.dump({'Department': 'Department', 'DocumentDate': 'DocumentDate'}, f)
+    return config_path, mapping_path
+
+
+def run_once(args, work_dir, manifest_path, workers, chunk_mb):
+    """Run one sp_upload.py process against a fresh mock server; return a result row."""
+    mock, server = start_mock(args)
+
+    try:
+        config_path, mapping_path = write_run_files(work_dir, server)
+
+        journal_path = work_dir / f"journal_w{workers}_c{chunk_mb}.jsonl"
+        command = [sys.executable, '-c', BOOTSTRAP, str(int(chunk_mb * 1024 * 1024)),
+                   '--library', LIBRARY, '--source', str(manifest_path),
+                   '--config', str(config_path), '--mapping', str(mapping_path),
+                   '--workers', str(workers), '--journal', str(journal_path)]
+        completed = subprocess.run(command, cwd=Path(__file__).parent, capture_output=True,
+                                   text=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    metrics_file = None
+    for line in completed.stdout.splitlines():
+        if line.strip().startswith('Metrics:'):
+            metrics_file = line.split(':', 1)[1].strip()
+
+    if completed.returncode != 0 or not metrics_file:
+        print(completed.stdout[-2000:])
+        print(completed.stderr[-2000:])
+        raise RuntimeError(f"sp_upload.py failed (workers={workers}, chunk={chunk_mb}MB)")
+
+    with open(metrics_file, 'r', encoding='utf-8') as f:
+        metrics = json.load(f)
+
+    phases = metrics['phases']
+    return {
+        'Scenario': args.scenario,
+        'Workers': workers,
+        'ChunkMB': chunk_mb,
+        'Files': metrics['files'].get('SUCCESS', 0),
+        'Errors': metrics['files'].get('ERROR', 0),
+        'MB': round(metrics['bytes'] / 1024 / 1024, 1),
+        'Seconds': metrics['elapsed_seconds'],
+        'FilesPerSec': metrics['files_per_second'],
+        'MBps': metrics['mb_per_second'],
+        'Requests': metrics['requests']['total'],
+        'Retries': metrics['requests']['retries'],
+        'Throttled': metrics['requests']['throttled'],
+        'FolderMean': phases['folder']['mean_seconds'],
+        'TransferMean': phases['transfer']['mean_seconds'],
+        'TransferP95': phases['transfer']['p95_seconds'],
+        'MetadataMean': phases['metadata']['mean_seconds'],
+        'ServerRequests': mock.stats['requests'],
+        'MetricsFile': metrics_file,
+    }
+
+
+def preload_files(mock, manifest_path):
+    """Create the manifest's files in the mock library directly (no upload, no metadata)."""
+    with open(manifest_path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            folder_url = mock.root_url
+            for name in [part for part in row['TargetFolder'].split('/') if part]:
+                folder_url = mock.add_folder(folder_url, name)['ServerRelativeUrl']
+            mock.put_file(folder_url, row['FileName'], 0)
+
+
+def run_metadata_once(args, work_dir, manifest_path, batch_size):
+    """Run sp_upload.py --metadata-only against a fresh mock server that already
+    has the files (batch_size updates per request); return a result row."""
+    mock, server = start_mock(args)
+
+    try:
+        preload_files(mock, manifest_path)
+        config_path, mapping_path = write_run_files(work_dir, server)
+        command = [sys.executable, '-c', METADATA_BOOTSTRAP, str(batch_size),
+                   '--library', LIBRARY, '--source', str(manifest_path),
+                   '--config', str(config_path), '--mapping', str(mapping_path), '--metadata-only']
+        completed = subprocess.run(command, cwd=Path(__file__).parent, capture_output=True,
+                                   text=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    elapsed = None
+    for line in completed.stdout.splitlines():
+        if line.startswith('Elapsed:'):
+            elapsed = float(line.split(':', 1)[1])
+
+    if completed.returncode != 0 or elapsed is None:
+        print(completed.stdout[-2000:])
+        print(completed.stderr[-2000:])
+        raise RuntimeError(f"sp_upload.py --metadata-only failed (batch={batch_size})")
+
+    updates = mock.stats['item_updates']
+    return {
+        'Scenario': args.scenario,
+        'Mode': 'per item' if batch_size == 1 else '$batch',
+        'BatchSize': batch_size,
+        'Updated': updates,
+        'Seconds': round(elapsed, 2),
+        'UpdatesPerSec': round(updates / elapsed, 1) if elapsed else 0,
+        'ServerRequests': mock.stats['requests'],
+        'BatchedUpdates': mock.stats['batch_requests'],
+        'Throttled': mock.stats['throttled'],
+    }
+
+
+def print_results(results, columns):
+    widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in columns]
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in results:
+        print('  '.join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark sp_upload.py against the local mock SharePoint server',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+    python benchmark_upload.py --scenario small
+    python benchmark_upload.py --scenario small --workers 1 4 8 16 --latency-ms 50
+    python benchmark_upload.py --scenario large --chunk-mb 10 50 100 --bandwidth-mbps 50
+    python benchmark_upload.py --scenario mixed --scale 0.1 --throttle-rate 0.02
+    python benchmark_upload.py --scenario small --metadata-batch 1 20 100 --latency-ms 50
+        '''
+    )
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='small',
+                        help='Synthetic manifest to upload (default: small)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the scenario file counts (default: 1.0)')
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS,
+                        help=f'Worker counts to compare (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--chunk-mb', type=float, nargs='+', default=DEFAULT_CHUNK_MB,
+                        help=f'Chunk sizes in MB to compare for large files (default: {DEFAULT_CHUNK_MB})')
+    parser.add_argument('--metadata-batch', type=int, nargs='+', default=DEFAULT_METADATA_BATCH,
+                        help='Metadata updates per request to compare; 1 is one request per item, '
+                             f'0 skips the metadata runs (default: {DEFAULT_METADATA_BATCH})')
+    parser.add_argument('--latency-ms', type=float, default=20,
+                        help='Mock server latency per request in milliseconds (default: 20)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0,
+                        help='Mock server shared bandwidth in MB/s (default: unlimited)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests the mock server throttles (default: 0)')
+    parser.add_argument('--throttle-status', type=int, choices=[429, 503], default=429,
+                        help='Status code for throttled requests (default: 429)')
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help='Retry-After seconds on throttled requests (default: 1)')
+    parser.add_argument('--keep-files', action='store_true',
+                        help='Keep the generated dataset after the benchmark')
+
+    args = parser.parse_args()
+
+    output_dir = Path(__file__).parent.absolute() / "output"
+    output_dir.mkdir(exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix='sp_benchmark_'))
+
+    print("=" * 60)
+    print("SHAREPOINT UPLOAD BENCHMARK")
+    print("=" * 60)
+    print(f"Scenario: {args.scenario} (scale {args.scale})")
+    print(f"Mock network: {args.latency_ms}ms latency, "
+          f"{args.bandwidth_mbps or 'unlimited'} MB/s, {args.throttle_rate:.0%} throttled")
+
+    results = []
+    metadata_results = []
+    try:
+        manifest_path, file_count, total_bytes = generate_dataset(args.scenario, args.scale, work_dir)
+        print(f"Dataset: {file_count} files, {total_bytes / 1024 / 1024:.1f} MB in {work_dir}")
+        print("=" * 60)
+
+        # Chunk size only matters for files above the large-file threshold
+        chunk_sizes = args.chunk_mb if args.scenario in ('large', 'mixed') else args.chunk_mb[:1]
+        for workers, chunk_mb in itertools.product(args.workers, chunk_sizes):
+            print(f"Running: {workers} worker(s), {chunk_mb}MB chunks...")
+            result = run_once(args, work_dir, manifest_path, workers, chunk_mb)
+            print(f"  {result['Seconds']}s, {result['FilesPerSec']} files/s, {result['MBps']} MB/s")
+            results.append(result)
+
+        for batch_size in [size for size in args.metadata_batch if size > 0]:
+            print(f"Running: metadata only, {batch_size} update(s) per request...")
+            result = run_metadata_once(args, work_dir, manifest_path, batch_size)
+            print(f"  {result['Seconds']}s, {result['UpdatesPerSec']} updates/s, "
+                  f"{result['ServerRequests']} requests")
+            metadata_results.append(result)
+    finally:
+        if not args.keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    results_file = output_dir / f"benchmark_{args.scenario}_{timestamp}.csv"
+    with open(results_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+    print("=" * 60)
+    print_results(results, ['Workers', 'ChunkMB', 'Files', 'Errors', 'Seconds', 'FilesPerSec', 'MBps',
+                            'Requests', 'Retries', 'Throttled', 'TransferMean', 'TransferP95'])
+    if metadata_results:
+        metadata_file = output_dir / f"benchmark_{args.scenario}_metadata_{timestamp}.csv"
+        with open(metadata_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(metadata_results[0].keys()))
+            writer.writeheader()
+            writer.writerows(metadata_results)
+        print("-" * 60)
+        print_results(metadata_results, ['Mode', 'BatchSize', 'Updated', 'Seconds', 'UpdatesPerSec',
+                                         'ServerRequests', 'BatchedUpdates', 'Throttled'])
+    print("=" * 60)
+    print(f"Results saved to: {results_file}")
+    if metadata_results:
+        print(f"Metadata results saved to: {metadata_file}")
+
+
+if __name__ == "__main__":
+    main()
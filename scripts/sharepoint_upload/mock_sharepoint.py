@@ -0,0 +1,942 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+Local Mock SharePoint REST Server
+================================================================================
+
+Description:
+    Self-contained stand-in for the SharePoint Online REST endpoints used by
+    sp_upload.py, so the upload tool can be tested and benchmarked without a
+    tenant. State is kept in memory; file content is counted, not stored.
+
+Features:
+    - Context info, web, lists, fields and paged list items (with selected
+      field values), regional settings time zone (UTC)
+    - Folders (get, create) and files (add, get, list item fields)
+    - Chunked upload sessions (StartUpload / ContinueUpload / FinishUpload /
+      GetUploadStatus)
+    - List item updates (MERGE) and OData $batch requests
+    - Folder permissions: role definitions, site groups, EnsureUser,
+      BreakRoleInheritance and AddRoleAssignment
+    - Library as a v2.0 drive: paged delta listing with sizes and the
+      QuickXorHash of the uploaded content
+    - Configurable per-request latency and a shared bandwidth limit
+    - Injected 429 / 503 throttling with Retry-After
+    - Request, byte and throttle counters (GET /_mock/stats)
+
+Requirements:
+    Python 3.8+ (standard library only)
+
+Usage:
+    python mock_sharepoint.py
+    python mock_sharepoint.py --port 8080 --latency-ms 50 --bandwidth-mbps 20
+    python mock_sharepoint.py --throttle-rate 0.05 --retry-after 2
+
+    Then point config.json at the server, with any access token:
+    {
+        "site_url": "http://127.0.0.1:8080/sites/mock",
+        "client_id": "mock",
+        "client_secret": "mock",
+        "access_token": "mock"
+    }
+
+--------------------------------------------------------------------------------
+Author:     Ishak Ahmad (ishak.ahmad@gmail.com)
+Created:    2025
+Version:    1.0.0
+License:    Proprietary - All Rights Reserved
+
+Copyright (c) 2025 Ishak Ahmad. All rights reserved.
+================================================================================
+"""
+
+import re
+import sys
+import base64
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from email import message_from_bytes
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote, parse_qs, quote
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_SITE_PATH = "/sites/mock"
+DEFAULT_LIBRARY = "Documents"
+DEFAULT_LIBRARY_FOLDER = "Shared Documents"
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_RETRY_AFTER = 1
+
+# Editable fields of the mock library (InternalName, TypeAsString, extra properties)
+LIBRARY_FIELDS = [
+    ('Title', 'Text', {'MaxLength': 255}),
+    ('Department', 'Choice', {'Choices': {'results': ['Finance', 'HR', 'IT', 'Legal']}}),
+    ('Tags', 'MultiChoice', {'Choices': {'results': ['Draft', 'Final', 'Archive']},
+                             'FillInChoice': True}),
+    ('DocumentDate', 'DateTime', {}),
+    ('Amount', 'Number', {}),
+    ('Reviewed', 'Boolean', {}),
+    ('Reference', 'URL', {}),
+    ('Description', 'Note', {}),
+]
+
+# Permission levels (Name, Id) and site groups of the mock site
+ROLE_DEFINITIONS = [('Full Control', 1073741829), ('Design', 1073741828), ('Edit', 1073741830),
+                    ('Contribute', 1073741827), ('Read', 1073741826)]
+SITE_GROUPS = ['Mock Owners', 'Mock Members', 'Mock Visitors']
+
+# System fields returned alongside the editable ones
+SYSTEM_FIELDS = [
+    ('ID', 'Counter', {'ReadOnlyField': True}),
+    ('FileLeafRef', 'File', {}),
+    ('FileRef', 'Lookup', {'ReadOnlyField': True}),
+    ('ContentType', 'Computed', {}),
+    ('_UIVersionString', 'Text', {'ReadOnlyField': True}),
+    ('MetaInfo', 'Lookup', {'Hidden': True}),
+]
+
+
+# ============================================================================
+# REQUEST PARSING
+# ============================================================================
+
+def split_segments(path):
+    """Split a REST path on '/' outside of parentheses and quotes."""
+    segments = []
+    current = []
+    depth = 0
+    quoted = False
+    for char in path:
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == '/' and depth == 0 and not quoted:
+            segments.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    segments.append(''.join(current))
+    return [segment for segment in segments if segment]
+
+
+def parse_segment(segment):
+    """Parse "Name(args)" into (lower-case name, positional args, named args)."""
+    match = re.match(r"^([^(]+)(?:\((.*)\))?$", segment, re.DOTALL)
+    name = match.group(1).lower()
+    positional = []
+    named = {}
+    for key, value in re.findall(r"(?:(\w+)=)?((?:guid)?'(?:[^']|'')*'|[^,]+)", match.group(2) or ''):
+        value = value.strip()
+        if value.startswith('guid'):
+            value = value[4:]
+        if value.startswith("'"):
+            value = value[1:-1].replace("''", "'")
+        if key:
+            named[key.lower()] = value
+        else:
+            positional.append(value)
+    return name, positional, named
+
+
+class QuickXorHash:
+    """QuickXorHash of uploaded content, reported in drive listings like SharePoint does.
+
+    Byte n is XORed into a 160-bit circular register at bit (n * 11) mod 160.
+    Each body is XOR-folded into 160 columns with big-integer halving (the
+    standard library has no vector types), then the columns are shifted in.
+    """
+
+    WIDTH = 160
+
+    def __init__(self):
+        self.columns = bytes(self.WIDTH)
+        self.length = 0
+
+    def update(self, data):
+        if not data:
+            return
+        # Zero padding up to 160 * 2^n bytes does not change an XOR fold
+        size = self.WIDTH
+        while size < len(data):
+            size *= 2
+        value = int.from_bytes(data, 'little')
+        while size > self.WIDTH:
+            size //= 2
+            value = (value & ((1 << (size * 8)) - 1)) ^ (value >> (size * 8))
+        folded = value.to_bytes(self.WIDTH, 'little')
+
+        phase = self.length % self.WIDTH
+        folded = folded[self.WIDTH - phase:] + folded[:self.WIDTH - phase]
+        self.columns = bytes(a ^ b for a, b in zip(self.columns, folded))
+        self.length += len(data)
+
+    def b64digest(self):
+        register = 0
+        for column, value in enumerate(self.columns):
+            shifted = value << (column * 11 % self.WIDTH)
+            register ^= (shifted & ((1 << self.WIDTH) - 1)) ^ (shifted >> self.WIDTH)
+        result = bytearray(register.to_bytes(self.WIDTH // 8, 'little'))
+        for idx, value in enumerate(self.length.to_bytes(8, 'little')):
+            result[12 + idx] ^= value
+        return base64.b64encode(bytes(result)).decode('ascii')
+
+
+class MockError(Exception):
+    """An error response in SharePoint's JSON error format."""
+
+    def __init__(self, status, message, code="-1, Microsoft.SharePoint.SPException"):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.code = code
+
+    def to_json(self):
+        return {'error': {'code': self.code, 'message': {'lang': 'en-US', 'value': self.message}}}
+
+
+# ============================================================================
+# MOCK STATE
+# ============================================================================
+
+class MockSharePoint:
+    """In-memory site with one document library, plus simulated network conditions."""
+
+    def __init__(self, site_path=DEFAULT_SITE_PATH, library=DEFAULT_LIBRARY,
+                 library_folder=DEFAULT_LIBRARY_FOLDER, latency_ms=0, bandwidth_mbps=0,
+                 throttle_rate=0.0, throttle_status=429, retry_after=DEFAULT_RETRY_AFTER,
+                 page_size=DEFAULT_PAGE_SIZE):
+        self.site_path = site_path.rstrip('/')
+        self.library = library
+        self.root_url = f"{self.site_path}/{library_folder}"
+        self.latency = latency_ms / 1000.0
+        self.bytes_per_second = bandwidth_mbps * 1024 * 1024
+        self.throttle_rate = throttle_rate
+        self.throttle_status = throttle_status
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.schema_version = 1  # List ETag; bump after changing the library fields
+
+        self.folders = {self.root_url.lower(): self.root_url}
+        self.files = {}
+        self.items = {}
+        self.sessions = {}
+        self.next_item_id = 1
+        self.stats = {'requests': 0, 'batch_requests': 0, 'bytes_received': 0,
+                      'throttled': 0, 'files': 0, 'folders': 0, 'item_updates': 0, 'copies': 0,
+                      'role_breaks': 0, 'role_assignments': 0}
+        self.principals = {}  # Lower-case login name or group title -> principal JSON
+        self.next_principal_id = 3
+        self.scopes = {}  # Folder URL (lower) -> {(principal ID, role definition ID)} if unique
+        self._lock = threading.Lock()
+        self._link_lock = threading.Lock()
+        self._link_free_at = 0.0
+        for title in SITE_GROUPS:
+            self.ensure_principal(title, 8)
+
+    # ------------------------------------------------------------------
+    # Simulated network
+    # ------------------------------------------------------------------
+
+    def simulate_transfer(self, byte_count):
+        """Delay for per-request latency and the body's share of the shared link."""
+        delay = self.latency
+        if self.bytes_per_second and byte_count:
+            # All connections share one link: reserve the next free slot on it
+            with self._link_lock:
+                start = max(time.monotonic(), self._link_free_at)
+                self._link_free_at = start + byte_count / self.bytes_per_second
+                delay = max(delay, self._link_free_at - time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_throttle(self):
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            with self._lock:
+                self.stats['throttled'] += 1
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Entities
+    # ------------------------------------------------------------------
+
+    def object_id(self, kind, name):
+        """Stable GUID for a web, list, field or folder of the mock site."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{kind}:{self.site_path}/{name}".lower()))
+
+    def web_json(self, host_url=''):
+        return {'__metadata': {'type': 'SP.Web'}, 'Id': self.object_id('web', ''),
+                'Title': 'Mock Site', 'ServerRelativeUrl': self.site_path,
+                'Url': f"{host_url}{self.site_path}"}
+
+    def list_json(self):
+        return {'__metadata': {'type': 'SP.List', 'etag': f'"{self.schema_version}"'},
+                'Id': self.object_id('list', self.library),
+                'Title': self.library,
+                'BaseTemplate': 101, 'ItemCount': len(self.files),
+                'ListItemEntityTypeFullName': 'SP.Data.Shared_x0020_DocumentsItem',
+                'RootFolder': self.folder_json(self.root_url)}
+
+    def fields_json(self):
+        results = []
+        for name, field_type, extra in SYSTEM_FIELDS + LIBRARY_FIELDS:
+            field = {'__metadata': {'type': 'SP.Field'}, 'Id': self.object_id('field', name),
+                     'InternalName': name, 'Title': name,
+                     'TypeAsString': field_type, 'Hidden': False, 'ReadOnlyField': False,
+                     'Required': False}
+            field.update(extra)
+            results.append(field)
+        return {'results': results}
+
+    def folder_json(self, url):
+        return {'__metadata': {'type': 'SP.Folder'}, 'Name': url.rsplit('/', 1)[-1],
+                'ServerRelativeUrl': url, 'UniqueId': self.object_id('folder', url), 'Exists': True}
+
+    def file_json(self, entry):
+        return {'__metadata': {'type': 'SP.File'}, 'Name': entry['url'].rsplit('/', 1)[-1],
+                'ServerRelativeUrl': entry['url'], 'Length': str(entry['length']),
+                'TimeLastModified': entry['modified'], 'UniqueId': entry['unique_id'],
+                'Exists': True}
+
+    def item_json(self, item_id):
+        item = self.items[item_id]
+        data = {'__metadata': {'type': 'SP.Data.Shared_x0020_DocumentsItem',
+                               'etag': f'"{item["version"]}"'},
+                'Id': item_id, 'ID': item_id, 'FileRef': item['url'], 'FSObjType': 0}
+        data.update(item['fields'])
+        return data
+
+    def ensure_principal(self, login_name, principal_type):
+        """Return the user (1) or group (8) with this login name, adding it if new."""
+        with self._lock:
+            principal = self.principals.get(login_name.lower())
+            if principal is None:
+                title = login_name.rsplit('|', 1)[-1]
+                principal = {'__metadata': {'type': 'SP.Group' if principal_type == 8 else 'SP.User'},
+                             'Id': self.next_principal_id, 'Title': title,
+                             'LoginName': login_name, 'PrincipalType': principal_type}
+                self.principals[login_name.lower()] = principal
+                self.next_principal_id += 1
+            return principal
+
+    @staticmethod
+    def hash_body(body):
+        hasher = QuickXorHash()
+        hasher.update(body)
+        return hasher.b64digest()
+
+    def get_folder(self, url):
+        folder = self.folders.get(url.rstrip('/').lower())
+        if folder is None:
+            raise MockError(404, "File Not Found.",
+                            "-2147024894, System.IO.FileNotFoundException")
+        return folder
+
+    def get_file(self, url):
+        entry = self.files.get(url.lower())
+        if entry is None:
+            raise MockError(404, "File Not Found.",
+                            "-2147024894, System.IO.FileNotFoundException")
+        return entry
+
+    def get_file_by_id(self, unique_id):
+        for entry in list(self.files.values()):
+            if entry['unique_id'] == unique_id.lower():
+                return entry
+        raise MockError(404, "File Not Found.", "-2147024894, System.IO.FileNotFoundException")
+
+    def add_folder(self, parent_url, name):
+        parent = self.get_folder(parent_url)
+        url = f"{parent}/{name.strip('/')}"
+        with self._lock:
+            if url.lower() not in self.folders:
+                self.folders[url.lower()] = url
+                self.stats['folders'] += 1
+        return self.folder_json(url)
+
+    def put_file(self, folder_url, name, length, quick_xor=None):
+        folder = self.get_folder(folder_url)
+        url = f"{folder}/{name}"
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._lock:
+            entry = self.files.get(url.lower())
+            if entry is None:
+                item_id = self.next_item_id
+                self.next_item_id += 1
+                entry = {'url': url, 'item_id': item_id, 'unique_id': str(uuid.uuid4())}
+                self.items[item_id] = {'url': url, 'fields': {}, 'version': 1}
+                self.files[url.lower()] = entry
+                self.stats['files'] += 1
+            else:
+                self.items[entry['item_id']]['version'] += 1
+            entry['length'] = length
+            entry['modified'] = modified
+            entry['quick_xor'] = quick_xor
+        return entry
+
+    def list_items(self, query):
+        """One page of library items in nometadata format with odata.nextLink."""
+        top = int(query.get('$top', [self.page_size])[0])
+        skip = int(query.get('$skiptoken', ['0'])[0] or 0)
+        entries = sorted(self.files.values(), key=lambda entry: entry['item_id'],
+                         reverse='desc' in query.get('$orderby', [''])[0].lower())
+        page = entries[skip:skip + top]
+        selected = {name.strip().lower() for name in ','.join(query.get('$select', [])).split(',')}
+        field_types = {name: field_type for name, field_type, _ in LIBRARY_FIELDS if name.lower() in selected}
+        values = []
+        for entry in page:
+            value = {'ID': entry['item_id'], 'FileRef': entry['url'], 'FSObjType': 0,
+                     'File': {'Length': str(entry['length']),
+                              'TimeLastModified': entry['modified']}}
+            fields = self.items[entry['item_id']]['fields']
+            for name, field_type in field_types.items():
+                value[name] = self.field_value_json(field_type, fields.get(name))
+            values.append(value)
+        return values, (skip + top if skip + top < len(entries) else None)
+
+    @staticmethod
+    def field_value_json(field_type, value):
+        """A stored field value as a nometadata listing returns it (dates in UTC, the site's zone)."""
+        if isinstance(value, dict):
+            value = {key: item for key, item in value.items() if key != '__metadata'}
+            if 'results' in value:
+                value = value['results']
+        if field_type == 'DateTime' and value and not str(value).endswith('Z'):
+            value = f"{value}Z"
+        return value
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def handle(self, method, path, query, headers, body):
+        """Dispatch one REST call. Returns (status, json or None, extra headers)."""
+        api_prefix = f"{self.site_path}/_api/".lower()
+        if not path.lower().startswith(api_prefix):
+            raise MockError(404, f"Not found: {path}")
+
+        method = headers.get('X-HTTP-Method', method).upper()
+        segments = [parse_segment(segment) for segment in split_segments(path[len(api_prefix):])]
+        if not segments:
+            raise MockError(404, "Empty request")
+
+        name, args, named = segments[0]
+        if name == 'contextinfo':
+            return 200, {'d': {'GetContextWebInformation': {
+                'FormDigestValue': f"0x{uuid.uuid4().hex.upper()},{datetime.now():%d %b %Y %H:%M:%S} -0000",
+                'FormDigestTimeoutSeconds': 1800,
+                'WebFullUrl': self.site_path}}}, {}
+        if name == 'v2.0':
+            return self._drive_request(segments[1:], query, headers.get('Host-Url', ''))
+        if name != 'web':
+            raise MockError(404, f"Unsupported resource: {name}")
+
+        resource = ('web', None)
+        result = self.web_json(headers.get('Host-Url', ''))
+        for name, args, named in segments[1:]:
+            resource, result = self._step(resource, name, args, named, method, query, headers, body)
+
+        if isinstance(result, tuple):
+            return result
+        expand = ','.join(query.get('$expand', [])).lower()
+        if resource[0] == 'file' and result and 'listitemallfields' in expand:
+            result['ListItemAllFields'] = self.item_json(self.get_file(resource[1])['item_id'])
+        if result is None:
+            return 204, None, {}
+        return 200, {'d': result}, {}
+
+    def _drive_request(self, segments, query, host_url):
+        """v2.0 API: the library as a drive, listed through its (paged) delta feed."""
+        drive_id = f"b!{self.object_id('drive', self.root_url)}"
+        names = [name for name, _, _ in segments]
+        if names == ['drives']:
+            return 200, {'value': [{'id': drive_id, 'name': self.library,
+                                    'driveType': 'documentLibrary',
+                                    'webUrl': f"{host_url}{quote(self.root_url)}"}]}, {}
+        if names != ['drives', drive_id.lower(), 'root', 'delta']:
+            raise MockError(404, "Item not found", "itemNotFound")
+
+        def folder_item(url):
+            item = {'id': self.object_id('folder', url), 'name': url.rsplit('/', 1)[-1]}
+            if url.lower() == self.root_url.lower():
+                item['root'] = {}
+            else:
+                item['folder'] = {}
+                item['parentReference'] = {'id': self.object_id('folder', url.rsplit('/', 1)[0])}
+            return item
+
+        items = [folder_item(url) for _, url in sorted(self.folders.items())]
+        for entry in sorted(list(self.files.values()), key=lambda entry: entry['item_id']):
+            hashes = {'quickXorHash': entry['quick_xor']} if entry['quick_xor'] else {}
+            items.append({'id': entry['unique_id'], 'name': entry['url'].rsplit('/', 1)[-1],
+                          'size': entry['length'], 'file': {'hashes': hashes},
+                          'parentReference': {'id': self.object_id(
+                              'folder', entry['url'].rsplit('/', 1)[0])}})
+
+        top = int(query.get('$top', [self.page_size])[0])
+        skip = int(query.get('token', ['0'])[0] or 0)
+        data = {'value': items[skip:skip + top]}
+        link = f"{host_url}{quote(self.site_path)}/_api/v2.0/drives/{drive_id}/root/delta"
+        if skip + top < len(items):
+            data['@odata.nextLink'] = f"{link}?token={skip + top}&$top={top}"
+        else:
+            data['@odata.deltaLink'] = f"{link}?token=latest"
+        return 200, data, {}
+
+    def _step(self, resource, name, args, named, method, query, headers, body):
+        """Resolve one path segment against the current resource."""
+        kind, key = resource
+
+        if kind == 'web':
+            if name == 'lists':
+                return ('lists', None), None
+            if name in ('getfolderbyserverrelativeurl', 'getfolderbyserverrelativepath'):
+                url = named.get('decodedurl') or args[0]
+                return ('folder', url), self.folder_json(self.get_folder(url))
+            if name in ('getfilebyserverrelativeurl', 'getfilebyserverrelativepath'):
+                url = named.get('decodedurl') or args[0]
+                return ('file', url), None if method == 'POST' else self.file_json(self.get_file(url))
+            if name == 'getfilebyid':
+                entry = self.get_file_by_id(args[0])
+                return ('file', entry['url']), self.file_json(entry)
+            if name == 'roledefinitions':
+                return ('roledefinitions', None), {'results': [
+                    {'__metadata': {'type': 'SP.RoleDefinition'}, 'Id': role_id, 'Name': role_name}
+                    for role_name, role_id in ROLE_DEFINITIONS]}
+            if name == 'sitegroups':
+                return ('sitegroups', None), {'results': [
+                    principal for principal in self.principals.values() if principal['PrincipalType'] == 8]}
+            if name == 'regionalsettings':
+                return ('regionalsettings', None), None
+            if name == 'ensureuser':
+                params = {key.lower(): value for key, value in json.loads(body or b'{}').items()}
+                login_name = params.get('logonname') or named.get('logonname') or args[0]
+                return ('user', login_name), self.ensure_principal(login_name, 1)
+
+        elif kind == 'regionalsettings' and name == 'timezone':
+            return ('timezone', None), {'__metadata': {'type': 'SP.TimeZone'}, 'Id': 39,
+                                        'Description': '(UTC) Coordinated Universal Time',
+                                        'Information': {'Bias': 0, 'DaylightBias': 0, 'StandardBias': 0}}
+
+        elif kind == 'roledefinitions' and name == 'getbyname':
+            for role_name, role_id in ROLE_DEFINITIONS:
+                if role_name.lower() == args[0].lower():
+                    return ('roledefinition', role_id), {
+                        '__metadata': {'type': 'SP.RoleDefinition'}, 'Id': role_id, 'Name': role_name}
+            raise MockError(404, "The permission level cannot be found.",
+                            "-2146232832, Microsoft.SharePoint.SPException")
+
+        elif kind == 'sitegroups' and name == 'getbyname':
+            principal = self.principals.get(args[0].lower())
+            if principal is None or principal['PrincipalType'] != 8:
+                raise MockError(404, "Group cannot be found.",
+                                "-2146232832, Microsoft.SharePoint.SPException")
+            return ('group', principal['Id']), principal
+
+        elif kind == 'lists' and name == 'getbytitle':
+            if args[0].lower() != self.library.lower():
+                raise MockError(404, f"List '{args[0]}' does not exist at site with URL "
+                                     f"'{self.site_path}'.",
+                                "-1, System.ArgumentException")
+            return ('list', None), self.list_json()
+
+        elif kind == 'list':
+            if name == 'rootfolder':
+                return ('folder', self.root_url), self.folder_json(self.root_url)
+            if name == 'fields':
+                return ('fields', None), self.fields_json()
+            if name == 'items':
+                if args:
+                    return self._item(int(args[0]), method, body)
+                values, next_skip = self.list_items(query)
+                if 'nometadata' in headers.get('Accept', ''):
+                    data = {'value': values}
+                    if next_skip is not None:
+                        list_title = quote(self.library)
+                        data['odata.nextLink'] = (
+                            f"{headers.get('Host-Url', '')}{self.site_path}/_api/web/lists/"
+                            f"getbytitle('{list_title}')/items?$skiptoken={next_skip}"
+                            f"&$top={query.get('$top', [self.page_size])[0]}")
+                    return ('items', None), (200, data, {})
+                return ('items', None), {'results': values}
+            if name == 'getitembyid':
+                return self._item(int(args[0]), method, body)
+
+        elif kind == 'folder':
+            if name == 'folders':
+                return ('folders', key), None
+            if name == 'files':
+                return ('files', key), None
+            if name == 'listitemallfields':
+                return ('folderitem', self.get_folder(key)), {}
+
+        elif kind == 'folderitem':
+            if name == 'breakroleinheritance':
+                with self._lock:
+                    if key.lower() not in self.scopes:
+                        self.scopes[key.lower()] = set()
+                        self.stats['role_breaks'] += 1
+                return ('folderitem', key), None
+            if name == 'roleassignments':
+                return ('roleassignments', key), {'results': [
+                    {'PrincipalId': principal_id, 'RoleDefinitionId': role_id}
+                    for principal_id, role_id in sorted(self.scopes.get(key.lower(), ()))]}
+            if name == 'parentlist':
+                return ('list', None), self.list_json()
+
+        elif kind == 'roleassignments' and name == 'addroleassignment':
+            scope = self.scopes.get(key.lower())
+            if scope is None:
+                raise MockError(400, "This operation is not allowed on an object that inherits "
+                                     "permissions.", "-2146232832, Microsoft.SharePoint.SPException")
+            principal_id, role_id = int(named['principalid']), int(named['roledefid'])
+            if not any(principal['Id'] == principal_id for principal in self.principals.values()):
+                raise MockError(400, "Principal not found.")
+            with self._lock:
+                scope.add((principal_id, role_id))
+                self.stats['role_assignments'] += 1
+            return ('roleassignments', key), None
+
+        elif kind == 'folders' and name == 'add':
+            url = named.get('url') or args[0]
+            folder = self.add_folder(key, url)
+            return ('folder', folder['ServerRelativeUrl']), folder
+
+        elif kind == 'files':
+            if name == 'add':
+                url = named.get('url') or args[0]
+                entry = self.put_file(key, url, len(body), self.hash_body(body))
+                return ('file', entry['url']), self.file_json(entry)
+            if name == 'addusingpath':
+                url = named.get('decodedurl') or args[0]
+                entry = self.put_file(key, url, len(body), self.hash_body(body))
+                return ('file', entry['url']), self.file_json(entry)
+
+        elif kind == 'file':
+            if name == 'listitemallfields':
+                return self._item(self.get_file(key)['item_id'], method, body)
+            return self._file_operation(key, name, named, body)
+
+        elif kind == 'item' and name == 'parentlist':
+            return ('list', None), self.list_json()
+
+        raise MockError(400, f"Unsupported request segment '{name}' on {kind}")
+
+    def _item(self, item_id, method, body):
+        if item_id not in self.items:
+            raise MockError(404, "Item does not exist.", "-2130575338, System.ArgumentException")
+        if method in ('MERGE', 'PATCH'):
+            values = json.loads(body or b'{}')
+            values.pop('__metadata', None)
+            with self._lock:
+                self.items[item_id]['fields'].update(values)
+                self.items[item_id]['version'] += 1
+                self.stats['item_updates'] += 1
+            return ('item', item_id), None
+        return ('item', item_id), self.item_json(item_id)
+
+    def _file_operation(self, url, name, named, body):
+        """Upload session and copy operations on a file."""
+        upload_id = named.get('uploadid')
+        if name == 'startupload':
+            entry = self.get_file(url)
+            with self._lock:
+                self.sessions[upload_id] = {'url': entry['url'], 'offset': len(body),
+                                            'hash': QuickXorHash()}
+                self.sessions[upload_id]['hash'].update(body)
+            return ('file', url), {'StartUpload': str(len(body))}
+
+        if name in ('continueupload', 'finishupload'):
+            session = self.sessions.get(upload_id)
+            if session is None or session['url'].lower() != url.lower():
+                raise MockError(404, "The upload session was not found.",
+                                "-2147018894, Microsoft.SharePoint.SPFileUploadSessionNotFoundException")
+            offset = int(named.get('fileoffset', 0))
+            if offset != session['offset']:
+                raise MockError(400, f"Invalid file offset {offset}, expected {session['offset']}.",
+                                "-2147018895, Microsoft.SharePoint.SPInvalidFileUploadOffsetException")
+            with self._lock:
+                session['offset'] += len(body)
+                session['hash'].update(body)
+            if name == 'continueupload':
+                return ('file', url), {'ContinueUpload': str(session['offset'])}
+
+            with self._lock:
+                self.sessions.pop(upload_id, None)
+            folder_url, file_name = session['url'].rsplit('/', 1)
+            entry = self.put_file(folder_url, file_name, session['offset'],
+                                  session['hash'].b64digest())
+            return ('file', url), self.file_json(entry)
+
+        if name == 'getuploadstatus':
+            session = self.sessions.get(upload_id)
+            if session is None:
+                raise MockError(404, "The upload session was not found.",
+                                "-2147018894, Microsoft.SharePoint.SPFileUploadSessionNotFoundException")
+            return ('file', url), {'__metadata': {'type': 'SP.UploadStatus'},
+                                   'ExpectedContentRange': f"{session['offset']}-",
+                                   'UploadId': upload_id}
+
+        if name in ('copyto', 'copytousingpath'):
+            params = json.loads(body or b'{}')
+            params = {key.lower(): value for key, value in params.items()}
+            params.update(named)
+            new_url = params.get('strnewurl') or params.get('decodedurl')
+            overwrite = str(params.get('boverwrite', False)).lower() == 'true'
+            source = self.get_file(url)
+            if new_url.lower() in self.files and not overwrite:
+                raise MockError(400, f"A file with the name {new_url} already exists.",
+                                "-2130575257, Microsoft.SharePoint.SPException")
+            folder_url, file_name = new_url.rsplit('/', 1)
+            entry = self.put_file(folder_url, file_name, source['length'], source['quick_xor'])
+            with self._lock:
+                # Copies keep the source's field values
+                self.items[entry['item_id']]['fields'] = dict(self.items[source['item_id']]['fields'])
+                self.stats['copies'] += 1
+            return ('file', url), None
+
+        raise MockError(400, f"Unsupported file operation '{name}'")
+
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end: auth check, throttling, latency and $batch handling."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockSharePoint/1.0'
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_HEAD(self):
+        # ACS realm discovery
+        self.send_response(401)
+        self.send_header('WWW-Authenticate', 'Bearer realm="00000000-0000-0000-0000-000000000000",'
+                                             'client_id="00000003-0000-0ff1-ce00-000000000000"')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        self.send_response(status)
+        if data is not None:
+            self.send_header('Content-Type', 'application/json;odata=verbose;charset=utf-8')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        mock = self.server.mock
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+
+        with mock._lock:
+            mock.stats['requests'] += 1
+            mock.stats['bytes_received'] += len(body)
+
+        if path == '/_mock/stats':
+            with mock._lock:
+                self._send_json(200, dict(mock.stats))
+            return
+
+        site = self.server.site_for(path)
+
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send_json(401, MockError(401, "Unsupported app only token.").to_json())
+            return
+
+        if mock.should_throttle():
+            self._send_json(mock.throttle_status,
+                            MockError(mock.throttle_status, "The request has been throttled.").to_json(),
+                            {'Retry-After': str(mock.retry_after)})
+            return
+
+        headers = {name: value for name, value in self.headers.items()}
+        headers['Host-Url'] = f"http://{self.headers.get('Host')}"
+        mock.simulate_transfer(len(body))
+        if path.lower().endswith('/_api/$batch'):
+            self._handle_batch(site, headers, body)
+            return
+
+        try:
+            status, data, extra = site.handle(method, path, parse_qs(parts.query), headers, body)
+        except MockError as e:
+            status, data, extra = e.status, e.to_json(), {}
+        self._send_json(status, data, extra)
+
+    def _handle_batch(self, site, headers, body):
+        """Run each part of an OData $batch and return a flat multipart response."""
+        mock = self.server.mock
+        message = message_from_bytes(
+            f"Content-Type: {headers.get('Content-Type')}\r\n\r\n".encode('utf-8') + body)
+
+        requests_in_batch = []
+        for part in message.get_payload():
+            if part.is_multipart():
+                requests_in_batch.extend(part.get_payload())  # Change set
+            else:
+                requests_in_batch.append(part)
+
+        boundary = f"batchresponse_{uuid.uuid4()}"
+        lines = []
+        for part in requests_in_batch:
+            raw = part.get_payload(decode=True).decode('utf-8').replace('\r\n', '\n')
+            head, _, sub_body = raw.partition('\n\n')
+            head_lines = head.strip().split('\n')
+            # The URL may hold unencoded spaces ("Shared Documents"); the version is last
+            sub_method, sub_target = head_lines[0].split(' ', 1)
+            sub_url = sub_target.rsplit(' ', 1)[0]
+            sub_headers = dict(line.split(':', 1) for line in head_lines[1:] if ':' in line)
+            sub_headers = {name.strip(): value.strip() for name, value in sub_headers.items()}
+            sub_headers['Host-Url'] = headers['Host-Url']
+            sub_parts = urlsplit(sub_url)
+
+            try:
+                status, data, _ = site.handle(sub_method, unquote(sub_parts.path),
+                                              parse_qs(sub_parts.query), sub_headers,
+                                              sub_body.strip().encode('utf-8'))
+            except MockError as e:
+                status, data = e.status, e.to_json()
+            with mock._lock:
+                mock.stats['batch_requests'] += 1
+
+            reason = self.responses.get(status, ('',))[0]
+            lines += [f"--{boundary}", "Content-Type: application/http",
+                      "Content-Transfer-Encoding: binary", "",
+                      f"HTTP/1.1 {status} {reason}"]
+            if data is not None:
+                lines += ["Content-Type: application/json;odata=verbose;charset=utf-8", "",
+                          json.dumps(data)]
+            lines.append("")
+        lines.append(f"--{boundary}--")
+
+        response = '\r\n'.join(lines).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f"multipart/mixed; boundary={boundary}")
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded HTTP server bound to a MockSharePoint instance.
+
+    Extra sites (each a MockSharePoint with its own library) are served on the
+    same host by site path; network simulation and stats stay on the main mock.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, mock, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False, extra_sites=()):
+        super().__init__((host, port), MockRequestHandler)
+        self.mock = mock
+        self.verbose = verbose
+        self.sites = sorted([mock] + list(extra_sites), key=lambda site: len(site.site_path),
+                            reverse=True)
+
+    def site_for(self, path):
+        """Return the site whose path prefixes the request path (default: the main mock)."""
+        path = path.lower()
+        for site in self.sites:
+            if path.startswith(site.site_path.lower() + '/'):
+                return site
+        return self.mock
+
+    @property
+    def site_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{self.mock.site_path}"
+
+    def start_background(self):
+        """Serve from a daemon thread (for use by the benchmark harness)."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Local mock SharePoint REST server for testing and benchmarking sp_upload.py',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+    python mock_sharepoint.py
+    python mock_sharepoint.py --port 8080 --latency-ms 50 --bandwidth-mbps 20
+    python mock_sharepoint.py --throttle-rate 0.05 --throttle-status 503 --retry-after 2
+        '''
+    )
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Bind address (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--site-path', default=DEFAULT_SITE_PATH,
+                        help=f'Server-relative site path (default: {DEFAULT_SITE_PATH})')
+    parser.add_argument('--library', default=DEFAULT_LIBRARY,
+                        help=f'Document library title (default: {DEFAULT_LIBRARY})')
+    parser.add_argument('--extra-site', action='append', default=[], metavar='PATH[=LIBRARY]',
+                        help='Also serve another site, e.g. /sites/hr=Policies (can be repeated)')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='Added latency per request in milliseconds (default: 0)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0,
+                        help='Shared upload bandwidth limit in MB/s (default: unlimited)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests rejected as throttled, 0-1 (default: 0)')
+    parser.add_argument('--throttle-status', type=int, choices=[429, 503], default=429,
+                        help='Status code for throttled requests (default: 429)')
+    parser.add_argument('--retry-after', type=int, default=DEFAULT_RETRY_AFTER,
+                        help=f'Retry-After seconds on throttled requests (default: {DEFAULT_RETRY_AFTER})')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Log every request')
+
+    args = parser.parse_args()
+
+    mock = MockSharePoint(args.site_path, args.library, latency_ms=args.latency_ms,
+                          bandwidth_mbps=args.bandwidth_mbps, throttle_rate=args.throttle_rate,
+                          throttle_status=args.throttle_status, retry_after=args.retry_after)
+    extra_sites = []
+    for value in args.extra_site:
+        site_path, _, library = value.partition('=')
+        extra_sites.append(MockSharePoint(site_path, library or DEFAULT_LIBRARY))
+    server = MockServer(mock, args.host, args.port, args.verbose, extra_sites)
+
+    print(f"Mock SharePoint site: {server.site_url}")
+    print(f"Library: {mock.library} ({mock.root_url})")
+    for site in extra_sites:
+        print(f"Extra site: {server.site_url[:-len(mock.site_path)]}{site.site_path} "
+              f"(library: {site.library})")
+    print(f"Stats: http://{args.host}:{server.server_address[1]}/_mock/stats")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+        print(json.dumps(mock.stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SharePoint Upload Smoke Tests
+================================================================================
+
+Description:
+    End-to-end smoke tests of the command line tools against the local mock
+    SharePoint server (mock_sharepoint.py). Each test starts a fresh mock
+    server, writes a small manifest and runs the real entry points in a
+    subprocess, so routing, metadata conversion, pre-flight, upload,
+    metadata-only updates and package builds are exercised together.
+
+Features:
+    - Pre-flight plan counts only rows that can be uploaded
+    - Upload with metadata, then --metadata-only (changed fields only, in a
+      $batch request; a second run finds everything up to date)
+    - Migration API package export-schema, build and validate
+    - Manifests with bare-URL Hyperlink cells (no ", description" part)
+
+Requirements:
+    Same as sp_upload.py (the mock server uses the standard library only)
+
+Usage:
+    python smoke_test.py
+    python -m pytest smoke_test.py
+
+--------------------------------------------------------------------------------
+Author:     Ishak Ahmad (ishak.ahmad@gmail.com)
+Created:    2025
+Version:    1.0.0
+License:    Proprietary - All Rights Reserved
+
+Copyright (c) 2025 Ishak Ahmad. All rights reserved.
+================================================================================
+"""
+
+import re
+import sys
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+from pathlib import Path
+
+from mock_sharepoint import MockSharePoint, MockServer
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+LIBRARY = "Documents"
+SCRIPT_DIR = Path(__file__).parent.absolute()
+GOOD_FILES = 5
+COLUMN_MAPPING = {'Department': 'Department', 'Link': 'Reference'}
+
+
+class SmokeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix='sp_smoke_'))
+        self.mock = MockSharePoint(library=LIBRARY)
+        self.server = MockServer(self.mock, port=0)
+        self.server.start_background()
+
+        self.config_path = self.work_dir / 'config.json'
+        with open(self.config_path, 'w') as f:
+            json.dump({'site_url': self.server.site_url, 'client_id': 'smoke',
+                       'client_secret': 'smoke', 'access_token': 'smoke'}, f)
+        self.mapping_path = self.work_dir / 'column_mapping.json'
+        with open(self.mapping_path, 'w') as f:
+            json.dump(COLUMN_MAPPING, f)
+
+        data_dir = self.work_dir / 'data'
+        data_dir.mkdir()
+        for n in range(GOOD_FILES):
+            (data_dir / f"file{n}.txt").write_bytes(b'smoke test ' * (n + 1))
+        (data_dir / '~$lock.txt').write_bytes(b'lock')
+        self.data_dir = data_dir
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def write_manifest(self, departments=None, with_issues=False):
+        """Manifest of the good files (bare-URL links); with_issues adds a row with
+        an invalid name and a row whose file does not exist."""
+        departments = departments or ['Finance'] * GOOD_FILES
+        manifest_path = self.work_dir / 'manifest.csv'
+        with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['FilePath', 'FileName', 'TargetFolder', 'Department', 'Link'])
+            for n, department in enumerate(departments):
+                writer.writerow([str(self.data_dir), f"file{n}.txt", 'Smoke/Sub', department,
+                                 f"https://example.com/doc{n}"])
+            if with_issues:
+                writer.writerow([str(self.data_dir), '~$lock.txt', 'Smoke', 'HR', 'https://example.com/lock'])
+                writer.writerow([str(self.data_dir), 'missing.txt', 'Smoke', 'HR', 'https://example.com/missing'])
+        return manifest_path
+
+    def run_tool(self, script, *args):
+        completed = subprocess.run([sys.executable, script, *map(str, args)], cwd=SCRIPT_DIR,
+                                   capture_output=True, text=True, stdin=subprocess.DEVNULL)
+        self.assertEqual(completed.returncode, 0,
+                         f"{script} {' '.join(map(str, args))} failed:\n"
+                         f"{completed.stdout[-3000:]}\n{completed.stderr[-3000:]}")
+        return completed.stdout + completed.stderr
+
+    def run_upload(self, manifest_path, *args):
+        return self.run_tool('sp_upload.py', '--library', LIBRARY, '--source', manifest_path,
+                             '--config', self.config_path, '--mapping', self.mapping_path, *args)
+
+    def test_preflight_plan_excludes_rows_with_issues(self):
+        output = self.run_upload(self.write_manifest(with_issues=True), '--dry-run')
+
+        self.assertEqual(re.search(r'Files to upload: (\d+)', output).group(1), str(GOOD_FILES))
+        self.assertIn('INVALID_NAME: 1', output)
+        self.assertIn('MISSING: 1', output)
+        self.assertEqual(self.mock.stats['files'], 0)
+
+    def test_upload_then_metadata_only(self):
+        self.run_upload(self.write_manifest())
+
+        self.assertEqual(self.mock.stats['files'], GOOD_FILES)
+        fields = [item['fields'] for item in self.mock.items.values()]
+        self.assertEqual(sorted(field['Reference']['Url'] for field in fields),
+                         [f"https://example.com/doc{n}" for n in range(GOOD_FILES)])
+        self.assertTrue(all(field['Department'] == 'Finance' for field in fields))
+
+        # One changed cell: one field of one item, sent in one $batch request
+        before = dict(self.mock.stats)
+        output = self.run_upload(self.write_manifest(['HR'] + ['Finance'] * (GOOD_FILES - 1)),
+                                 '--metadata-only')
+        self.assertIn('Updated: 1 (1 field values sent)', output)
+        self.assertIn(f"Up to date: {GOOD_FILES - 1}", output)
+        self.assertEqual(self.mock.stats['item_updates'] - before['item_updates'], 1)
+        self.assertEqual(self.mock.stats['batch_requests'] - before['batch_requests'], 1)
+        self.assertEqual(self.mock.stats['files'], GOOD_FILES)
+
+        before = dict(self.mock.stats)
+        output = self.run_upload(self.write_manifest(['HR'] + ['Finance'] * (GOOD_FILES - 1)),
+                                 '--metadata-only')
+        self.assertIn(f"Up to date: {GOOD_FILES}", output)
+        self.assertEqual(self.mock.stats['item_updates'], before['item_updates'])
+
+    def test_package_build_and_validate(self):
+        schema_path = self.work_dir / 'schema.json'
+        package_dir = self.work_dir / 'packages'
+        self.run_tool('sp_migration_package.py', 'export-schema', '--library', LIBRARY,
+                      '--config', self.config_path, '--output', schema_path)
+        self.run_tool('sp_migration_package.py', 'build', '--schema', schema_path,
+                      '--source', self.write_manifest(with_issues=True), '--mapping', self.mapping_path,
+                      '--output-dir', package_dir, '--max-package-items', 4, '--content', 'copy')
+        self.run_tool('sp_migration_package.py', 'validate', package_dir)
+
+        with open(package_dir / 'packages.json', 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.assertEqual(sum(entry['files'] for entry in index['packages']), GOOD_FILES)
+        self.assertGreater(len(index['packages']), 1)
+        self.assertEqual(index['issues'], {'INVALID_NAME': 1, 'MISSING': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,730 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SharePoint Migration API Package Builder
+================================================================================
+
+Description:
+    Bulk-ingestion back end for sp_upload.py. Turns the same manifest and
+    column mapping into SharePoint Migration API import packages instead of
+    uploading file by file over REST. Packages are built and validated fully
+    offline; only the schema export talks to SharePoint, and submitting the
+    packages to the Migration API is a separate step.
+
+Features:
+    - One-time schema export (web, library, root folder and field IDs)
+    - Streams the manifest (constant memory) with the same metadata
+      converters as sp_upload.py
+    - Splits packages by a size and item-count budget
+    - Builds packages in parallel: Manifest.xml, ExportSettings.xml,
+      LookupListMap.xml, UserGroup.xml, SystemData.xml, Requirements.xml,
+      RootObjectMap.xml, ViewFormsList.xml plus content files
+    - Content files hard-linked (or copied) into each package, or referenced
+      by a content map
+    - Offline validation of every package (XML, IDs, content, fields, names)
+
+Requirements:
+    Same as sp_upload.py
+
+Usage:
+    python sp_migration_package.py export-schema --library "Documents" --config config.json
+    python sp_migration_package.py build --schema output/schema_Documents.json -s files.xlsx -m column_mapping.json
+    python sp_migration_package.py validate output/packages_20250101_120000
+
+--------------------------------------------------------------------------------
+Author:     Ishak Ahmad (ishak.ahmad@gmail.com)
+Created:    2025
+Version:    1.0.0
+License:    Proprietary - All Rights Reserved
+
+Copyright (c) 2025 Ishak Ahmad. All rights reserved.
+================================================================================
+"""
+
+import os
+import sys
+import csv
+import json
+import uuid
+import shutil
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import quoteattr
+
+import sp_upload
+from sp_upload import (
+    FieldMultiChoiceValue, FieldUrlValue, RequestOptions, ROW_INVALID, ROW_METADATA,
+    MAX_PATH_LENGTH, PREFLIGHT_WORKERS, UploadTarget, check_manifest_file, compile_converters,
+    format_duration, get_name_issue, get_target_url, iter_converted_rows, open_manifest,
+    run_in_pool, setup_logging
+)
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+DEFAULT_PACKAGE_MAX_MB = 10 * 1024  # Content budget per package
+DEFAULT_PACKAGE_MAX_ITEMS = 50000  # Files and folders per package
+DEFAULT_PACKAGE_WORKERS = 4
+DEFAULT_AUTHOR = "SHAREPOINT\\system"
+CONTENT_MODES = ['link', 'copy', 'none']
+CONTENT_MAP_FILE = "content_map.csv"
+PACKAGE_INDEX_FILE = "packages.json"
+ISSUES_FILE = "package_issues.csv"
+
+DOCUMENT_CONTENT_TYPE = "0x0101"
+FOLDER_CONTENT_TYPE = "0x0120"
+SCHEMA_VERSION = ('<SchemaVersion Version="15.0.0.0" Build="16.0.3111.1200" '
+                  'DatabaseVersion="11552" SiteVersion="15" />')
+
+# Package XML files other than Manifest.xml
+PACKAGE_FILES = ['ExportSettings.xml', 'LookupListMap.xml', 'UserGroup.xml', 'SystemData.xml',
+                 'Requirements.xml', 'RootObjectMap.xml', 'ViewFormsList.xml']
+MANIFEST_NS = '{urn:deployment-manifest-schema}'
+
+
+# ============================================================================
+# SCHEMA EXPORT (ONLINE)
+# ============================================================================
+
+def export_schema(ctx, library_name, logger):
+    """Fetch the IDs and fields a package needs from the target library."""
+    web = ctx.web
+    ctx.load(web, ['Id', 'ServerRelativeUrl', 'Url'])
+    library = web.lists.get_by_title(library_name)
+    ctx.load(library, ['Id', 'Title', 'RootFolder'])
+    ctx.execute_query()
+
+    root_folder = library.root_folder.properties
+    columns = sp_upload.get_library_columns(ctx, library_name, logger)
+
+    # Highest item ID in use, so package items do not collide with existing ones
+    request = ctx.pending_request()
+    list_title = library_name.replace("'", "''")
+    options = RequestOptions(f"{request.service_root_url}/web/lists/getbytitle('{list_title}')/items"
+                             f"?$select=ID&$orderby=ID desc&$top=1")
+    options.set_header('Accept', 'application/json;odata=nometadata')
+    items = request.execute_request_direct(options).json().get('value', [])
+    max_item_id = int(items[0]['ID']) if items else 0
+
+    return {
+        'site_url': web.properties['Url'],
+        'web_id': str(web.properties['Id']),
+        'web_url': web.properties['ServerRelativeUrl'].rstrip('/') or '/',
+        'library': library.properties['Title'],
+        'list_id': str(library.properties['Id']),
+        'root_folder_id': str(root_folder.get('UniqueId')),
+        'root_folder_url': root_folder['ServerRelativeUrl'].rstrip('/'),
+        'next_item_id': max_item_id + 1,
+        'columns': columns,
+        'exported': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def load_schema(schema_path):
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SchemaTarget:
+    """Routes every manifest row to the exported library (a package set has one target).
+
+    Stands in for sp_upload.UploadTargets offline: the library fields come
+    from the schema file instead of SharePoint.
+    """
+
+    def __init__(self, schema, column_mapping, logger):
+        self.target = UploadTarget(schema['site_url'], schema['library'])
+        self.target.columns = schema['columns']
+        self.target.converters = compile_converters(column_mapping, schema['columns'], logger)
+        self.target.root_url = schema['root_folder_url']
+
+    def route(self, row):
+        return self.target
+
+
+# ============================================================================
+# PACKAGE PLANNING (STREAMING)
+# ============================================================================
+
+def object_id(kind, url):
+    """Stable GUID for a package object, so rebuilding a package gives the same IDs."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{kind}:{url}".lower()))
+
+
+def format_timestamp(epoch_seconds):
+    return datetime.fromtimestamp(epoch_seconds, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def format_field_value(value):
+    """Serialize a converted metadata value the way the package manifest expects it."""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, FieldMultiChoiceValue):
+        return ';#' + ';#'.join(value.to_json()) + ';#'
+    if isinstance(value, FieldUrlValue):
+        return f"{value.Url}, {value.Description}"
+    return str(value)
+
+
+class PackagePlanner:
+    """Groups checked manifest rows into packages within the size and item budget.
+
+    Item IDs are assigned here, in a single thread, so packages can then be
+    written in parallel. Folders are assigned an ID the first time they are
+    seen and are repeated in every package that contains files below them.
+    """
+
+    def __init__(self, schema, max_bytes, max_items, start_item_id):
+        self.schema = schema
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.next_item_id = start_item_id
+        self.folders = {schema['root_folder_url'].lower(): {
+            'id': schema['root_folder_id'], 'url': schema['root_folder_url'], 'int_id': None}}
+        self.package_count = 0
+        self._current = None
+
+    def _new_package(self):
+        self.package_count += 1
+        self._current = {'number': self.package_count, 'files': [], 'folders': {}, 'bytes': 0}
+
+    def _item_id(self):
+        item_id = self.next_item_id
+        self.next_item_id += 1
+        return item_id
+
+    def _folder_chain(self, folder_url):
+        """Folders between the library root and folder_url, parent first."""
+        root_url = self.schema['root_folder_url']
+        relative = folder_url[len(root_url):].strip('/')
+        chain = []
+        current = root_url
+        for part in [part for part in relative.split('/') if part]:
+            parent = self.folders[current.lower()]
+            current = f"{current}/{part}"
+            folder = self.folders.get(current.lower())
+            if folder is None:
+                folder = {'id': object_id('folder', current), 'url': current,
+                          'int_id': self._item_id(), 'parent_id': parent['id']}
+                self.folders[current.lower()] = folder
+            chain.append(folder)
+        return chain
+
+    def add(self, row, size, mtime, target_url):
+        """Add a row; yields the previous package if the row does not fit in it."""
+        folder_url, file_name = target_url.rsplit('/', 1)
+        chain = self._folder_chain(folder_url)
+
+        if self._current is None:
+            self._new_package()
+        new_folders = [folder for folder in chain if folder['url'].lower() not in self._current['folders']]
+        items = len(self._current['files']) + len(self._current['folders'])
+        if self._current['files'] and (self._current['bytes'] + size > self.max_bytes or
+                                       items + 1 + len(new_folders) > self.max_items):
+            yield self._current
+            self._new_package()
+            new_folders = chain
+
+        for folder in new_folders:
+            self._current['folders'][folder['url'].lower()] = folder
+        self._current['files'].append({
+            'url': target_url,
+            'name': file_name,
+            'id': object_id('file', target_url),
+            'item_guid': object_id('item', target_url),
+            'int_id': self._item_id(),
+            'parent_id': self.folders[folder_url.lower()]['id'],
+            'source': os.path.join(row['FilePath'], row['FileName']),
+            'size': size,
+            'modified': format_timestamp(mtime),
+            'metadata': row[ROW_METADATA],
+        })
+        self._current['bytes'] += size
+
+    def finish(self):
+        if self._current and self._current['files']:
+            yield self._current
+        self._current = None
+
+
+# ============================================================================
+# PACKAGE WRITING
+# ============================================================================
+
+def site_relative(schema, url):
+    web_url = schema['web_url'].rstrip('/')
+    return url[len(web_url):].lstrip('/')
+
+
+def write_manifest(f, package, schema, fields):
+    """Write Manifest.xml for one package, one SPObject at a time."""
+    web_id = schema['web_id']
+    web_url = schema['web_url']
+    list_id = schema['list_id']
+    common = f'ParentWebId={quoteattr(web_id)} ParentWebUrl={quoteattr(web_url)}'
+
+    f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    f.write('<SPObjects xmlns="urn:deployment-manifest-schema">\n')
+
+    for folder in package['folders'].values():
+        url = folder['url']
+        name = url.rsplit('/', 1)[-1]
+        dir_name = site_relative(schema, url.rsplit('/', 1)[0])
+        f.write(f'  <SPObject Id={quoteattr(folder["id"])} ObjectType="SPFolder" '
+                f'ParentId={quoteattr(folder["parent_id"])} {common} Url={quoteattr(url)}>\n'
+                f'    <Folder Id={quoteattr(folder["id"])} Url={quoteattr(site_relative(schema, url))} '
+                f'Name={quoteattr(name)} ParentFolderId={quoteattr(folder["parent_id"])} {common} '
+                f'ContainingDocumentLibrary={quoteattr(list_id)} SortBehavior="1" />\n'
+                f'  </SPObject>\n')
+        f.write(f'  <SPObject Id={quoteattr(object_id("item", url))} ObjectType="SPListItem" '
+                f'ParentId={quoteattr(list_id)} {common} Url={quoteattr(url)}>\n'
+                f'    <ListItem FileUrl={quoteattr(site_relative(schema, url))} DocType="Folder" '
+                f'ParentFolderId={quoteattr(folder["parent_id"])} Order="{folder["int_id"] * 100}" '
+                f'Id={quoteattr(object_id("item", url))} ParentListId={quoteattr(list_id)} '
+                f'Name={quoteattr(name)} DirName={quoteattr(dir_name)} IntId="{folder["int_id"]}" '
+                f'DocId={quoteattr(folder["id"])} Version="1.0" '
+                f'ContentTypeId="{FOLDER_CONTENT_TYPE}" Author="1" ModifiedBy="1" {common} />\n'
+                f'  </SPObject>\n')
+
+    for index, file in enumerate(package['files'], 1):
+        url = file['url']
+        dir_name = site_relative(schema, url.rsplit('/', 1)[0])
+        file['file_value'] = f"{index:08d}.dat"
+        f.write(f'  <SPObject Id={quoteattr(file["id"])} ObjectType="SPFile" '
+                f'ParentId={quoteattr(file["parent_id"])} {common} Url={quoteattr(url)}>\n'
+                f'    <File Url={quoteattr(site_relative(schema, url))} Id={quoteattr(file["id"])} '
+                f'{common} Name={quoteattr(file["name"])} ListItemIntId="{file["int_id"]}" '
+                f'ListId={quoteattr(list_id)} ParentId={quoteattr(file["parent_id"])} '
+                f'TimeCreated="{file["modified"]}" TimeLastModified="{file["modified"]}" '
+                f'Version="1.0" FileValue="{file["file_value"]}" Author="1" ModifiedBy="1" '
+                f'FileSize="{file["size"]}" />\n'
+                f'  </SPObject>\n')
+        f.write(f'  <SPObject Id={quoteattr(file["item_guid"])} ObjectType="SPListItem" '
+                f'ParentId={quoteattr(list_id)} {common} Url={quoteattr(url)}>\n'
+                f'    <ListItem FileUrl={quoteattr(site_relative(schema, url))} DocType="File" '
+                f'ParentFolderId={quoteattr(file["parent_id"])} Order="{file["int_id"] * 100}" '
+                f'Id={quoteattr(file["item_guid"])} ParentListId={quoteattr(list_id)} '
+                f'Name={quoteattr(file["name"])} DirName={quoteattr(dir_name)} '
+                f'IntId="{file["int_id"]}" DocId={quoteattr(file["id"])} Version="1.0" '
+                f'TimeLastModified="{file["modified"]}" TimeCreated="{file["modified"]}" '
+                f'ContentTypeId="{DOCUMENT_CONTENT_TYPE}" Author="1" ModifiedBy="1" {common}>\n')
+        if file['metadata']:
+            f.write('      <Fields>\n')
+            for name, value in file['metadata'].items():
+                field_id = fields.get(name, {}).get('id') or ''
+                f.write(f'        <Field Name={quoteattr(name)} '
+                        f'Value={quoteattr(format_field_value(value))} FieldId={quoteattr(field_id)} />\n')
+            f.write('      </Fields>\n')
+        f.write('    </ListItem>\n  </SPObject>\n')
+
+    f.write('</SPObjects>\n')
+
+
+def write_package_files(package_dir, schema, author):
+    """Write the fixed package XML files (everything except Manifest.xml)."""
+    site_url = schema['site_url']
+    web_url = schema['web_url']
+    library_url = schema['root_folder_url']
+    contents = {
+        'ExportSettings.xml':
+            f'<ExportSettings xmlns="urn:deployment-exportsettings-schema" SiteUrl={quoteattr(site_url)} '
+            f'FileLocation="" IncludeSecurity="None">\n'
+            f'  <ExportObjects>\n'
+            f'    <DeploymentObject Id={quoteattr(schema["list_id"])} Type="List" '
+            f'ParentId={quoteattr(schema["web_id"])} Url={quoteattr(library_url)} '
+            f'ExcludeChildren="False" IncludeDescendants="All" />\n'
+            f'  </ExportObjects>\n</ExportSettings>\n',
+        'LookupListMap.xml': '<LookupLists xmlns="urn:deployment-lookuplistmap-schema" />\n',
+        'UserGroup.xml':
+            f'<UserGroupMap xmlns="urn:deployment-usergroupmap-schema">\n'
+            f'  <Users>\n'
+            f'    <User Id="1" Name={quoteattr(author)} Login={quoteattr(author)} Email="" '
+            f'IsDomainGroup="false" IsSiteAdmin="true" IsDeleted="false" />\n'
+            f'  </Users>\n  <Groups />\n</UserGroupMap>\n',
+        'SystemData.xml':
+            f'<SystemData xmlns="urn:deployment-systemdata-schema">\n'
+            f'  {SCHEMA_VERSION}\n'
+            f'  <ManifestFiles>\n    <ManifestFile Name="Manifest.xml" />\n  </ManifestFiles>\n'
+            f'  <SystemObjects />\n  <RootWebOnlyLists />\n</SystemData>\n',
+        'Requirements.xml': '<Requirements xmlns="urn:deployment-requirements-schema" />\n',
+        'RootObjectMap.xml':
+            f'<RootObjects xmlns="urn:deployment-rootobjectmap-schema">\n'
+            f'  <RootObject Id={quoteattr(schema["list_id"])} Type="List" '
+            f'ParentId={quoteattr(schema["web_id"])} WebUrl={quoteattr(web_url)} '
+            f'Url={quoteattr(library_url)} IsDependency="false" />\n</RootObjects>\n',
+        'ViewFormsList.xml': '<ViewFormsList xmlns="urn:deployment-viewformlist-schema" />\n',
+    }
+    for file_name, content in contents.items():
+        with open(package_dir / file_name, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n' + content)
+
+
+def place_content(package_dir, package, content_mode):
+    """Hard-link or copy content files into the package, or write a content map."""
+    if content_mode == 'none':
+        with open(package_dir / CONTENT_MAP_FILE, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['FileValue', 'SourcePath', 'Size'])
+            for file in package['files']:
+                writer.writerow([file['file_value'], file['source'], file['size']])
+        return
+
+    for file in package['files']:
+        target = package_dir / file['file_value']
+        if content_mode == 'link':
+            try:
+                os.link(file['source'], target)
+                continue
+            except OSError:
+                pass  # Different volume or no hard-link support - fall back to a copy
+        shutil.copyfile(file['source'], target)
+
+
+def write_package(package, package_root, schema, args):
+    """Write one complete package directory. Returns its index entry."""
+    package_dir = package_root / f"package_{package['number']:05d}"
+    package_dir.mkdir(parents=True, exist_ok=True)
+    fields = {col['internal_name']: col for col in schema['columns']}
+
+    with open(package_dir / 'Manifest.xml', 'w', encoding='utf-8') as f:
+        write_manifest(f, package, schema, fields)
+    write_package_files(package_dir, schema, args.author)
+    place_content(package_dir, package, args.content)
+
+    return {
+        'package': package_dir.name,
+        'files': len(package['files']),
+        'folders': len(package['folders']),
+        'bytes': package['bytes'],
+        'first_item_id': min(file['int_id'] for file in package['files']),
+    }
+
+
+# ============================================================================
+# PACKAGE VALIDATION (OFFLINE)
+# ============================================================================
+
+def validate_package(package_dir, schema, seen_ids):
+    """Check one package directory. Returns a list of (issue, detail).
+
+    seen_ids maps list item IDs to document IDs across packages, so a folder
+    repeated in several packages is accepted but two objects sharing an item
+    ID are not.
+    """
+    issues = []
+    for file_name in ['Manifest.xml'] + PACKAGE_FILES:
+        path = package_dir / file_name
+        if not path.exists():
+            issues.append(('MISSING_FILE', file_name))
+            continue
+        try:
+            for _ in iterparse(path):
+                pass
+        except Exception as e:
+            issues.append(('INVALID_XML', f"{file_name}: {e}"))
+    if issues:
+        return issues
+
+    content_map = {}
+    if (package_dir / CONTENT_MAP_FILE).exists():
+        with open(package_dir / CONTENT_MAP_FILE, 'r', newline='', encoding='utf-8') as f:
+            for entry in csv.DictReader(f):
+                content_map[entry['FileValue']] = entry['SourcePath']
+
+    fields = {col['internal_name'] for col in schema['columns']}
+    folder_ids = {schema['root_folder_id']}
+    object_ids = set()
+
+    for _, element in iterparse(package_dir / 'Manifest.xml'):
+        tag = element.tag.replace(MANIFEST_NS, '')
+        if tag == 'SPObject':
+            object_id_value = element.get('Id')
+            if object_id_value in object_ids:
+                issues.append(('DUPLICATE_ID', f"{object_id_value}: {element.get('Url')}"))
+            object_ids.add(object_id_value)
+
+            url = element.get('Url', '')
+            if len(url) > MAX_PATH_LENGTH:
+                issues.append(('PATH_TOO_LONG', f"{len(url)} characters: {url}"))
+            element.clear()
+
+        elif tag == 'Folder':
+            if element.get('ParentFolderId') not in folder_ids:
+                issues.append(('ORPHAN', f"Folder parent not in package: {element.get('Url')}"))
+            folder_ids.add(element.get('Id'))
+
+        elif tag == 'File':
+            url = element.get('Url')
+            if element.get('ParentId') not in folder_ids:
+                issues.append(('ORPHAN', f"File parent not in package: {url}"))
+            file_value = element.get('FileValue')
+            source = content_map.get(file_value) or package_dir / file_value
+            try:
+                size = os.path.getsize(source)
+            except OSError:
+                issues.append(('MISSING_CONTENT', f"{file_value}: {url}"))
+            else:
+                if size != int(element.get('FileSize', -1)):
+                    issues.append(('SIZE_MISMATCH', f"{file_value} is {size} bytes: {url}"))
+
+        elif tag == 'ListItem':
+            int_id = element.get('IntId')
+            doc_id = element.get('DocId')
+            if seen_ids.setdefault(int_id, doc_id) != doc_id:
+                issues.append(('DUPLICATE_ITEM_ID', f"{int_id}: {element.get('FileUrl')}"))
+            name_issue = get_name_issue(element.get('Name'))
+            if name_issue:
+                issues.append(('INVALID_NAME', f"{element.get('FileUrl')}: {name_issue}"))
+
+        elif tag == 'Field':
+            if element.get('Name') not in fields:
+                issues.append(('UNKNOWN_FIELD', element.get('Name')))
+            elif not element.get('FieldId'):
+                issues.append(('MISSING_FIELD_ID', element.get('Name')))
+
+    return issues
+
+
+# ============================================================================
+# COMMANDS
+# ============================================================================
+
+def run_export_schema(args, output_dir, logger):
+    config_path = Path(args.config)
+    if not config_path.is_absolute():
+        config_path = Path(__file__).parent.absolute() / config_path
+    config = sp_upload.load_config(str(config_path))
+    token_cache = sp_upload.TokenCache(config, logger)
+    ctx = sp_upload.connect_to_sharepoint(config, logger,
+                                          sp_upload.ContextPool(config, token_cache=token_cache))
+
+    schema = export_schema(ctx, args.library, logger)
+    schema_file = Path(args.output) if args.output else output_dir / f"schema_{args.library}.json"
+    with open(schema_file, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, indent=2)
+
+    logger.info(f"Library: {schema['library']} ({schema['root_folder_url']})")
+    logger.info(f"Columns: {len(schema['columns'])}, next item ID: {schema['next_item_id']}")
+    logger.info(f"Schema saved to: {schema_file}")
+
+
+def run_build(args, output_dir, logger):
+    schema = load_schema(args.schema)
+    manifest = open_manifest(args.source, logger)
+
+    column_mapping = {}
+    if args.mapping:
+        with open(args.mapping, 'r') as f:
+            column_mapping = json.load(f)
+        logger.info(f"Loaded column mapping from: {args.mapping}")
+    targets = SchemaTarget(schema, column_mapping, logger)
+
+    package_root = (Path(args.output_dir) if args.output_dir else
+                    output_dir / f"packages_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    package_root.mkdir(parents=True, exist_ok=True)
+
+    planner = PackagePlanner(schema, args.max_package_mb * 1024 * 1024, args.max_package_items,
+                             args.start_item_id or schema.get('next_item_id', 1))
+    issue_counts = {}
+    seen_targets = set()
+    started = datetime.now()
+
+    issues_file = package_root / ISSUES_FILE
+    issues_handle = open(issues_file, 'w', newline='', encoding='utf-8')
+    issues_writer = csv.writer(issues_handle)
+    issues_writer.writerow(['FileName', 'FilePath', 'TargetFolder', 'Issue', 'Detail'])
+
+    def add_issue(row, issue, detail):
+        issue_counts[issue] = issue_counts.get(issue, 0) + 1
+        issues_writer.writerow([row['FileName'], row['FilePath'], row['TargetFolder'], issue, detail])
+
+    def checked_rows():
+        """Rows with valid metadata, stat'ed concurrently (size and mtime from one stat)."""
+        def valid_rows():
+            for row in iter_converted_rows(manifest, targets):
+                if row[ROW_INVALID]:
+                    add_issue(row, 'INVALID_VALUE', '; '.join(row[ROW_INVALID]))
+                    continue
+                yield row
+        for row, size, mtime, issue, detail in run_in_pool(valid_rows(), check_manifest_file,
+                                                           PREFLIGHT_WORKERS):
+            if issue:
+                add_issue(row, issue, detail)
+                continue
+            yield row, size, mtime
+
+    def packages():
+        """Assign checked rows to packages; yield each package when it is full."""
+        for row, size, mtime in checked_rows():
+            target_url = get_target_url(schema['root_folder_url'], row['TargetFolder'], row['FileName'])
+            names = target_url[len(schema['root_folder_url']):].strip('/').split('/')
+            name_issue = next((f"{name}: {get_name_issue(name)}" for name in names
+                               if get_name_issue(name)), None)
+            if name_issue:
+                add_issue(row, 'INVALID_NAME', name_issue)
+                continue
+            if len(target_url) > MAX_PATH_LENGTH:
+                add_issue(row, 'PATH_TOO_LONG', f"{len(target_url)} characters: {target_url}")
+                continue
+            if target_url.lower() in seen_targets:
+                add_issue(row, 'DUPLICATE_TARGET', f"Target path already used in manifest: {target_url}")
+                continue
+            seen_targets.add(target_url.lower())
+            yield from planner.add(row, size, mtime, target_url)
+        yield from planner.finish()
+
+    logger.info("-" * 60)
+    logger.info(f"Building packages in: {package_root}")
+    logger.info(f"Budget per package: {args.max_package_mb} MB, {args.max_package_items} items")
+    logger.info("-" * 60)
+
+    index = []
+    try:
+        for entry in run_in_pool(packages(), lambda package: write_package(package, package_root,
+                                                                            schema, args),
+                                 args.workers):
+            index.append(entry)
+            logger.info(f"  {entry['package']}: {entry['files']} files, {entry['folders']} folders, "
+                        f"{entry['bytes'] / 1024 / 1024:.1f} MB")
+    finally:
+        issues_handle.close()
+
+    index.sort(key=lambda entry: entry['package'])
+    with open(package_root / PACKAGE_INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'schema': schema_reference(schema),
+            'source': str(args.source),
+            'content': args.content,
+            'max_package_mb': args.max_package_mb,
+            'max_package_items': args.max_package_items,
+            'next_item_id': planner.next_item_id,
+            'issues': issue_counts,
+            'packages': index,
+        }, f, indent=2)
+
+    logger.info("=" * 60)
+    logger.info("PACKAGES COMPLETE")
+    logger.info("=" * 60)
+    logger.info(f"Packages: {len(index)}")
+    logger.info(f"Files: {sum(entry['files'] for entry in index)}")
+    logger.info(f"Total size: {sum(entry['bytes'] for entry in index) / 1024 / 1024 / 1024:.2f} GB")
+    for issue, count in sorted(issue_counts.items()):
+        logger.warning(f"  {issue}: {count}")
+    logger.info(f"Next free item ID: {planner.next_item_id}")
+    logger.info(f"Duration: {format_duration((datetime.now() - started).total_seconds())}")
+    logger.info(f"Issues: {issues_file}")
+    logger.info("=" * 60)
+    return package_root
+
+
+def schema_reference(schema):
+    """The schema fields validation needs, stored with the packages."""
+    return {key: value for key, value in schema.items() if key != 'exported'}
+
+
+def run_validate(args, logger):
+    package_root = Path(args.packages)
+    with open(package_root / PACKAGE_INDEX_FILE, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    schema = index['schema']
+
+    logger.info(f"Validating {len(index['packages'])} package(s) in: {package_root}")
+    seen_ids = {}
+    issue_count = 0
+    for entry in index['packages']:
+        issues = validate_package(package_root / entry['package'], schema, seen_ids)
+        issue_count += len(issues)
+        if not issues:
+            logger.info(f"  {entry['package']}: OK")
+            continue
+        logger.warning(f"  {entry['package']}: {len(issues)} issue(s)")
+        for issue, detail in issues[:args.max_issues]:
+            logger.warning(f"    {issue}: {detail}")
+
+    if issue_count:
+        logger.error(f"Validation failed: {issue_count} issue(s)")
+        return False
+    logger.info("All packages valid")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build SharePoint Migration API packages from an upload manifest',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+    python sp_migration_package.py export-schema --library "Documents" --config config.json
+    python sp_migration_package.py build --schema output/schema_Documents.json -s files.xlsx -m column_mapping.json
+    python sp_migration_package.py build --schema output/schema_Documents.json -s files.csv --max-package-mb 2048
+    python sp_migration_package.py build --schema output/schema_Documents.json -s files.csv --content none
+    python sp_migration_package.py validate output/packages_20250101_120000
+        '''
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export-schema',
+                                          help='Save library IDs and fields for offline builds (online)')
+    export_parser.add_argument('--library', '-l', required=True,
+                               help='Target SharePoint document library name')
+    export_parser.add_argument('--config', '-c', default='config.json',
+                               help='Path to config file (default: config.json)')
+    export_parser.add_argument('--output', '-o',
+                               help='Schema file (default: output/schema_<library>.json)')
+
+    build_parser = subparsers.add_parser('build', help='Build packages from a manifest (offline)')
+    build_parser.add_argument('--schema', required=True, help='Schema file from export-schema')
+    build_parser.add_argument('--source', '-s', required=True,
+                              help='Path to manifest containing file list (.xlsx, .csv or .parquet)')
+    build_parser.add_argument('--mapping', '-m', help='Path to saved column mapping JSON file')
+    build_parser.add_argument('--output-dir', '-o',
+                              help='Package directory (default: output/packages_<timestamp>)')
+    build_parser.add_argument('--max-package-mb', type=int, default=DEFAULT_PACKAGE_MAX_MB,
+                              help=f'Content budget per package in MB (default: {DEFAULT_PACKAGE_MAX_MB})')
+    build_parser.add_argument('--max-package-items', type=int, default=DEFAULT_PACKAGE_MAX_ITEMS,
+                              help=f'Files and folders per package (default: {DEFAULT_PACKAGE_MAX_ITEMS})')
+    build_parser.add_argument('--workers', '-w', type=int, default=DEFAULT_PACKAGE_WORKERS,
+                              help=f'Packages written in parallel (default: {DEFAULT_PACKAGE_WORKERS})')
+    build_parser.add_argument('--content', choices=CONTENT_MODES, default='link',
+                              help='Content files: hard-link (falls back to copy), copy, or none '
+                                   '(write content_map.csv only) (default: link)')
+    build_parser.add_argument('--start-item-id', type=int,
+                              help='First list item ID to assign (default: next free ID from the schema)')
+    build_parser.add_argument('--author', default=DEFAULT_AUTHOR,
+                              help=f'Login recorded as author of the imported items (default: {DEFAULT_AUTHOR})')
+
+    validate_parser = subparsers.add_parser('validate', help='Validate built packages (offline)')
+    validate_parser.add_argument('packages', help='Package directory created by build')
+    validate_parser.add_argument('--max-issues', type=int, default=20,
+                                 help='Issues listed per package (default: 20)')
+
+    args = parser.parse_args()
+
+    output_dir = Path(__file__).parent.absolute() / "output"
+    output_dir.mkdir(exist_ok=True)
+    logger, log_file = setup_logging(output_dir, 'package_log')
+
+    logger.info("=" * 60)
+    logger.info("SHAREPOINT MIGRATION PACKAGE BUILDER")
+    logger.info("=" * 60)
+    logger.info(f"Command: {args.command}")
+    logger.info(f"Log file: {log_file}")
+    logger.info("=" * 60)
+
+    if args.command == 'export-schema':
+        run_export_schema(args, output_dir, logger)
+    elif args.command == 'build':
+        package_root = run_build(args, output_dir, logger)
+        print(f"\nPackages: {package_root}")
+        print(f"Validate with: python sp_migration_package.py validate \"{package_root}\"")
+    elif args.command == 'validate':
+        if not run_validate(args, logger):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SharePoint Permission Migration
+================================================================================
+
+Description:
+    Carries NTFS permissions from a file server audit (file_server_audit.py)
+    over to SharePoint after the content has been uploaded. Only permission
+    boundaries are migrated: folders whose access differs from their parent
+    folder get unique permissions, everything below them keeps inheriting.
+    Thousands of folders with inherited ACLs therefore cost nothing, and the
+    library keeps the small number of unique scopes SharePoint handles well.
+
+Features:
+    - Streams the audit workbook (constant memory, any number of rows)
+    - Maps NTFS accounts to SharePoint users or groups and NTFS rights to
+      permission levels (JSON mapping file)
+    - Detects boundaries on the mapped permissions, so ACL differences that
+      map to the same SharePoint access do not break inheritance
+    - Resolves every user, group and permission level once
+    - Applies boundaries with OData $batch requests (break inheritance plus
+      role assignments), falling back to one folder at a time on errors
+    - Report of applied boundaries and everything that could not be carried
+      over: deny entries, unmapped accounts and rights, files with their own
+      permissions
+    - Dry-run mode: plan the boundaries offline, without connecting
+
+Requirements:
+    Same as sp_upload.py
+
+Usage:
+    python sp_permissions.py --audit FileAudit.xlsx --mapping permission_mapping.json --dry-run
+    python sp_permissions.py --audit FileAudit.xlsx --mapping permission_mapping.json --library "Documents"
+
+--------------------------------------------------------------------------------
+Author:     Ishak Ahmad (ishak.ahmad@gmail.com)
+Created:    2025
+Version:    1.0.0
+License:    Proprietary - All Rights Reserved
+
+Copyright (c) 2025 Ishak Ahmad. All rights reserved.
+================================================================================
+"""
+
+import re
+import sys
+import csv
+import json
+import fnmatch
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+import sp_upload
+from sp_upload import format_duration, get_library_root_url, setup_logging
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+AUDIT_SHEET = "File_Folder_List"  # Data sheet written by file_server_audit.py
+AUDIT_COLUMNS = ['Folder Path', 'Name', 'Type', 'Permissions']
+DEFAULT_BATCH_SIZE = 50  # Boundary folders per $batch request
+REPORT_COLUMNS = ['Path', 'TargetUrl', 'Result', 'Detail']
+
+# One audit ACE: "DOMAIN\account:Allow:Read, Write(Explicit)"
+ACE_PATTERN = re.compile(r'^(.*):(Allow|Deny|Other):(.*)\((Inherited|Explicit)\)$')
+
+
+# ============================================================================
+# PERMISSION MAPPING
+# ============================================================================
+
+def normalize_path(path):
+    """Windows or UNC path from the audit with backslashes and no trailing separator."""
+    return str(path).replace('/', '\\').rstrip('\\')
+
+
+def parse_permissions(value):
+    """Split an audit Permissions cell into (account, access, rights, inheritance) tuples."""
+    aces = []
+    for entry in str(value or '').split('; '):
+        match = ACE_PATTERN.match(entry.strip())
+        if match:
+            account, access, rights, inheritance = match.groups()
+            aces.append((account, access, [right.strip() for right in rights.split(',')],
+                         inheritance))
+    return aces
+
+
+class PermissionMapping:
+    """Mapping file (JSON) from the audited share to the SharePoint library:
+
+        mappings           [{"source": "D:\\Data\\Finance", "target": "Finance"}, ...]
+                           Audited folder to library folder, as in the pipeline
+                           rules; the longest matching source wins. The mapped
+                           folder inherits from the library unless the mapping
+                           sets "unique_root": true
+        principals         {"CONTOSO\\Finance-RW": "Finance Members",
+                            "CONTOSO\\jdoe": "jdoe@contoso.com", "CONTOSO\\svc": null}
+                           NTFS account (case-insensitive) to a SharePoint group
+                           name or a user login / e-mail; null ignores the account
+        levels             {"FullControl": "Full Control", "Modify": "Contribute", ...}
+                           NTFS right as written by the audit to a permission level
+        ignore_principals  Account patterns to skip, e.g. "BUILTIN\\*", "CREATOR OWNER"
+    """
+
+    def __init__(self, mapping_path):
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.mappings = []
+        for mapping in data.get('mappings', []):
+            source = normalize_path(mapping['source'])
+            target = '/'.join(part for part in mapping.get('target', '').replace('\\', '/').split('/')
+                              if part)
+            if mapping.get('unique_root') and not target:
+                raise ValueError(f"unique_root needs a target folder below the library root: {source}")
+            self.mappings.append((source.lower(), target, bool(mapping.get('unique_root'))))
+        if not self.mappings:
+            raise ValueError(f"No mappings in mapping file: {mapping_path}")
+        self.mappings.sort(key=lambda mapping: len(mapping[0]), reverse=True)
+
+        self.principals = {account.lower(): principal
+                           for account, principal in data.get('principals', {}).items()}
+        self.levels = {right.lower(): level for right, level in data.get('levels', {}).items()}
+        self.ignore_principals = [pattern.lower() for pattern in data.get('ignore_principals', [])]
+
+    def map_folder(self, path):
+        """Return (target folder, is mapping root, unique root) for an audited folder, or None."""
+        path = normalize_path(path)
+        key = path.lower()
+        for source, target, unique_root in self.mappings:
+            if key == source or key.startswith(source + '\\'):
+                parts = [part for part in path[len(source):].split('\\') if part]
+                return '/'.join([target] + parts if target else parts), not parts, unique_root
+        return None
+
+    def is_ignored(self, account):
+        key = account.lower()
+        if key in self.principals and self.principals[key] is None:
+            return True
+        return any(fnmatch.fnmatch(key, pattern) for pattern in self.ignore_principals)
+
+
+# ============================================================================
+# BOUNDARY PLANNING (OFFLINE)
+# ============================================================================
+
+class BoundaryPlanner:
+    """Stream the audit and find the folders that need unique permissions.
+
+    A folder's access is the set of (SharePoint principal, permission level)
+    pairs its Allow entries map to. The audit lists every folder before its
+    subfolders, so the parent's set is always known when a folder is read; a
+    folder whose set differs from its parent's is a boundary. Everything the
+    mapping cannot express is passed to add_issue(path, target url, issue,
+    detail) instead.
+    """
+
+    def __init__(self, mapping, add_issue, logger):
+        self.mapping = mapping
+        self.add_issue = add_issue
+        self.logger = logger
+        self.folder_access = {}  # Lower-case folder path -> access set
+        self._interned = {}  # Equal access sets share one object
+        self._reported = set()  # Unmapped accounts and rights, reported once each
+        self.stats = {'folders': 0, 'files': 0, 'unmapped_folders': 0, 'boundaries': 0}
+
+    def map_access(self, path, target_url, aces):
+        """Return the access set for an ACL, reporting what cannot be mapped."""
+        access = set()
+        for account, access_type, rights, inheritance in aces:
+            if self.mapping.is_ignored(account):
+                continue
+            if access_type != 'Allow':
+                # Inherited deny entries repeat on every descendant; report where they are set
+                if inheritance == 'Explicit':
+                    self.add_issue(path, target_url, 'DENY_NOT_SUPPORTED',
+                                   f"{account}: {access_type} {', '.join(rights)}")
+                continue
+
+            principal = self.mapping.principals.get(account.lower())
+            if principal is None:
+                if ('principal', account.lower()) not in self._reported:
+                    self._reported.add(('principal', account.lower()))
+                    self.add_issue(path, target_url, 'UNMAPPED_PRINCIPAL',
+                                   f"{account} (first seen here; add it to principals)")
+                continue
+
+            for right in rights:
+                level = self.mapping.levels.get(right.lower())
+                if level is None:
+                    if ('right', right.lower()) not in self._reported:
+                        self._reported.add(('right', right.lower()))
+                        self.add_issue(path, target_url, 'UNMAPPED_RIGHT',
+                                       f"{right} (first seen here; add it to levels)")
+                    continue
+                access.add((principal, level))
+
+        access = frozenset(access)
+        return self._interned.setdefault(access, access)
+
+    def iter_boundaries(self, audit_path, root_url):
+        """Yield (source path, target url, access set) for each boundary folder, top-down."""
+        wb = load_workbook(audit_path, read_only=True)
+        try:
+            worksheet = wb[AUDIT_SHEET] if AUDIT_SHEET in wb.sheetnames else wb.active
+            rows = worksheet.iter_rows(values_only=True)
+            header = [str(value).strip() if value is not None else '' for value in next(rows, [])]
+            missing = [column for column in AUDIT_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"Not a file server audit (missing columns: {', '.join(missing)})")
+            indexes = [header.index(column) for column in AUDIT_COLUMNS]
+
+            for row in rows:
+                folder_path, name, item_type, permissions = (
+                    row[index] if index < len(row) else None for index in indexes)
+                if not name or item_type not in ('Folder', 'File'):
+                    continue
+                parent_path = normalize_path(folder_path or '')
+                path = f"{parent_path}\\{name}" if parent_path else str(name)
+
+                if item_type == 'File':
+                    self.check_file(path, parent_path, permissions, root_url)
+                    continue
+
+                self.stats['folders'] += 1
+                boundary = self.check_folder(path, parent_path, permissions, root_url)
+                if boundary:
+                    self.stats['boundaries'] += 1
+                    yield boundary
+        finally:
+            wb.close()
+
+    def check_folder(self, path, parent_path, permissions, root_url):
+        mapped = self.mapping.map_folder(path)
+        if mapped is None:
+            self.stats['unmapped_folders'] += 1
+            return None
+
+        target_folder, is_root, unique_root = mapped
+        target_url = '/'.join(part for part in (root_url, target_folder) if part)
+        access = self.map_access(path, target_url, parse_permissions(permissions))
+        self.folder_access[path.lower()] = access
+
+        if is_root:
+            # The mapped folder is assumed to match the library unless told otherwise
+            is_boundary = unique_root
+        else:
+            # Parents missing from the audit (errors, exclusions) cannot be compared
+            is_boundary = self.folder_access.get(parent_path.lower()) is not access
+
+        if not is_boundary:
+            return None
+        if not access:
+            self.add_issue(path, target_url, 'NO_MAPPED_PRINCIPALS',
+                           "Unique permissions with no mapped access; left inheriting")
+            return None
+        return path, target_url, access
+
+    def check_file(self, path, parent_path, permissions, root_url):
+        self.stats['files'] += 1
+        folder_access = self.folder_access.get(parent_path.lower())
+        if folder_access is None:
+            return
+
+        target_folder, _, _ = self.mapping.map_folder(parent_path)
+        target_url = '/'.join(part for part in (root_url, target_folder, path.rsplit('\\', 1)[-1])
+                              if part)
+        access = self.map_access(path, target_url, parse_permissions(permissions))
+        if access is not folder_access:
+            # Per-item scopes do not scale in SharePoint; these are reported, never applied
+            self.add_issue(path, target_url, 'FILE_PERMISSIONS_NOT_APPLIED',
+                           f"File access differs from its folder: {format_access(access) or '(none)'}")
+
+
+def format_access(access):
+    return '; '.join(f"{principal}={level}" for principal, level in sorted(access))
+
+
+# ============================================================================
+# APPLYING BOUNDARIES (ONLINE)
+# ============================================================================
+
+def resolve_principals(ctx, names, logger):
+    """Resolve SharePoint principal names to IDs (None if not found).
+
+    Names with a claims prefix or an @ are users (added to the site if
+    needed), anything else is a site group.
+    """
+    resolved = {}
+    for name in sorted(names):
+        try:
+            if '|' in name or '@' in name:
+                principal = ctx.web.ensure_user(name)
+            else:
+                principal = ctx.web.site_groups.get_by_name(name)
+                ctx.load(principal, ['Id'])
+            ctx.execute_query()
+            resolved[name] = principal.properties['Id']
+            logger.debug(f"Principal {name}: {resolved[name]}")
+        except Exception as e:
+            logger.warning(f"Principal not found: {name} ({str(e)})")
+            resolved[name] = None
+    return resolved
+
+
+def get_role_definitions(ctx):
+    """Permission level name (lower case) -> role definition ID."""
+    definitions = ctx.web.role_definitions
+    ctx.load(definitions, ['Id', 'Name'])
+    ctx.execute_query()
+    return {definition.properties['Name'].lower(): definition.properties['Id']
+            for definition in definitions}
+
+
+def queue_boundary(ctx, target_url, role_assignments, execute=False):
+    """Queue breaking inheritance on a folder and granting its role assignments.
+
+    With execute, each request is sent on its own, so a failure leaves
+    nothing queued behind it.
+    """
+    item = ctx.web.get_folder_by_server_relative_url(target_url).list_item_all_fields
+    item.break_role_inheritance(copy_role_assignments=False, clear_sub_scopes=False)
+    if execute:
+        ctx.execute_query()
+    for principal_id, role_id in role_assignments:
+        item.role_assignments.add_role_assignment(principal_id, role_id)
+        if execute:
+            ctx.execute_query()
+
+
+def apply_boundaries(ctx, boundaries, batch_size, add_result, logger):
+    """Apply boundaries in $batch requests; returns (applied, failed).
+
+    Breaking inheritance and adding a role assignment are both idempotent, so
+    a failed batch is simply replayed one folder at a time to find the folders
+    at fault.
+    """
+    applied = failed = 0
+    for start in range(0, len(boundaries), batch_size):
+        batch = boundaries[start:start + batch_size]
+        for _, target_url, role_assignments, _ in batch:
+            queue_boundary(ctx, target_url, role_assignments)
+
+        try:
+            ctx.execute_batch()
+            results = [(boundary, None) for boundary in batch]
+        except Exception as e:
+            logger.debug(f"Batch failed, retrying folder by folder: {str(e)}")
+            results = []
+            for boundary in batch:
+                try:
+                    queue_boundary(ctx, boundary[1], boundary[2], execute=True)
+                    results.append((boundary, None))
+                except Exception as e:
+                    results.append((boundary, str(e)))
+
+        for (path, target_url, _, detail), error in results:
+            if error:
+                failed += 1
+                logger.error(f"Failed: {target_url}: {error}")
+                add_result(path, target_url, 'ERROR', error)
+            else:
+                applied += 1
+                add_result(path, target_url, 'APPLIED', detail)
+
+        logger.info(f"Progress: {start + len(batch)}/{len(boundaries)} boundaries")
+    return applied, failed
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Migrate NTFS permission boundaries from a file server audit to SharePoint',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+    python sp_permissions.py --audit FileAudit.xlsx --mapping permission_mapping.json --dry-run
+    python sp_permissions.py --audit FileAudit.xlsx --mapping permission_mapping.json --library "Documents"
+    python sp_permissions.py --audit FileAudit.xlsx --mapping permission_mapping.json -l "Documents" --batch-size 20
+        '''
+    )
+    parser.add_argument('--audit', '-a', required=True,
+                        help='File server audit workbook (file_server_audit.py output)')
+    parser.add_argument('--mapping', '-m', required=True,
+                        help='Permission mapping JSON file (see permission_mapping.template.json)')
+    parser.add_argument('--library', '-l',
+                        help='Target SharePoint document library name (required unless --dry-run)')
+    parser.add_argument('--config', '-c', default='config.json',
+                        help='Path to config file (default: config.json)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Boundary folders per $batch request (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Plan the boundaries and write the report without connecting')
+
+    args = parser.parse_args()
+    if not args.dry_run and not args.library:
+        parser.error('--library is required unless --dry-run is given')
+
+    output_dir = Path(__file__).parent.absolute() / "output"
+    output_dir.mkdir(exist_ok=True)
+    logger, log_file = setup_logging(output_dir, 'permission_log')
+
+    logger.info("=" * 60)
+    logger.info("SHAREPOINT PERMISSION MIGRATION")
+    logger.info("=" * 60)
+    logger.info(f"Audit: {args.audit}")
+    logger.info(f"Mapping: {args.mapping}")
+    logger.info(f"Library: {args.library or '(dry run)'}")
+    logger.info(f"Log file: {log_file}")
+    logger.info("=" * 60)
+
+    try:
+        mapping = PermissionMapping(args.mapping)
+    except Exception as e:
+        logger.error(f"Failed to read permission mapping: {str(e)}")
+        sys.exit(1)
+
+    ctx = None
+    root_url = ''
+    if not args.dry_run:
+        config_path = Path(args.config)
+        if not config_path.is_absolute():
+            config_path = Path(__file__).parent.absolute() / config_path
+        config = sp_upload.load_config(str(config_path))
+        token_cache = sp_upload.TokenCache(config, logger)
+        ctx = sp_upload.connect_to_sharepoint(config, logger,
+                                              sp_upload.ContextPool(config, token_cache=token_cache))
+        root_url = get_library_root_url(ctx, args.library)
+
+    report_file = output_dir / f"permission_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    report_handle = open(report_file, 'w', newline='', encoding='utf-8')
+    report_writer = csv.writer(report_handle)
+    report_writer.writerow(REPORT_COLUMNS)
+    result_counts = {}
+
+    def add_result(path, target_url, result, detail):
+        result_counts[result] = result_counts.get(result, 0) + 1
+        report_writer.writerow([path, target_url, result, detail])
+
+    started = datetime.now()
+    try:
+        # Pass 1: boundaries from the audit (offline)
+        logger.info("Reading audit and planning boundaries...")
+        planner = BoundaryPlanner(mapping, add_result, logger)
+        try:
+            boundaries = list(planner.iter_boundaries(args.audit, root_url))
+        except Exception as e:
+            logger.error(f"Failed to read audit: {str(e)}")
+            sys.exit(1)
+
+        stats = planner.stats
+        logger.info(f"Audit: {stats['folders']} folders, {stats['files']} files "
+                    f"({stats['unmapped_folders']} folders outside the mappings)")
+        logger.info(f"Boundaries: {len(boundaries)} folders need unique permissions")
+
+        if args.dry_run:
+            for path, target_url, access in boundaries:
+                add_result(path, target_url, 'PLANNED', format_access(access))
+        else:
+            # Pass 2: resolve principals and levels once, then apply
+            role_ids = get_role_definitions(ctx)
+            principal_ids = resolve_principals(
+                ctx, {principal for _, _, access in boundaries for principal, _ in access}, logger)
+
+            planned = []
+            for path, target_url, access in boundaries:
+                role_assignments = []
+                for principal, level in sorted(access):
+                    if principal_ids.get(principal) is None:
+                        add_result(path, target_url, 'PRINCIPAL_NOT_FOUND', principal)
+                    elif level.lower() not in role_ids:
+                        add_result(path, target_url, 'LEVEL_NOT_FOUND', level)
+                    else:
+                        role_assignments.append((principal_ids[principal], role_ids[level.lower()]))
+                if role_assignments:
+                    planned.append((path, target_url, role_assignments, format_access(access)))
+                else:
+                    add_result(path, target_url, 'NO_MAPPED_PRINCIPALS',
+                               "No principal or level resolved; left inheriting")
+
+            logger.info(f"Applying {len(planned)} boundaries in batches of {args.batch_size}...")
+            apply_boundaries(ctx, planned, max(1, args.batch_size), add_result, logger)
+    finally:
+        report_handle.close()
+
+    elapsed = (datetime.now() - started).total_seconds()
+
+    logger.info("=" * 60)
+    logger.info("PERMISSION MIGRATION COMPLETE" if not args.dry_run else "PERMISSION PLAN COMPLETE")
+    logger.info("=" * 60)
+    for result, count in sorted(result_counts.items()):
+        logger.info(f"{result}: {count}")
+    logger.info(f"Duration: {format_duration(elapsed)}")
+    logger.info(f"Report: {report_file}")
+    logger.info("=" * 60)
+
+    if result_counts.get('ERROR'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,21 +10,61 @@ Description:
     Supports flexible metadata columns and large file uploads (chunked upload).
 
 Features:
-    - Upload files from Excel manifest to SharePoint Online
+    - Upload files from Excel, CSV or Parquet manifest to SharePoint Online
+    - Streaming manifest reader (constant memory, uploads start immediately)
+    - Parallel pre-flight validation with upload plan and duration estimate
     - Flexible metadata mapping (N columns)
     - Interactive column mapping wizard
+    - Metadata converters compiled from SharePoint field types, applied per
+      manifest chunk before upload (invalid values reported in bulk)
     - Chunked upload for large files (>250MB)
+    - Resumable upload sessions for large files (survive interruption)
     - Creates target folders if they don't exist
+    - Concurrent upload workers with throttling-aware adaptive concurrency
+    - Multi-site / multi-library runs (TargetSite and TargetLibrary manifest
+      columns) with per-library schema and folder caches
+    - Size-aware lanes (large / medium / small files, largest first within
+      each lane) so large files do not starve small ones
+    - Keep-alive connection pool and shared access-token cache (optional
+      encrypted on-disk cache so back-to-back runs skip authentication)
     - Overwrites existing files (creates new version)
+    - Content deduplication (--dedup): each distinct content uploaded once,
+      duplicates created with server-side copies and their own metadata
+    - Differential sync mode (--sync) skips files unchanged since last upload
+    - Post-upload verification (--verify): remote sizes and QuickXorHashes
+      from one paged listing per library, local hashes computed in parallel
+      (NumPy), re-upload manifest for missing or different files
+    - Metadata-only re-apply (--metadata-only): changed fields of files
+      already uploaded sent in $batch requests, file content untouched
+    - Upload bandwidth cap shared by all workers (--max-mbps), with caps by
+      weekday and time of day from a schedule file that can be edited during
+      a run (--bandwidth-schedule)
+    - Fast startup: pandas, NumPy and openpyxl imported when first needed,
+      library columns cached on disk (revalidated by list ETag), time to
+      first upload logged
     - Detailed logging and progress tracking
-    - Upload report generation
+    - Per-file latency breakdown, live throughput summary and metrics file
+    - Append-only run journal with --resume (skips rows already uploaded)
+    - Upload report generation (streamed from the run journal)
+    - Audit-to-upload pipeline (--scan): uploads files as the file server scan
+      finds them, with path mapping, exclusion and metadata rules
 
 Requirements:
     pip install Office365-REST-Python-Client pandas openpyxl
+    pip install pyarrow  (optional, for Parquet manifests)
 
 Usage:
     python sp_upload.py --library "Documents" --source files.xlsx
     python sp_upload.py --library "Finance Documents" --source files.xlsx --config config.json
+    python sp_upload.py --library "Documents" --source files.xlsx --resume
+    python sp_upload.py --library "Documents" --source files.xlsx --sync
+    python sp_upload.py --library "Documents" --source files.xlsx --dedup
+    python sp_upload.py --library "Documents" --source files.xlsx --preflight --dry-run
+    python sp_upload.py --library "Documents" --source files.xlsx --verify
+    python sp_upload.py --library "Documents" --source files.xlsx --mapping column_mapping.json --metadata-only
+    python sp_upload.py --library "Documents" --source files.xlsx --bandwidth-schedule bandwidth_schedule.json
+    python sp_upload.py --library "Documents" --scan pipeline_rules.json --mapping column_mapping.json
+    python sp_upload.py --source department_migration.xlsx --mapping column_mapping.json
 
 --------------------------------------------------------------------------------
 Author:     Ishak Ahmad (ishak.ahmad@gmail.com)
@@ -38,22 +78,47 @@ Copyright (c) 2025 Ishak Ahmad. All rights reserved.
 
 import os
 import sys
+import csv
 import json
+import time
+import base64
+import hashlib
+import uuid
+import random
+import heapq
+import re
+import fnmatch
 import argparse
 import logging
-from datetime import datetime
+import threading
+import itertools
+import importlib
+from importlib.util import find_spec
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import unquote, urlparse
 
-try:
-    import pandas as pd
-except ImportError:
+STARTED = time.monotonic()  # Process start, for the time-to-first-upload log line
+
+# pandas (with NumPy) and openpyxl are imported where they are first used, and
+# the SharePoint client context when the first context is created, so startup
+# does not pay for modules a run may not need (see preload_modules)
+if find_spec('pandas') is None or find_spec('openpyxl') is None:
     print("ERROR: pandas is not installed. Please run: pip install pandas openpyxl")
     sys.exit(1)
 
 try:
+    import requests
+    from requests.adapters import HTTPAdapter
     from office365.runtime.auth.client_credential import ClientCredential
-    from office365.sharepoint.client_context import ClientContext
-    from office365.sharepoint.files.file import File
+    from office365.runtime.auth.token_response import TokenResponse
+    from office365.runtime.http.request_options import RequestOptions
+    from office365.runtime.transport.base import BaseTransport
+    from office365.runtime.transport.requests_transport import RequestsTransport
+    from office365.sharepoint.fields.multi_choice_value import FieldMultiChoiceValue
+    from office365.sharepoint.fields.url_value import FieldUrlValue
 except ImportError:
     print("ERROR: Office365-REST-Python-Client is not installed.")
     print("Please run: pip install Office365-REST-Python-Client")
@@ -63,11 +128,106 @@ except ImportError:
 # Constants
 CHUNK_SIZE = 10 * 1024 * 1024  # 10MB chunks for large file upload
 LARGE_FILE_THRESHOLD = 250 * 1024 * 1024  # 250MB
-
-
-def setup_logging(output_dir):
+CHUNK_RETRY_ATTEMPTS = 3  # Resume attempts per chunk before giving up
+UPLOAD_SESSIONS_FILE = "upload_sessions.json"
+JOURNAL_FILE = "upload_journal.jsonl"
+JOURNAL_ONLY_FIELDS = ['RunId', 'Site', 'Library']  # Journal fields not shown in the report
+
+# Request scheduling (throttling and retries)
+DEFAULT_WORKERS = 4
+MAX_REQUEST_RETRIES = 8
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+THROTTLE_STATUS_CODES = (429, 503)  # Honor Retry-After, reduce concurrency
+TRANSIENT_STATUS_CODES = (500, 502, 504)  # Retry with backoff only
+
+# Size-aware scheduling lanes (largest lane first)
+MEDIUM_FILE_THRESHOLD = 16 * 1024 * 1024  # 16MB
+UPLOAD_LANES = [  # (name, minimum file size in bytes)
+    ('large', LARGE_FILE_THRESHOLD + 1),  # Chunked uploads
+    ('medium', MEDIUM_FILE_THRESHOLD),
+    ('small', 0),
+]
+LANE_LOOKAHEAD_ROWS = 10000  # Rows sized and queued ahead, so each lane can start its largest first
+
+# Transport (connection pooling and token caching)
+POOL_EXTRA_CONNECTIONS = 2  # Pool size is workers + this (main thread, listings)
+TOKEN_REFRESH_MARGIN_SECONDS = 300  # Refresh access tokens this long before expiry
+TOKEN_CACHE_FILE = "token_cache.bin"
+SCHEMA_CACHE_FILE = "schema_cache.json"
+SCHEMA_CACHE_FORMAT = 1  # Bump when the column filtering or column info changes
+
+# Bandwidth shaping (request bodies only; 0 MB/s pauses uploads, None is unlimited)
+BANDWIDTH_BURST_SECONDS = 1.0  # Token bucket size, in seconds of the current rate
+BANDWIDTH_RECHECK_SECONDS = 10  # How often the schedule (and schedule file) is re-evaluated
+BANDWIDTH_MIN_BODY_BYTES = 64 * 1024  # Smaller request bodies are not shaped
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Metrics
+PROGRESS_INTERVAL_SECONDS = 30  # Periodic throughput summary interval
+METRICS_RESERVOIR_SIZE = 10000  # Per-phase latency samples kept for percentiles
+TIMING_PHASES = [  # (report column, metrics name)
+    ('FolderSeconds', 'folder'),
+    ('TransferSeconds', 'transfer'),
+    ('ItemSeconds', 'item_fetch'),
+    ('MetadataSeconds', 'metadata'),
+]
+
+# Manifest reading
+MANIFEST_CHUNK_ROWS = 10000  # Rows per chunk when streaming the manifest
+SYSTEM_COLUMNS = ['FileName', 'FilePath', 'TargetFolder']
+ROUTING_COLUMNS = ['TargetSite', 'TargetLibrary']  # Optional per-row target (default: config site, --library)
+
+# Audit-to-upload pipeline (--scan)
+AUDIT_SCRIPT_DIR = Path(__file__).parent.parent / 'file_server_audit'
+SCAN_RECORD_FIELDS = ['name', 'extension', 'size', 'modified', 'folder_path']
+
+# Metadata conversion
+ROW_METADATA = '_metadata'  # Converted SharePoint field values attached to each row
+ROW_INVALID = '_invalid'  # Invalid-cell messages attached to each row
+ROW_TARGET = '_target'  # UploadTarget (site and library) each row is routed to
+ROW_CONTENT = '_content'  # Dedup content key of a row that uploads shared content
+ROW_COPY_FROM = '_copy_from'  # Server-relative URL a duplicate row is copied from
+ROW_BLOCKED = '_blocked'  # Pre-flight: row has an issue its upload would fail on
+TEXT_MAX_LENGTH = 255
+BOOLEAN_VALUES = {
+    'true': True, 'yes': True, 'y': True, '1': True, '1.0': True,
+    'false': False, 'no': False, 'n': False, '0': False, '0.0': False,
+}
+
+# Content deduplication (--dedup)
+DEDUP_MIN_FILE_SIZE = 256 * 1024  # Smaller files are cheaper to upload than to copy
+DEDUP_PARTIAL_BYTES = 64 * 1024  # Prefix hashed first; full hash only when prefixes match
+DEDUP_HASH_BLOCK = 1024 * 1024
+
+# Pre-flight validation
+PREFLIGHT_WORKERS = 32  # Concurrent stat calls (I/O bound, mostly UNC latency)
+DEFAULT_THROUGHPUT_MBPS = 20.0  # Throughput model: aggregate upload bandwidth (MB/s)
+DEFAULT_FILE_OVERHEAD_SECONDS = 1.0  # Throughput model: request overhead per file per worker
+MAX_PATH_LENGTH = 400  # SharePoint limit for the decoded path (library URL + folders + name)
+MAX_NAME_LENGTH = 255
+INVALID_NAME_CHARS = set('"*:<>?/\\|')
+RESERVED_NAMES = {'.lock', 'con', 'prn', 'aux', 'nul', 'desktop.ini', '_vti_'} | \
+    {f'com{i}' for i in range(10)} | {f'lpt{i}' for i in range(10)}
+
+# Remote library listing
+LISTING_PAGE_SIZE = 5000  # Maximum page size for list item queries
+DRIVE_PAGE_SIZE = 1000  # Maximum page size for drive delta queries (v2.0 API)
+
+# Post-upload verification (--verify)
+QUICKXOR_WIDTH = 160  # Bytes per QuickXorHash cycle: 160-bit register, 11-bit shift per byte
+QUICKXOR_SHIFT = 11
+QUICKXOR_READ_SIZE = QUICKXOR_WIDTH * 32768  # 5MB reads, a whole number of cycles
+VERIFY_WORKERS = 8  # Files hashed in parallel (NumPy and file reads release the GIL)
+REUPLOAD_STATUSES = ('MISSING', 'SIZE_MISMATCH', 'HASH_MISMATCH')  # Rows written to the re-upload manifest
+
+# Metadata-only re-apply (--metadata-only)
+METADATA_BATCH_SIZE = 100  # List item updates per $batch request
+
+
+def setup_logging(output_dir, prefix='upload_log'):
     """Setup logging to both console and file."""
-    log_file = output_dir / f"upload_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    log_file = output_dir / f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
 
     logger = logging.getLogger('SPUpload')
     logger.setLevel(logging.DEBUG)
@@ -90,6 +250,25 @@ def setup_logging(output_dir):
     return logger, log_file
 
 
+def preload_modules(names):
+    """Import modules in a background thread, e.g. while authenticating.
+
+    A later import of the same module waits for the background import to
+    finish rather than starting again, so this only moves import time off
+    the critical path.
+    """
+    def load():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
+
+
 def load_config(config_path):
     """Load configuration from JSON file."""
     if not os.path.exists(config_path):
@@ -114,13 +293,499 @@ def load_config(config_path):
     return config
 
 
-def connect_to_sharepoint(config, logger):
+class RequestScheduler:
+    """Central scheduler that every SharePoint HTTP request goes through.
+
+    Concurrency is adjusted with an AIMD controller: each successful request
+    raises the limit by 1/limit (about +1 per round of requests), and each
+    429/503 halves it. Throttled responses pause all requests for the
+    Retry-After interval; transient errors are retried with jittered
+    exponential backoff.
+    """
+
+    def __init__(self, max_concurrency, logger, min_concurrency=1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.logger = logger
+
+        self.in_flight = 0
+        self.request_count = 0
+        self.retry_count = 0
+        self.throttle_count = 0
+
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._condition.wait(self._paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    self.in_flight += 1
+                    self.request_count += 1
+                    return now
+
+    def _release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_success(self):
+        with self._condition:
+            if self.limit < self.max_concurrency:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                self._condition.notify_all()
+
+    def _on_throttle(self, delay, started):
+        with self._condition:
+            self.throttle_count += 1
+            now = time.monotonic()
+            # Decrease once per throttling episode: requests already in flight
+            # before the last decrease do not reduce the limit again
+            if started >= self._last_decrease:
+                self._last_decrease = now
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self.logger.warning(f"Throttled by SharePoint, pausing {delay:.1f}s "
+                                    f"and reducing concurrency to {int(self.limit)}")
+            self._paused_until = max(self._paused_until, now + delay)
+
+    @staticmethod
+    def backoff_delay(attempt):
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    @staticmethod
+    def retry_after_seconds(response):
+        """Parse the Retry-After header (seconds or HTTP date), or None."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now().astimezone()).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def execute(self, send):
+        """Send a request through the scheduler, retrying throttled and transient failures."""
+        attempt = 0
+        while True:
+            started = self._acquire()
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._release()
+                if attempt >= MAX_REQUEST_RETRIES:
+                    raise
+                delay = self.backoff_delay(attempt)
+                self.logger.debug(f"Transient error ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                self._release()
+                status = response.status_code
+                if status in THROTTLE_STATUS_CODES:
+                    if attempt >= MAX_REQUEST_RETRIES:
+                        return response
+                    delay = self.retry_after_seconds(response)
+                    if delay is None:
+                        delay = self.backoff_delay(attempt)
+                    self._on_throttle(delay, started)
+                elif status in TRANSIENT_STATUS_CODES:
+                    if attempt >= MAX_REQUEST_RETRIES:
+                        return response
+                    delay = self.backoff_delay(attempt)
+                    self.logger.debug(f"Transient HTTP {status}, retrying in {delay:.1f}s")
+                else:
+                    self._on_success()
+                    return response
+
+            attempt += 1
+            with self._condition:
+                self.retry_count += 1
+            time.sleep(delay)
+
+
+class BandwidthLimiter:
+    """Token bucket shared by all upload workers that caps upload bytes per second.
+
+    The cap comes from --max-mbps or from a schedule file (JSON) of time windows:
+
+        default_mbps  Cap outside the windows (default: --max-mbps)
+        windows       [{"days": ["mon", ..., "fri"], "start": "08:00", "end": "18:00",
+                        "mbps": 5}, ...]
+                      The first window matching the current weekday and time
+                      wins; days default to every day, start/end to all day, and
+                      a window whose end is before its start runs past midnight
+
+    A cap of 0 pauses uploads, null (None) removes the cap. The schedule file
+    is re-read when it changes, so the cap can be changed during a run by
+    editing the file.
+    """
+
+    def __init__(self, logger, max_mbps=None, schedule_file=None):
+        self.logger = logger
+        self.max_mbps = max_mbps
+        self.schedule_file = Path(schedule_file) if schedule_file else None
+        self.default_mbps = max_mbps
+        self.windows = []
+        self.limit_mbps = max_mbps
+
+        self.bytes_sent = 0
+        self.wait_seconds = 0.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._next_check = 0.0
+        self._schedule_mtime = None
+        self._sample_bytes = 0
+        self._sample_time = self._updated
+        self._condition = threading.Condition()
+
+        if self.schedule_file:
+            self._load_schedule()
+        self.limit_mbps = self.scheduled_mbps()
+        self._next_check = self._updated + BANDWIDTH_RECHECK_SECONDS
+
+    @staticmethod
+    def parse_time(value):
+        hours, minutes = str(value).split(':')
+        return int(hours) * 60 + int(minutes)
+
+    def _load_schedule(self):
+        """Read the schedule file (raises ValueError or OSError if it is invalid)."""
+        self._schedule_mtime = self.schedule_file.stat().st_mtime
+        with open(self.schedule_file, 'r', encoding='utf-8') as f:
+            schedule = json.load(f)
+
+        windows = []
+        for window in schedule.get('windows', []):
+            days = [day.lower()[:3] for day in window.get('days', WEEKDAYS)]
+            unknown = [day for day in days if day not in WEEKDAYS]
+            if unknown:
+                raise ValueError(f"Unknown day(s) in bandwidth window: {', '.join(unknown)}")
+            if 'mbps' not in window:
+                raise ValueError(f"Bandwidth window needs mbps (null for unlimited): {window}")
+            windows.append({
+                'days': {WEEKDAYS.index(day) for day in days},
+                'start': self.parse_time(window.get('start', '00:00')),
+                'end': self.parse_time(window.get('end', '24:00')),
+                'mbps': window['mbps'],
+            })
+
+        self.windows = windows
+        self.default_mbps = schedule.get('default_mbps', self.max_mbps)
+
+    def scheduled_mbps(self, now=None):
+        """Return the cap in effect at the given time (default: now)."""
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        weekday = now.weekday()
+        for window in self.windows:
+            if window['start'] <= window['end']:
+                active = window['start'] <= minute < window['end']
+            else:
+                active = minute >= window['start'] or minute < window['end']
+            if active and weekday in window['days']:
+                return window['mbps']
+        return self.default_mbps
+
+    @staticmethod
+    def format_limit(mbps):
+        if mbps is None:
+            return 'unlimited'
+        return 'paused' if mbps <= 0 else f"{mbps:g} MB/s"
+
+    def _refresh(self):
+        """Re-read a changed schedule file and apply the current cap (lock held)."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + BANDWIDTH_RECHECK_SECONDS
+
+        if self.schedule_file:
+            try:
+                if self.schedule_file.stat().st_mtime != self._schedule_mtime:
+                    self._load_schedule()
+                    self.logger.info(f"Bandwidth schedule reloaded: {self.schedule_file}")
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Bandwidth schedule not reloaded, keeping previous: {str(e)}")
+
+        limit = self.scheduled_mbps()
+        if limit != self.limit_mbps:
+            self.logger.info(f"Bandwidth limit: {self.format_limit(limit)} "
+                             f"(was {self.format_limit(self.limit_mbps)})")
+            self.limit_mbps = limit
+            self._tokens = 0.0
+            self._updated = now
+            self._condition.notify_all()
+
+    def acquire(self, size):
+        """Block until size bytes may be sent under the current cap."""
+        with self._condition:
+            waited = time.monotonic()
+            while True:
+                self._refresh()
+                if self.limit_mbps is None:
+                    break
+                rate = self.limit_mbps * 1024 * 1024
+                if rate <= 0:
+                    self._condition.wait(BANDWIDTH_RECHECK_SECONDS)
+                    continue
+
+                now = time.monotonic()
+                capacity = max(rate * BANDWIDTH_BURST_SECONDS, size)
+                self._tokens = min(capacity, self._tokens + (now - self._updated) * rate)
+                self._updated = now
+                if self._tokens >= size:
+                    self._tokens -= size
+                    break
+                self._condition.wait(min((size - self._tokens) / rate, BANDWIDTH_RECHECK_SECONDS))
+
+            self.bytes_sent += size
+            self.wait_seconds += time.monotonic() - waited
+
+    def sample(self):
+        """Return (MB/s sent since the previous sample, cap in MB/s)."""
+        with self._condition:
+            self._refresh()
+            now = time.monotonic()
+            elapsed = now - self._sample_time
+            sent = self.bytes_sent - self._sample_bytes
+            self._sample_time, self._sample_bytes = now, self.bytes_sent
+            return (round(sent / 1024 / 1024 / elapsed, 2) if elapsed else 0), self.limit_mbps
+
+
+class ThrottledBody:
+    """File-like request body that draws from a BandwidthLimiter as it is sent.
+
+    The HTTP client reads the body in small blocks, so a single large request
+    (a whole small file or a 10MB chunk) is spread out at the capped rate
+    instead of being sent in a burst. len() gives the Content-Length.
+    """
+
+    def __init__(self, data, limiter):
+        self._data = memoryview(data)
+        self._offset = 0
+        self._limiter = limiter
+
+    def __len__(self):
+        return len(self._data) - self._offset
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self)
+        block = self._data[self._offset:self._offset + size]
+        if block:
+            self._limiter.acquire(len(block))
+        self._offset += len(block)
+        return block.tobytes()
+
+
+class SchedulingTransport(BaseTransport):
+    """HTTP transport that routes every request through a RequestScheduler.
+
+    With a bandwidth limiter, request bodies of uploads (file content and
+    chunks) are sent through it, so every worker shares one byte-rate cap.
+    """
+
+    def __init__(self, inner, scheduler, bandwidth=None):
+        self._inner = inner
+        self._scheduler = scheduler
+        self._bandwidth = bandwidth
+
+    def execute(self, request):
+        if (self._bandwidth is None or not request.is_bytes
+                or len(request.data) < BANDWIDTH_MIN_BODY_BYTES):
+            return self._scheduler.execute(lambda: self._inner.execute(request))
+
+        data = request.data
+
+        def send():
+            # A fresh body per attempt, so retries resend from the start
+            request.data = ThrottledBody(data, self._bandwidth)
+            try:
+                return self._inner.execute(request)
+            finally:
+                request.data = data
+
+        return self._scheduler.execute(send)
+
+    @property
+    def proxies(self):
+        return self._inner.proxies
+
+    @property
+    def verify(self):
+        return self._inner.verify
+
+    @property
+    def timeout(self):
+        return self._inner.timeout
+
+    @property
+    def auth(self):
+        return self._inner.auth
+
+    def close(self):
+        self._inner.close()
+
+
+def create_http_session(pool_size):
+    """Create a keep-alive HTTP session with a connection pool sized for the workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_connection_stats(session):
+    """Return (connections opened, requests sent) across the session's pools."""
+    connections = 0
+    request_count = 0
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                request_count += pool.num_requests
+    return connections, request_count
+
+
+class TokenCache:
+    """Thread-safe app-only access token cache shared by all client contexts.
+
+    Tokens are refreshed proactively TOKEN_REFRESH_MARGIN_SECONDS before they
+    expire. With a cache file, the token is also stored on disk encrypted with
+    a key derived from the client secret, so back-to-back runs can skip
+    authentication.
+    """
+
+    def __init__(self, config, logger, cache_file=None):
+        self.config = config
+        self.logger = logger
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.acquired_count = 0
+        self._access_token = None
+        self._expires_on = 0.0
+        self._lock = threading.Lock()
+        self._fernet = None
+
+        if self.cache_file:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                logger.warning("cryptography is not installed, on-disk token cache disabled")
+                self.cache_file = None
+            else:
+                secret = f"{config['client_id']}|{config['client_secret']}|{config['site_url']}"
+                key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode('utf-8')).digest())
+                self._fernet = Fernet(key)
+                self._load()
+
+    def _load(self):
+        if not self.cache_file.exists():
+            return
+        try:
+            data = json.loads(self._fernet.decrypt(self.cache_file.read_bytes()))
+        except Exception:
+            self.logger.debug("Ignoring unreadable token cache")
+            return
+        if data.get('site_url') == self.config['site_url']:
+            self._access_token = data['access_token']
+            self._expires_on = float(data['expires_on'])
+            self.logger.debug("Loaded access token from on-disk cache")
+
+    def _save(self):
+        data = json.dumps({
+            'site_url': self.config['site_url'],
+            'access_token': self._access_token,
+            'expires_on': self._expires_on
+        }).encode('utf-8')
+        fd = os.open(self.cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._fernet.encrypt(data))
+
+    def _acquire(self):
+        if self.config.get('access_token'):
+            # Pre-acquired token from config (e.g. the local mock server)
+            self._access_token = self.config['access_token']
+            self._expires_on = time.time() + 3600
+            self.acquired_count += 1
+            return
+
+        from office365.runtime.auth.providers.acs_token_provider import ACSTokenProvider
+
+        credentials = ClientCredential(self.config['client_id'], self.config['client_secret'])
+        token = ACSTokenProvider(self.config['site_url'], credentials).get_app_only_access_token()
+
+        expires_on = getattr(token, 'expiresOn', None)
+        if expires_on:
+            self._expires_on = float(expires_on)
+        else:
+            self._expires_on = time.time() + float(getattr(token, 'expiresIn', 3600))
+        self._access_token = token.accessToken
+        self.acquired_count += 1
+        self.logger.debug("Acquired new access token")
+
+        if self.cache_file:
+            self._save()
+
+    def _needs_refresh(self):
+        return (self._access_token is None or
+                time.time() >= self._expires_on - TOKEN_REFRESH_MARGIN_SECONDS)
+
+    def get_token(self):
+        """Return a valid token; contexts call back here when it is about to expire."""
+        if self._needs_refresh():
+            with self._lock:
+                if self._needs_refresh():
+                    self._acquire()
+
+        # Contexts cache the token until expiresIn, so hand out the time left
+        # before the refresh margin - they then come back for a fresh token
+        remaining = self._expires_on - TOKEN_REFRESH_MARGIN_SECONDS - time.time()
+        return TokenResponse(self._access_token, 'Bearer', expiresIn=max(1, int(remaining)))
+
+
+def create_context(config, scheduler=None, session=None, token_cache=None, bandwidth=None):
+    """Create a SharePoint client context.
+
+    With a token cache, the context authenticates with the shared token; with
+    a session, it sends requests over the shared connection pool; with a
+    scheduler, every request is routed through it (and upload bodies through
+    the bandwidth limiter, if any).
+    """
+    from office365.sharepoint.client_context import ClientContext
+
+    if token_cache:
+        ctx = ClientContext(config['site_url']).with_access_token(token_cache.get_token)
+    else:
+        credentials = ClientCredential(config['client_id'], config['client_secret'])
+        ctx = ClientContext(config['site_url']).with_credentials(credentials)
+
+    request = ctx.pending_request()
+    if session:
+        request.transport = RequestsTransport(session=session)
+    if scheduler:
+        request.transport = SchedulingTransport(request.transport, scheduler, bandwidth)
+
+    return ctx
+
+
+def connect_to_sharepoint(config, logger, context_pool=None):
     """Connect to SharePoint Online using client credentials."""
     logger.info(f"Connecting to SharePoint: {config['site_url']}")
 
     try:
-        credentials = ClientCredential(config['client_id'], config['client_secret'])
-        ctx = ClientContext(config['site_url']).with_credentials(credentials)
+        ctx = context_pool.get() if context_pool else create_context(config)
 
         # Test connection
         web = ctx.web
@@ -135,19 +800,151 @@ def connect_to_sharepoint(config, logger):
         sys.exit(1)
 
 
-def get_library_columns(ctx, library_name, logger):
-    """Get available columns from SharePoint document library."""
-    logger.info(f"Fetching columns from library: {library_name}")
+class ContextPool:
+    """Hands out one client context per thread and site (contexts are not thread-safe).
+
+    All contexts share the scheduler, bandwidth limiter and HTTP session, so
+    every site draws on one concurrency, throttling and bandwidth budget.
+    App-only tokens are issued per tenant host: sites on the configured host
+    share the token cache, other hosts get their own (in memory only).
+    """
+
+    def __init__(self, config, scheduler=None, session=None, token_cache=None, bandwidth=None):
+        self.config = config
+        self.scheduler = scheduler
+        self.session = session
+        self.token_cache = token_cache
+        self.bandwidth = bandwidth
+        self._local = threading.local()
+        self._host_token_caches = {}
+        self._lock = threading.Lock()
+
+    def _get_token_cache(self, site_url):
+        host = urlparse(site_url).netloc.lower()
+        if self.token_cache is None or host == urlparse(self.config['site_url']).netloc.lower():
+            return self.token_cache
+        with self._lock:
+            token_cache = self._host_token_caches.get(host)
+            if token_cache is None:
+                token_cache = TokenCache(dict(self.config, site_url=site_url), self.token_cache.logger)
+                self._host_token_caches[host] = token_cache
+            return token_cache
+
+    @property
+    def tokens_acquired(self):
+        """Access tokens acquired across all tenant hosts."""
+        caches = [self.token_cache] + list(self._host_token_caches.values())
+        return sum(cache.acquired_count for cache in caches if cache is not None)
+
+    def get(self, site_url=None):
+        """Return this thread's context for site_url (default: the configured site)."""
+        site_url = site_url or self.config['site_url']
+        contexts = getattr(self._local, 'contexts', None)
+        if contexts is None:
+            contexts = self._local.contexts = {}
+        ctx = contexts.get(site_url)
+        if ctx is None:
+            ctx = create_context(dict(self.config, site_url=site_url), self.scheduler,
+                                 self.session, self._get_token_cache(site_url), self.bandwidth)
+            contexts[site_url] = ctx
+        return ctx
 
-    try:
-        # Get the library
-        library = ctx.web.lists.get_by_title(library_name)
-        ctx.load(library)
-        ctx.execute_query()
 
-        # Get fields
-        fields = library.fields
-        ctx.load(fields)
+def get_library_schema_version(ctx, library_name):
+    """Return the schema version of a library (list ID and ETag) with one small request.
+
+    The list ETag changes when the list itself changes (fields added, removed
+    or edited), not when items are added.
+    """
+    request = ctx.pending_request()
+    list_title = library_name.replace("'", "''")
+    options = RequestOptions(f"{request.service_root_url}/web/lists/getbytitle('{list_title}')"
+                             f"?$select=Id")
+    options.set_header('Accept', 'application/json;odata=verbose')
+    response = request.execute_request_direct(options)
+    data = response.json().get('d', {})
+    etag = data.get('__metadata', {}).get('etag') or response.headers.get('ETag')
+    return f"{data.get('Id')}:{etag}"
+
+
+class SchemaCache:
+    """On-disk cache of the editable columns of each library (output/schema_cache.json).
+
+    Entries are keyed by site URL and library title and stored with the
+    library's schema version. A cached entry is used when a single request
+    for the current version matches it; each library is checked at most once
+    per run.
+    """
+
+    def __init__(self, cache_file, refresh=False):
+        self.cache_file = Path(cache_file)
+        self.entries = {}
+        self._checked = set()
+        self._lock = threading.Lock()
+        if self.cache_file.exists() and not refresh:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def key(site_url, library_name):
+        return f"{site_url.rstrip('/').lower()}|{library_name.lower()}"
+
+    def get(self, site_url, library_name, version=None):
+        """Return cached columns checked in this run, or matching version; else None."""
+        key = self.key(site_url, library_name)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.get('format') != SCHEMA_CACHE_FORMAT:
+                return None
+            if key in self._checked or (version is not None and entry.get('version') == version):
+                self._checked.add(key)
+                return entry['columns']
+            return None
+
+    def save(self, site_url, library_name, version, columns):
+        key = self.key(site_url, library_name)
+        with self._lock:
+            self.entries[key] = {
+                'format': SCHEMA_CACHE_FORMAT,
+                'version': version,
+                'cached': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'columns': columns,
+            }
+            self._checked.add(key)
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+
+
+def get_library_columns(ctx, library_name, logger, exit_on_error=True, schema_cache=None):
+    """Get available columns from SharePoint document library.
+
+    With a schema cache, the columns are taken from the cache when the
+    library's schema version is unchanged, and cached after a full fetch.
+    Exits on failure unless exit_on_error is False, in which case the error is
+    raised to the caller.
+    """
+    try:
+        version = None
+        if schema_cache:
+            site_url = ctx.base_url
+            columns = schema_cache.get(site_url, library_name)
+            if columns is None:
+                version = get_library_schema_version(ctx, library_name)
+                columns = schema_cache.get(site_url, library_name, version)
+            if columns is not None:
+                logger.info(f"Using cached columns for library: {library_name} "
+                            f"({len(columns)} editable columns, schema unchanged)")
+                return columns
+
+        logger.info(f"Fetching columns from library: {library_name}")
+
+        # Get the fields (only the properties used below) in one request
+        fields = ctx.web.lists.get_by_title(library_name).fields
+        ctx.load(fields, ['Id', 'InternalName', 'Title', 'TypeAsString', 'Required', 'MaxLength',
+                          'Choices', 'FillInChoice', 'Hidden', 'ReadOnlyField'])
         ctx.execute_query()
 
         # Filter to user-editable fields (exclude system fields)
@@ -187,12 +984,22 @@ def get_library_columns(ctx, library_name, logger):
                     field.properties.get('InternalName', '').startswith('_')):
                 continue
 
+            # Choices may be a plain list, a verbose {'results': [...]} collection
+            # or the client's index-keyed mapping of that collection
+            choices = field.properties.get('Choices') or []
+            if isinstance(choices, dict):
+                choices = choices.get('results', list(choices.values()))
+
             # Get field info
             field_info = {
+                'id': field.properties.get('Id'),
                 'internal_name': field.properties.get('InternalName'),
                 'display_name': field.properties.get('Title'),
                 'type': field.properties.get('TypeAsString'),
-                'required': field.properties.get('Required', False)
+                'required': field.properties.get('Required', False),
+                'max_length': field.properties.get('MaxLength'),
+                'choices': [str(choice) for choice in choices],
+                'fill_in': field.properties.get('FillInChoice', False)
             }
 
             # Include common editable types
@@ -203,35 +1010,887 @@ def get_library_columns(ctx, library_name, logger):
                 editable_columns.append(field_info)
 
         logger.info(f"Found {len(editable_columns)} editable columns")
+        if schema_cache:
+            schema_cache.save(ctx.base_url, library_name, version, editable_columns)
         return editable_columns
 
     except Exception as e:
+        if not exit_on_error:
+            raise
         logger.error(f"Failed to get library columns: {str(e)}")
         sys.exit(1)
 
 
-def read_excel_file(excel_path, logger):
-    """Read the Excel file with file list and metadata."""
-    logger.info(f"Reading Excel file: {excel_path}")
+class ManifestReader:
+    """Stream manifest rows from .xlsx (read-only mode), .csv or .parquet.
+
+    Rows are yielded as plain dicts keyed by column name, in chunks of
+    MANIFEST_CHUNK_ROWS, so memory stays constant and uploading can start
+    before the whole manifest has been parsed. Empty cells are None, except
+    the FileName/FilePath/TargetFolder columns which default to ''.
+    """
+
+    def __init__(self, path, chunk_rows=MANIFEST_CHUNK_ROWS):
+        self.path = Path(path)
+        self.chunk_rows = chunk_rows
+        self.format = self.path.suffix.lower().lstrip('.')
+        self.columns = []
+        self.total_rows = None  # None when the format does not expose a row count
+
+        if self.format in ('xlsx', 'xlsm'):
+            from openpyxl import load_workbook
+            wb = load_workbook(self.path, read_only=True, data_only=True)
+            ws = wb.worksheets[0]
+            header = list(next(ws.iter_rows(max_row=1, values_only=True), ()))
+            while header and header[-1] is None:
+                header.pop()
+            self.columns = [str(col) if col is not None else f"Unnamed: {idx}"
+                            for idx, col in enumerate(header)]
+            if ws.max_row:
+                self.total_rows = ws.max_row - 1
+            wb.close()
+        elif self.format in ('csv', 'txt'):
+            with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+                self.columns = next(csv.reader(f), [])
+        elif self.format == 'parquet':
+            parquet_file = self._open_parquet()
+            self.columns = list(parquet_file.schema_arrow.names)
+            self.total_rows = parquet_file.metadata.num_rows
+        else:
+            raise ValueError(f"Unsupported manifest format: .{self.format} (use .xlsx, .csv or .parquet)")
+
+    def _open_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("pyarrow is required for Parquet manifests. Please run: pip install pyarrow")
+        return pq.ParquetFile(self.path)
+
+    def _iter_raw_rows(self):
+        """Yield rows as tuples of cell values in column order."""
+        width = len(self.columns)
+
+        if self.format in ('xlsx', 'xlsm'):
+            from openpyxl import load_workbook
+            wb = load_workbook(self.path, read_only=True, data_only=True)
+            try:
+                for values in wb.worksheets[0].iter_rows(min_row=2, values_only=True):
+                    yield values[:width]
+            finally:
+                wb.close()
+
+        elif self.format in ('csv', 'txt'):
+            with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for values in reader:
+                    yield tuple(value if value != '' else None for value in values[:width])
+
+        else:
+            parquet_file = self._open_parquet()
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_rows):
+                columns = [column.to_pylist() for column in batch.columns]
+                yield from zip(*columns)
+
+    def iter_chunks(self):
+        """Yield lists of row dicts, MANIFEST_CHUNK_ROWS rows at a time."""
+        columns = self.columns
+        chunk = []
+        for values in self._iter_raw_rows():
+            if all(value is None for value in values):
+                continue  # Blank row
+            row = dict(zip(columns, values))
+            for col in SYSTEM_COLUMNS:
+                if row.get(col) is None:
+                    row[col] = ''
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+
+def open_manifest(manifest_path, logger):
+    """Open the manifest (file list and metadata) for streaming."""
+    logger.info(f"Reading manifest: {manifest_path}")
+
+    try:
+        manifest = ManifestReader(manifest_path)
+        if manifest.total_rows is not None:
+            logger.info(f"Found {manifest.total_rows} rows in manifest")
+        logger.info(f"Columns: {manifest.columns}")
+        return manifest
+
+    except Exception as e:
+        logger.error(f"Failed to read manifest: {str(e)}")
+        sys.exit(1)
+
+
+class ScanSource(ManifestReader):
+    """Stream upload rows straight from a file server scan, without a manifest file.
+
+    Consumes the record stream of file_server_audit.iter_audit_records and
+    applies a rules file (JSON):
+
+        mappings         [{"source": "D:\\Data\\Finance", "target": "Finance"}, ...]
+                         Source folder (scanned) to target library folder; for
+                         nested sources the longest matching prefix wins
+        exclude_folders  Folder path patterns, pruned during the scan
+                         (same syntax as the audit --exclude option)
+        exclude_files    File name patterns, e.g. "~$*", "*.tmp", "Thumbs.db"
+        metadata         {"Column": rule, ...} where rule is one of
+                         {"segment": N}   Nth folder below the mapping source
+                         {"regex": "..."} first group (or match) in the relative path
+                         {"field": "..."} scan field: name, extension, size, modified,
+                                          folder_path
+                         {"value": "..."} constant
+
+    Rows look exactly like manifest rows (FileName, FilePath, TargetFolder and
+    one column per metadata rule), so mapping, conversion and upload are shared.
+    """
+
+    def __init__(self, rules_path, logger, chunk_rows=MANIFEST_CHUNK_ROWS):
+        self.path = Path(rules_path)
+        self.chunk_rows = chunk_rows
+        self.format = 'scan'
+        self.total_rows = None  # Unknown until the scan finishes
+        self.logger = logger
+        self.stats = {}
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+
+        self.mappings = []
+        for mapping in rules.get('mappings', []):
+            source = os.path.normpath(mapping['source'])
+            target = '/'.join(part for part in mapping.get('target', '').replace('\\', '/').split('/')
+                              if part)
+            self.mappings.append((os.path.normcase(source), source, target))
+        if not self.mappings:
+            raise ValueError(f"No mappings in rules file: {rules_path}")
+        self.mappings.sort(key=lambda mapping: len(mapping[0]), reverse=True)
+
+        self.exclude_folders = [pattern.replace('/', '\\').lower()
+                                for pattern in rules.get('exclude_folders', [])]
+        self.exclude_files = [pattern.lower() for pattern in rules.get('exclude_files', [])]
+
+        self.metadata_rules = []
+        for column, rule in rules.get('metadata', {}).items():
+            if 'regex' in rule:
+                rule = dict(rule, regex=re.compile(rule['regex'], re.IGNORECASE))
+            elif 'field' in rule and rule['field'] not in SCAN_RECORD_FIELDS:
+                raise ValueError(f"Metadata rule '{column}': unknown field '{rule['field']}' "
+                                 f"(use {', '.join(SCAN_RECORD_FIELDS)})")
+            elif not {'segment', 'value', 'field'} & set(rule):
+                raise ValueError(f"Metadata rule '{column}' needs segment, regex, field or value")
+            self.metadata_rules.append((column, rule))
+
+        self.columns = SYSTEM_COLUMNS + [column for column, _ in self.metadata_rules]
+
+        # Scan each mapping source once; sources nested in another are covered by it
+        sources = sorted(self.mappings, key=lambda mapping: len(mapping[0]))
+        self.roots = []
+        for key, source, _ in sources:
+            if not any(key == root_key or key.startswith(root_key.rstrip(os.sep) + os.sep)
+                       for root_key, _ in self.roots):
+                self.roots.append((key, source))
+
+    def _map_path(self, folder_path):
+        """Return (target prefix, relative folder parts) for a scanned folder."""
+        key = os.path.normcase(os.path.normpath(folder_path))
+        for source_key, _, target in self.mappings:
+            if key == source_key or key.startswith(source_key.rstrip(os.sep) + os.sep):
+                relative = os.path.normpath(folder_path)[len(source_key):].strip(os.sep)
+                return target, [part for part in relative.split(os.sep) if part]
+
+    def _derive_metadata(self, record, parts):
+        values = []
+        for _, rule in self.metadata_rules:
+            if 'segment' in rule:
+                value = parts[rule['segment']] if rule['segment'] < len(parts) else None
+            elif 'regex' in rule:
+                match = rule['regex'].search('/'.join(parts + [record['name']]))
+                value = (match.group(1) if match.groups() else match.group(0)) if match else None
+            elif 'field' in rule:
+                value = record.get(rule['field'])
+            else:
+                value = rule['value']
+            values.append(value)
+        return values
+
+    def _iter_raw_rows(self):
+        if str(AUDIT_SCRIPT_DIR) not in sys.path:
+            sys.path.insert(0, str(AUDIT_SCRIPT_DIR))
+        import file_server_audit
+
+        self.stats = {'mapped': 0, 'excluded_files': 0}
+        for _, root in self.roots:
+            for record in file_server_audit.iter_audit_records(
+                    root, self.logger, self.exclude_folders, self.stats, include_permissions=False):
+                if record['record_type'] == 'Error':
+                    self.logger.warning(f"Scan error: {record['path']}: {record['error_message']}")
+                    continue
+                if record['record_type'] != 'File':
+                    continue
+
+                name = record['name']
+                if any(fnmatch.fnmatch(name.lower(), pattern) for pattern in self.exclude_files):
+                    self.stats['excluded_files'] += 1
+                    continue
+
+                target, parts = self._map_path(record['folder_path'])
+
+                self.stats['mapped'] += 1
+                yield (name, record['folder_path'], '/'.join([target] + parts if target else parts),
+                       *self._derive_metadata(record, parts))
+
+        self.logger.info(f"Scan complete: {self.stats['files']} files found, "
+                         f"{self.stats['mapped']} queued for upload, "
+                         f"{self.stats['excluded_files']} excluded by name, "
+                         f"{self.stats['errors']} errors")
+
+
+def open_scan_source(rules_path, logger):
+    """Open a file server scan (pipeline rules file) as the upload source."""
+    logger.info(f"Reading pipeline rules: {rules_path}")
 
     try:
-        df = pd.read_excel(excel_path)
-        logger.info(f"Found {len(df)} rows in Excel file")
-        logger.info(f"Columns: {list(df.columns)}")
-        return df
+        source = ScanSource(rules_path, logger)
+        for _, root in source.roots:
+            if not os.path.isdir(root):
+                raise ValueError(f"Scan root is not a folder: {root}")
+            logger.info(f"Scan root: {root}")
+        logger.info(f"Columns: {source.columns}")
+        return source
 
     except Exception as e:
-        logger.error(f"Failed to read Excel file: {str(e)}")
+        logger.error(f"Failed to read pipeline rules: {str(e)}")
         sys.exit(1)
 
 
-def get_metadata_columns(df):
-    """Identify metadata columns from Excel (excluding FileName, FilePath, TargetFolder)."""
-    system_columns = ['FileName', 'FilePath', 'TargetFolder']
-    metadata_columns = [col for col in df.columns if col not in system_columns]
+def is_missing(value):
+    """True for an empty manifest cell (None, or NaN from a numeric column)."""
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def get_metadata_columns(columns):
+    """Identify metadata columns from manifest (excluding system and routing columns)."""
+    metadata_columns = [col for col in columns if col not in SYSTEM_COLUMNS + ROUTING_COLUMNS]
     return metadata_columns
 
 
+def get_name_issue(name):
+    """Return why SharePoint will reject a file or folder name, or None if it is valid."""
+    if not name:
+        return 'Empty name'
+    if len(name) > MAX_NAME_LENGTH:
+        return f'Name longer than {MAX_NAME_LENGTH} characters'
+    bad_chars = sorted(set(name) & INVALID_NAME_CHARS)
+    if bad_chars:
+        return f"Invalid character(s): {' '.join(bad_chars)}"
+    if name != name.strip():
+        return 'Leading or trailing space'
+    if name.endswith('.'):
+        return 'Name ends with a period'
+    if name.startswith('~$'):
+        return 'Name starts with ~$'
+    if name.lower() in RESERVED_NAMES or name.split('.')[0].lower() in RESERVED_NAMES - {'.lock'}:
+        return 'Reserved name'
+    if '_vti_' in name.lower():
+        return 'Name contains _vti_'
+    return None
+
+
+def check_manifest_file(row):
+    """Stat and open one manifest file. Returns (row, size, mtime, issue, detail)."""
+    local_path = os.path.join(row['FilePath'], row['FileName'])
+    try:
+        stat_info = os.stat(local_path)
+    except FileNotFoundError:
+        return row, 0, None, 'MISSING', f'File not found: {local_path}'
+    except OSError as e:
+        return row, 0, None, 'UNREADABLE', str(e)
+
+    try:
+        with open(local_path, 'rb'):
+            pass
+    except OSError as e:
+        return row, stat_info.st_size, stat_info.st_mtime, 'UNREADABLE', str(e)
+
+    return row, stat_info.st_size, stat_info.st_mtime, None, None
+
+
+def get_local_path_key(row):
+    """Normalized local path of a manifest row (case-insensitive on Windows)."""
+    return os.path.normcase(os.path.abspath(os.path.join(row['FilePath'], row['FileName'])))
+
+
+def hash_file(path, limit=None):
+    """Hash a file, or only its first limit bytes (BLAKE2b, faster than SHA-256)."""
+    digest = hashlib.blake2b(digest_size=32)
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(DEDUP_HASH_BLOCK if remaining is None else min(DEDUP_HASH_BLOCK, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def find_duplicate_content(manifest, targets, logger, min_size=DEDUP_MIN_FILE_SIZE):
+    """Find manifest files whose content is uploaded more than once, per target site.
+
+    Files are stat'ed in parallel and grouped by site and size. Only files
+    sharing a size get a partial hash (first DEDUP_PARTIAL_BYTES), and only
+    files sharing a partial hash are hashed in full. A path listed in several
+    rows counts as a duplicate without hashing.
+
+    Returns {(site, local path key): content key} for the files to deduplicate.
+    """
+    logger.info("-" * 60)
+    logger.info("Finding duplicate content...")
+    logger.info("-" * 60)
+
+    def stat_row(row):
+        try:
+            return row, os.path.getsize(os.path.join(row['FilePath'], row['FileName']))
+        except OSError:
+            return row, None  # Reported when the row is uploaded
+
+    # Pass 1 - group by site and size; rows per path
+    by_size = {}
+    for row, size in run_in_pool(iter(manifest), stat_row, PREFLIGHT_WORKERS):
+        if size is None or size < min_size:
+            continue
+        site = targets.route(row).site_url.lower()
+        paths = by_size.setdefault((site, size), {})
+        path_key = get_local_path_key(row)
+        paths[path_key] = paths.get(path_key, 0) + 1
+
+    content_keys = {}
+    candidates = []
+    for (site, size), paths in by_size.items():
+        for path_key, count in paths.items():
+            if count > 1:
+                content_keys[(site, path_key)] = ('path', site, path_key)
+        if len(paths) > 1:
+            candidates.extend(((site, size), path_key) for path_key in paths)
+    del by_size
+
+    def hash_candidate(candidate, limit):
+        group, path_key = candidate
+        try:
+            return group, path_key, hash_file(path_key, limit)
+        except OSError:
+            return group, path_key, None
+
+    # Pass 2 - partial hash of files sharing a size; pass 3 - full hash of files
+    # sharing a partial hash
+    for limit in (DEDUP_PARTIAL_BYTES, None):
+        groups = {}
+        for group, path_key, digest in run_in_pool(candidates, lambda c: hash_candidate(c, limit),
+                                                   PREFLIGHT_WORKERS):
+            if digest is not None:
+                groups.setdefault(group + (digest,), []).append(path_key)
+        candidates = [(group, path_key) for group, path_keys in groups.items()
+                      if len(path_keys) > 1 for path_key in path_keys]
+
+    for group, path_keys in groups.items():
+        if len(path_keys) > 1:
+            site = group[0]
+            for path_key in path_keys:
+                content_keys[(site, path_key)] = ('content',) + group
+
+    distinct = len(set(content_keys.values()))
+    logger.info(f"Duplicate content: {len(content_keys)} file(s) sharing {distinct} distinct "
+                f"content(s) (files of {min_size // 1024} KB and larger)")
+    return content_keys
+
+
+class QuickXorHash:
+    """QuickXorHash, the content hash SharePoint and OneDrive report for files.
+
+    Byte n of the input is XORed into a 160-bit circular register at bit
+    (n * 11) mod 160, and the input length is XORed into the last 8 bytes.
+    The shifts repeat every 160 bytes, so each buffer is first XOR-folded
+    into 160 columns with NumPy (20 uint64 lanes per cycle, at disk speed);
+    only the 160 folded bytes are ever shifted into the register.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self._columns = np.zeros(QUICKXOR_WIDTH, dtype=np.uint8)
+        self._length = 0
+
+    def update(self, data):
+        import numpy as np
+
+        view = np.frombuffer(data, dtype=np.uint8)
+        if not len(view):
+            return
+
+        whole = len(view) - len(view) % QUICKXOR_WIDTH
+        folded = np.zeros(QUICKXOR_WIDTH, dtype=np.uint8)
+        if whole:
+            lanes = view[:whole].view(np.uint64).reshape(-1, QUICKXOR_WIDTH // 8)
+            folded ^= np.bitwise_xor.reduce(lanes, axis=0).view(np.uint8)
+        tail = view[whole:]
+        folded[:len(tail)] ^= tail
+
+        # Column j of this buffer is column (length + j) mod 160 of the input
+        self._columns ^= np.roll(folded, self._length % QUICKXOR_WIDTH)
+        self._length += len(view)
+
+    def digest(self):
+        width_bits = QUICKXOR_WIDTH
+        register = 0
+        for column, value in enumerate(self._columns.tolist()):
+            if value:
+                shifted = value << (column * QUICKXOR_SHIFT % width_bits)
+                register ^= (shifted & ((1 << width_bits) - 1)) ^ (shifted >> width_bits)
+
+        result = bytearray(register.to_bytes(width_bits // 8, 'little'))
+        for idx, value in enumerate(self._length.to_bytes(8, 'little')):
+            result[len(result) - 8 + idx] ^= value
+        return bytes(result)
+
+    def b64digest(self):
+        """Digest in the base64 form returned by SharePoint (file.hashes.quickXorHash)."""
+        return base64.b64encode(self.digest()).decode('ascii')
+
+
+def quick_xor_file(path):
+    """QuickXorHash of a file (base64), read in whole hash cycles into one reused buffer."""
+    hasher = QuickXorHash()
+    buffer = bytearray(QUICKXOR_READ_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            hasher.update(view[:count])
+    return hasher.b64digest()
+
+
+def format_duration(seconds):
+    """Format seconds as e.g. '2h 05m 10s'."""
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def estimate_duration(file_count, total_bytes, workers, throughput_mbps, file_overhead):
+    """Estimate upload duration (seconds) from the throughput model.
+
+    Per-file request overhead is spread across workers; data transfer is
+    bounded by the aggregate bandwidth.
+    """
+    overhead_seconds = file_count * file_overhead / max(1, workers)
+    transfer_seconds = total_bytes / (throughput_mbps * 1024 * 1024)
+    return overhead_seconds + transfer_seconds
+
+
+def run_preflight(manifest, targets, args, output_dir, logger):
+    """Validate every manifest row before upload and produce an upload plan.
+
+    Files are stat'ed concurrently. Missing and unreadable files, names
+    SharePoint will reject, duplicate target paths and metadata values that
+    do not match the SharePoint field types are written to a pre-flight
+    report. Returns a plan dict with counts, bytes and the estimated duration
+    of the rows that have no issue.
+    """
+    logger.info("-" * 60)
+    logger.info("Running pre-flight validation...")
+    logger.info("-" * 60)
+
+    report_file = output_dir / f"preflight_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    worksheet = wb.create_sheet('Preflight Issues')
+    report_columns = ['FileName', 'FilePath', 'TargetFolder', 'Issue', 'Detail']
+    for idx, width in enumerate([40, 60, 40, 15, 80], 1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = width
+    worksheet.append(report_columns)
+
+    plan = {
+        'files': 0,
+        'bytes': 0,
+        'large_files': 0,
+        'issues': {},
+    }
+    seen_targets = set()
+
+    def add_issue(row, issue, detail):
+        plan['issues'][issue] = plan['issues'].get(issue, 0) + 1
+        worksheet.append([row['FileName'], row['FilePath'], row['TargetFolder'], issue, detail])
+        row[ROW_BLOCKED] = True
+
+    def rows_with_name_checks():
+        """Check names and duplicate targets while rows stream to the stat workers."""
+        for row in iter_converted_rows(manifest, targets):
+            target = row[ROW_TARGET]
+            if target.error:
+                add_issue(row, 'TARGET_UNAVAILABLE', f"{target}: {target.error}")
+
+            for message in row[ROW_INVALID]:
+                add_issue(row, 'INVALID_VALUE', message)
+
+            target_folder = row['TargetFolder']
+            folder = '' if is_missing(target_folder) else str(target_folder).strip().strip('/')
+            target_path = f"{folder}/{row['FileName']}" if folder else str(row['FileName'])
+
+            for name in [part for part in folder.split('/') if part] + [str(row['FileName'])]:
+                issue = get_name_issue(name)
+                if issue:
+                    add_issue(row, 'INVALID_NAME', f"{name}: {issue}")
+                    break
+
+            if len(target_path) > MAX_PATH_LENGTH:
+                add_issue(row, 'PATH_TOO_LONG', f"{len(target_path)} characters: {target_path}")
+
+            key = (target.key, target_path.lower())
+            if key in seen_targets:
+                add_issue(row, 'DUPLICATE_TARGET', f"Target path already used in manifest: {target_path}")
+            else:
+                seen_targets.add(key)
+
+            yield row
+
+    checked = 0
+    for row, size, _, issue, detail in run_in_pool(rows_with_name_checks(), check_manifest_file,
+                                                   PREFLIGHT_WORKERS):
+        checked += 1
+        if checked % 10000 == 0:
+            logger.info(f"  Checked {checked} files...")
+        if issue:
+            add_issue(row, issue, detail)
+        if row.get(ROW_BLOCKED):
+            continue  # Reported above; not part of the plan
+        plan['files'] += 1
+        plan['bytes'] += size
+        if size > LARGE_FILE_THRESHOLD:
+            plan['large_files'] += 1
+
+    wb.save(report_file)
+
+    plan['estimated_seconds'] = estimate_duration(plan['files'], plan['bytes'], args.workers,
+                                                  args.throughput_mbps, args.file_overhead)
+    plan['report_file'] = report_file
+
+    logger.info("UPLOAD PLAN")
+    logger.info(f"  Files to upload: {plan['files']}")
+    logger.info(f"  Total size: {plan['bytes'] / 1024 / 1024 / 1024:.2f} GB")
+    logger.info(f"  Large files (chunked): {plan['large_files']}")
+    for issue, count in sorted(plan['issues'].items()):
+        logger.warning(f"  {issue}: {count}")
+    logger.info(f"  Estimated duration: {format_duration(plan['estimated_seconds'])} "
+                f"({args.workers} workers, {args.throughput_mbps} MB/s, "
+                f"{args.file_overhead}s per file)")
+    logger.info(f"  Pre-flight report: {report_file}")
+
+    return plan
+
+
+def verify_row(item):
+    """Compare one manifest row with its remote file: existence, size, then content hash."""
+    row, target_url, remote = item
+    local_path = os.path.join(row.get('FilePath', ''), row.get('FileName', ''))
+    try:
+        size = os.path.getsize(local_path)
+    except OSError as e:
+        return item, 'LOCAL_MISSING', str(e), 0
+
+    if remote is None:
+        return item, 'MISSING', 'Not found in SharePoint', 0
+    if remote['size'] != size:
+        return item, 'SIZE_MISMATCH', f"Local {size} bytes, remote {remote['size']} bytes", 0
+    if not remote['quick_xor']:
+        return item, 'SIZE_ONLY', 'Size matches; SharePoint reported no content hash', 0
+
+    try:
+        local_hash = quick_xor_file(local_path)
+    except OSError as e:
+        return item, 'LOCAL_MISSING', str(e), 0
+    if local_hash != remote['quick_xor']:
+        return item, 'HASH_MISMATCH', f"Local {local_hash}, remote {remote['quick_xor']}", size
+    return item, 'VERIFIED', '', size
+
+
+def run_verification(manifest, targets, output_dir, logger):
+    """Verify uploaded files against SharePoint and write a re-upload manifest.
+
+    Remote sizes and QuickXorHashes come from one paged listing per target
+    library; local files whose size matches are hashed in parallel. Rows that
+    are missing or differ are written, with their original columns, to a CSV
+    manifest that can be passed straight back to --source. Returns the
+    status counts.
+    """
+    logger.info("-" * 60)
+    logger.info("Verifying uploaded files...")
+    logger.info("-" * 60)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report_file = output_dir / f"verify_report_{timestamp}.xlsx"
+    reupload_file = output_dir / f"reupload_manifest_{timestamp}.csv"
+
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    worksheet = wb.create_sheet('Verification')
+    for idx, width in enumerate([40, 60, 40, 80, 15, 80], 1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = width
+    worksheet.append(['FileName', 'FilePath', 'TargetFolder', 'TargetUrl', 'Status', 'Detail'])
+
+    counts = {}
+    hashed_bytes = 0
+    started = time.monotonic()
+
+    def rows_to_verify():
+        for row in iter_converted_rows(manifest, targets):
+            target = row[ROW_TARGET]
+            if target.error:
+                counts['TARGET_UNAVAILABLE'] = counts.get('TARGET_UNAVAILABLE', 0) + 1
+                worksheet.append([row['FileName'], row['FilePath'], row['TargetFolder'], '',
+                                  'TARGET_UNAVAILABLE', f"{target}: {target.error}"])
+                continue
+            target_url = get_target_url(target.root_url, row['TargetFolder'], row['FileName'])
+            yield row, target_url, target.remote_index.get(target_url.lower())
+
+    with open(reupload_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(manifest.columns)
+
+        for (row, target_url, _), status, detail, size in run_in_pool(rows_to_verify(), verify_row,
+                                                                      VERIFY_WORKERS):
+            counts[status] = counts.get(status, 0) + 1
+            hashed_bytes += size
+            if status != 'VERIFIED':
+                worksheet.append([row['FileName'], row['FilePath'], row['TargetFolder'], target_url,
+                                  status, detail])
+            if status in REUPLOAD_STATUSES:
+                writer.writerow(['' if is_missing(row.get(col)) else row.get(col)
+                                 for col in manifest.columns])
+
+            checked = sum(counts.values())
+            if checked % 10000 == 0:
+                logger.info(f"  Verified {checked} files...")
+
+    wb.save(report_file)
+    elapsed = time.monotonic() - started
+    reupload_count = sum(counts.get(status, 0) for status in REUPLOAD_STATUSES)
+
+    logger.info("VERIFICATION SUMMARY")
+    logger.info(f"  Verified (size and hash): {counts.get('VERIFIED', 0)}")
+    for status, count in sorted(counts.items()):
+        if status != 'VERIFIED':
+            logger.warning(f"  {status}: {count}")
+    logger.info(f"  Hashed: {hashed_bytes / 1024 / 1024:.1f} MB in {format_duration(elapsed)} "
+                f"({hashed_bytes / 1024 / 1024 / max(elapsed, 0.001):.1f} MB/s)")
+    logger.info(f"  Verification report: {report_file}")
+    if reupload_count:
+        logger.info(f"  Re-upload manifest ({reupload_count} rows): {reupload_file}")
+    else:
+        reupload_file.unlink()
+
+    return counts
+
+
+def field_value_matches(field_type, mapped, current, utc_offsets):
+    """True when a list item's current field value equals the mapped (converted) value."""
+    if isinstance(current, dict) and 'results' in current:
+        current = current['results']  # Verbose collection
+    if field_type == 'MultiChoice':
+        if isinstance(current, str):
+            current = current.split(';#')
+        return sorted(str(value) for value in current or [] if value) == sorted(map(str, mapped))
+    if field_type == 'URL':
+        current = current or {}
+        return (current.get('Url'), current.get('Description')) == (mapped.Url, mapped.Description)
+    if current is None or current == '':
+        return False
+    if field_type in ('Number', 'Currency'):
+        try:
+            return float(current) == float(mapped)
+        except (TypeError, ValueError):
+            return False
+    if field_type == 'Boolean':
+        return (str(current).lower() in ('true', '1')) == bool(mapped)
+    if field_type == 'DateTime':
+        local = datetime.fromisoformat(mapped)
+        try:
+            remote = datetime.fromisoformat(str(current).replace('Z', '+00:00'))
+        except ValueError:
+            return False
+        if remote.tzinfo is None:
+            return remote == local
+        remote = remote.replace(tzinfo=None)
+        return any(remote + timedelta(minutes=offset) == local for offset in utc_offsets)
+    return str(current) == str(mapped)
+
+
+def queue_item_updates(ctx, library, updates):
+    """Queue field updates of list items (item ID, {field: value}) on the context.
+
+    The list item entity type is resolved first, locally (the library must
+    carry its Id and entity type), so the queued updates can be sent together
+    in one $batch request.
+    """
+    items = []
+    for item_id, fields in updates:
+        item = library.get_item_by_id(item_id)
+        item.ensure_type_name(library)
+        items.append(item)
+    ctx.execute_query()  # Resolves the entity type names, no request is sent
+    for item, (_, fields) in zip(items, updates):
+        for key, value in fields.items():
+            item.set_property(key, value)
+        item.update()
+
+
+def apply_metadata_batch(ctx, target, updates, logger):
+    """Send list item updates in one $batch request; returns [(update, error)].
+
+    Setting a field to the same value again is harmless, so a failed batch is
+    simply replayed one item at a time to find the items at fault.
+    """
+    library = ctx.web.lists.get_by_title(target.library)
+    for name, value in target.list_properties.items():
+        library.set_property(name, value, False)
+    try:
+        queue_item_updates(ctx, library, [(update['item_id'], update['changed']) for update in updates])
+        ctx.execute_batch(items_per_batch=len(updates))
+        return [(update, None) for update in updates]
+    except Exception as e:
+        logger.debug(f"Batch failed, retrying item by item: {str(e)}")
+
+    results = []
+    for update in updates:
+        try:
+            queue_item_updates(ctx, library, [(update['item_id'], update['changed'])])
+            ctx.execute_query()
+            results.append((update, None))
+        except Exception as e:
+            results.append((update, str(e)))
+    return results
+
+
+def run_metadata_update(manifest, targets, context_pool, output_dir, logger, batch_size=None):
+    """Re-apply manifest metadata to files already in SharePoint, without uploading.
+
+    Each target library is listed once (item IDs and current values of the
+    mapped fields); every manifest row is resolved to its list item through
+    that index and only the fields whose value differs are sent, in $batch
+    requests of batch_size (default METADATA_BATCH_SIZE) items. File content
+    is not touched. Rows whose fields all match are reported as UP_TO_DATE.
+    Returns the status counts.
+    """
+    batch_size = batch_size or METADATA_BATCH_SIZE
+
+    logger.info("-" * 60)
+    logger.info(f"Re-applying metadata to existing files ({batch_size} updates per batch)...")
+    logger.info("-" * 60)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report_file = output_dir / f"metadata_report_{timestamp}.xlsx"
+
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    worksheet = wb.create_sheet('Metadata')
+    for idx, width in enumerate([40, 60, 40, 80, 18, 80], 1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = width
+    worksheet.append(['FileName', 'FilePath', 'TargetFolder', 'TargetUrl', 'Status', 'Detail'])
+
+    counts = {}
+    fields_sent = 0
+    pending = {}  # Target key -> (target, updates waiting for a batch)
+    started = time.monotonic()
+
+    def add_result(row, target_url, status, detail=''):
+        counts[status] = counts.get(status, 0) + 1
+        worksheet.append([row['FileName'], row['FilePath'], row['TargetFolder'], target_url, status, detail])
+        done = sum(counts.values())
+        if done % 10000 == 0:
+            logger.info(f"  Checked {done} rows...")
+
+    def flush(target, updates):
+        nonlocal fields_sent
+        ctx = context_pool.get(target.site_url)
+        for update, error in apply_metadata_batch(ctx, target, updates, logger):
+            if error:
+                logger.error(f"  Failed: {update['target_url']}: {error}")
+                add_result(update['row'], update['target_url'], 'ERROR', error)
+            else:
+                fields_sent += len(update['changed'])
+                add_result(update['row'], update['target_url'], 'UPDATED',
+                           f"Changed: {', '.join(update['changed'])}")
+
+    for row in iter_converted_rows(manifest, targets):
+        target = row[ROW_TARGET]
+        if target.error:
+            add_result(row, '', 'TARGET_UNAVAILABLE', f"{target}: {target.error}")
+            continue
+        target_url = get_target_url(target.root_url, row['TargetFolder'], row['FileName'])
+        if row.get(ROW_INVALID):
+            add_result(row, target_url, 'INVALID_METADATA', '; '.join(row[ROW_INVALID]))
+            continue
+        remote = target.remote_index.get(target_url.lower())
+        if remote is None:
+            add_result(row, target_url, 'NOT_FOUND', 'Not found in SharePoint (upload it first)')
+            continue
+
+        field_types = {sp_col: field_type for _, sp_col, field_type, _ in target.converters}
+        changed = {field: value for field, value in row[ROW_METADATA].items()
+                   if not field_value_matches(field_types[field], value, remote['fields'].get(field),
+                                              target.utc_offsets)}
+        if not changed:
+            add_result(row, target_url, 'UP_TO_DATE')
+            continue
+
+        updates = pending.setdefault(target.key, (target, []))[1]
+        updates.append({'row': row, 'target_url': target_url, 'item_id': remote['id'], 'changed': changed})
+        if len(updates) >= batch_size:
+            flush(target, updates)
+            updates.clear()
+
+    for target, updates in pending.values():
+        if updates:
+            flush(target, updates)
+
+    wb.save(report_file)
+    elapsed = time.monotonic() - started
+
+    logger.info("METADATA SUMMARY")
+    logger.info(f"  Updated: {counts.get('UPDATED', 0)} ({fields_sent} field values sent)")
+    logger.info(f"  Up to date: {counts.get('UP_TO_DATE', 0)}")
+    for status, count in sorted(counts.items()):
+        if status not in ('UPDATED', 'UP_TO_DATE'):
+            logger.warning(f"  {status}: {count}")
+    logger.info(f"  Duration: {format_duration(elapsed)}")
+    logger.info(f"  Metadata report: {report_file}")
+
+    return counts
+
+
 def interactive_column_mapping(excel_columns, sp_columns, logger):
     """Interactive wizard to map Excel columns to SharePoint columns."""
     print("\n" + "=" * 60)
@@ -302,9 +1961,296 @@ def interactive_column_mapping(excel_columns, sp_columns, logger):
     return mapping
 
 
-def ensure_folder_exists(ctx, library_name, folder_path, logger):
-    """Ensure target folder exists in SharePoint, create if not."""
-    if not folder_path or pd.isna(folder_path):
+def _as_strings(series):
+    """Stripped string values of a Series (missing values stay missing)."""
+    return series[series.notna()].astype(str).str.strip()
+
+
+def text_converter(max_length):
+    def convert(series):
+        values = _as_strings(series)
+        return values, values.str.len() > max_length
+    return convert
+
+
+def number_converter(series):
+    import pandas as pd
+
+    values = pd.to_numeric(series, errors='coerce')
+    return values[values.notna()], series.notna() & values.isna()
+
+
+def datetime_converter(series):
+    import pandas as pd
+
+    values = pd.to_datetime(series, errors='coerce', format='mixed')
+    valid = values.notna()
+    return values[valid].dt.strftime('%Y-%m-%dT%H:%M:%S'), series.notna() & ~valid
+
+
+def boolean_converter(series):
+    values = _as_strings(series).str.lower().map(BOOLEAN_VALUES)
+    return values[values.notna()], values.isna()
+
+
+def choice_converter(choices, fill_in):
+    def convert(series):
+        values = _as_strings(series)
+        if fill_in or not choices:
+            return values, values.str.len() == 0
+        return values, ~values.isin(choices)
+    return convert
+
+
+def multichoice_converter(choices, fill_in):
+    allowed = None if fill_in or not choices else set(choices)
+
+    def convert(series):
+        parts = _as_strings(series).str.split(';').map(
+            lambda items: [item.strip() for item in items if item.strip()])
+        invalid = parts.map(lambda items: not items or (allowed is not None
+                                                        and not set(items) <= allowed))
+        return parts.map(FieldMultiChoiceValue), invalid
+    return convert
+
+
+def url_converter(series):
+    import pandas as pd
+
+    # "https://url" or "https://url, Description"
+    parts = _as_strings(series).str.split(',', n=1)
+    urls = parts.str.get(0).str.strip()
+    # Object dtype: a chunk of bare URLs has no descriptions at all (all NaN)
+    descriptions = parts.str.get(1).astype(object).str.strip().fillna(urls)
+    invalid = ~(urls.str.match(r'^(https?://|/)'))
+    values = pd.Series([FieldUrlValue(url, description) for url, description in zip(urls, descriptions)],
+                       index=urls.index, dtype=object)
+    return values, invalid
+
+
+def compile_converters(column_mapping, sp_columns, logger):
+    """Compile the column mapping into per-column converters by SharePoint field type.
+
+    Returns a list of (excel_col, sp_col, field_type, converter). Each converter
+    takes a Series and returns (converted values, invalid mask) for the cells
+    that have a value.
+    """
+    fields = {col['internal_name']: col for col in sp_columns}
+    converters = []
+
+    for excel_col, sp_col in column_mapping.items():
+        field = fields.get(sp_col)
+        if field is None:
+            logger.warning(f"Mapped column '{sp_col}' not found in library, treating as Text")
+            field = {'type': 'Text'}
+
+        field_type = field['type']
+        if field_type in ('Number', 'Currency'):
+            converter = number_converter
+        elif field_type == 'DateTime':
+            converter = datetime_converter
+        elif field_type == 'Boolean':
+            converter = boolean_converter
+        elif field_type == 'Choice':
+            converter = choice_converter(field.get('choices'), field.get('fill_in'))
+        elif field_type == 'MultiChoice':
+            converter = multichoice_converter(field.get('choices'), field.get('fill_in'))
+        elif field_type == 'URL':
+            converter = url_converter
+        elif field_type == 'Note':
+            converter = text_converter(float('inf'))
+        else:
+            converter = text_converter(field.get('max_length') or TEXT_MAX_LENGTH)
+
+        converters.append((excel_col, sp_col, field_type, converter))
+
+    return converters
+
+
+def convert_metadata_chunk(rows, converters):
+    """Apply compiled converters to a chunk of manifest rows (vectorized per column).
+
+    Attaches the converted SharePoint field values to each row under
+    ROW_METADATA, and messages for invalid cells under ROW_INVALID. Returns the
+    number of invalid cells in the chunk.
+    """
+    for row in rows:
+        row[ROW_METADATA] = {}
+        row[ROW_INVALID] = []
+
+    if not converters or not rows:
+        return 0
+
+    import pandas as pd
+
+    invalid_count = 0
+    for excel_col, sp_col, field_type, converter in converters:
+        series = pd.Series([row.get(excel_col) for row in rows], dtype=object)
+        try:
+            values, invalid = converter(series)
+        except Exception as e:
+            # Unexpected values: fail this column's cells, not the whole run
+            invalid = series.notna() & (series.astype(str).str.strip() != '')
+            for idx in invalid[invalid].index:
+                rows[idx][ROW_INVALID].append(
+                    f"{excel_col}: '{series[idx]}' could not be converted to {field_type} ({e})")
+                invalid_count += 1
+            continue
+
+        for idx, value in values[~invalid.reindex(values.index, fill_value=False)].items():
+            rows[idx][ROW_METADATA][sp_col] = value.item() if hasattr(value, 'item') else value
+
+        for idx in invalid[invalid].index:
+            rows[idx][ROW_INVALID].append(
+                f"{excel_col}: '{series[idx]}' is not a valid {field_type} value")
+            invalid_count += 1
+
+    return invalid_count
+
+
+def iter_converted_rows(manifest, targets):
+    """Stream manifest rows routed to their target, with metadata converted chunk by chunk.
+
+    Rows of a chunk are grouped by target, so each library's converters are
+    still applied to whole columns at a time.
+    """
+    for chunk in manifest.iter_chunks():
+        groups = {}
+        for row in chunk:
+            target = targets.route(row)
+            row[ROW_TARGET] = target
+            groups.setdefault(target.key, (target, []))[1].append(row)
+        for target, rows in groups.values():
+            convert_metadata_chunk(rows, target.converters)
+        yield from chunk
+
+
+class FolderCache:
+    """Thread-safe cache of target folders already known to exist.
+
+    The lock only guards the dicts; a folder being resolved has a Future in
+    in_flight that other workers needing the same folder wait on.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.urls = {}
+        self.in_flight = {}
+
+
+def resolve_site_url(value, default_site):
+    """Resolve a TargetSite cell (absolute URL or /sites/... path) to an absolute site URL."""
+    value = '' if is_missing(value) else str(value).strip().rstrip('/')
+    if not value:
+        return default_site.rstrip('/')
+    if urlparse(value).scheme:
+        return value
+    default = urlparse(default_site)
+    return f"{default.scheme}://{default.netloc}/{value.lstrip('/')}"
+
+
+class UploadTarget:
+    """One destination library, with its own schema, converters and folder cache."""
+
+    def __init__(self, site_url, library):
+        self.site_url = site_url
+        self.library = library
+        self.key = (site_url.lower(), library.lower())
+        self.columns = []
+        self.converters = []
+        self.folder_cache = FolderCache()
+        self.root_url = None  # Server-relative URL of the library root folder
+        self.remote_index = None  # Filled for --sync, --verify and --metadata-only
+        self.list_properties = None  # List Id and item entity type (--metadata-only)
+        self.utc_offsets = [0]  # Site time zone offsets in minutes, for DateTime comparison
+        self.error = None  # Set when the library cannot be loaded; its rows fail
+
+    def __str__(self):
+        return f"{self.library or '(no library)'} ({self.site_url})"
+
+
+class UploadTargets:
+    """Routes manifest rows to their site and library.
+
+    Rows go to the TargetSite / TargetLibrary columns when the manifest has
+    them, otherwise to the configured site and --library. Each target is
+    loaded once, on first use: library fields, compiled converters and, with
+    --sync, the remote file index (with --verify, including content hashes;
+    with --metadata-only, the list item IDs and current mapped field values).
+    """
+
+    def __init__(self, context_pool, column_mapping, default_library, logger, sync=False,
+                 verify=False, schema_cache=None, metadata_only=False):
+        self.context_pool = context_pool
+        self.column_mapping = column_mapping
+        self.default_site = context_pool.config['site_url'].rstrip('/')
+        self.default_library = default_library
+        self.logger = logger
+        self.sync = sync
+        self.verify = verify
+        self.metadata_only = metadata_only
+        self.schema_cache = schema_cache
+        self._targets = {}
+
+    def get(self, site_url, library):
+        key = (site_url.lower(), library.lower())
+        target = self._targets.get(key)
+        if target is None:
+            target = self._targets[key] = self._load(UploadTarget(site_url, library))
+        return target
+
+    def _load(self, target):
+        if not target.library:
+            target.error = 'No target library (set TargetLibrary or --library)'
+            return target
+
+        logger = self.logger
+        logger.info(f"Loading target library: {target}")
+        try:
+            ctx = self.context_pool.get(target.site_url)
+            target.columns = get_library_columns(ctx, target.library, logger, exit_on_error=False,
+                                                 schema_cache=self.schema_cache)
+            target.converters = compile_converters(self.column_mapping, target.columns, logger)
+            target.root_url = get_library_root_url(ctx, target.library)
+            if self.verify:
+                target.remote_index = fetch_drive_index(ctx, target.root_url, logger)
+            elif self.metadata_only:
+                fields = [sp_col for _, sp_col, _, _ in target.converters]
+                target.remote_index = fetch_item_index(ctx, target.library, fields, logger)
+                target.list_properties = get_list_properties(ctx, target.library)
+                if any(field_type == 'DateTime' for _, _, field_type, _ in target.converters):
+                    target.utc_offsets = get_site_utc_offsets(ctx, logger)
+            elif self.sync:
+                target.remote_index = fetch_library_index(ctx, target.library, logger)
+        except Exception as e:
+            target.error = str(e)
+            logger.error(f"Target library not available: {target}: {target.error}")
+        return target
+
+    def route(self, row):
+        """Return the target for a manifest row."""
+        site_url = resolve_site_url(row.get('TargetSite'), self.default_site)
+        library = row.get('TargetLibrary')
+        library = '' if is_missing(library) else str(library).strip()
+        return self.get(site_url, library or self.default_library or '')
+
+    def __iter__(self):
+        return iter(self._targets.values())
+
+    def __len__(self):
+        return len(self._targets)
+
+
+def ensure_folder_exists(ctx, library_name, folder_path, logger, folder_cache=None, root_url=None):
+    """Ensure target folder exists in SharePoint, create if not.
+
+    With a folder_cache, each folder is resolved once per library: workers
+    needing a folder another worker is resolving wait for that result, and
+    parent folders are resolved through the cache too, so workers only
+    serialize on the folders they share. root_url (the library root folder)
+    is fetched when not given.
+    """
+    if not folder_path or is_missing(folder_path):
         return None
 
     folder_path = str(folder_path).strip().strip('/')
@@ -312,17 +2258,52 @@ def ensure_folder_exists(ctx, library_name, folder_path, logger):
     if not folder_path:
         return None
 
-    logger.debug(f"Ensuring folder exists: {folder_path}")
+    if root_url is None:
+        root_url = get_library_root_url(ctx, library_name)
+
+    def ensure_parent(parent_path):
+        ensure_folder_exists(ctx, library_name, parent_path, logger, folder_cache, root_url)
+
+    if folder_cache is None:
+        return resolve_folder(ctx, root_url, folder_path, logger, ensure_parent)
+
+    with folder_cache.lock:
+        target_folder_url = folder_cache.urls.get(folder_path)
+        if target_folder_url:
+            return target_folder_url
+        future = folder_cache.in_flight.get(folder_path)
+        owner = future is None
+        if owner:
+            future = folder_cache.in_flight[folder_path] = Future()
+
+    if not owner:
+        return future.result()  # Raises the resolving worker's error
 
     try:
-        # Build the full server-relative URL
-        library = ctx.web.lists.get_by_title(library_name)
-        ctx.load(library, ["RootFolder"])
-        ctx.execute_query()
+        target_folder_url = resolve_folder(ctx, root_url, folder_path, logger, ensure_parent)
+    except Exception as e:
+        with folder_cache.lock:
+            del folder_cache.in_flight[folder_path]
+        future.set_exception(e)
+        raise
+
+    with folder_cache.lock:
+        folder_cache.urls[folder_path] = target_folder_url
+        del folder_cache.in_flight[folder_path]
+    future.set_result(target_folder_url)
+    return target_folder_url
+
 
-        root_folder_url = library.root_folder.serverRelativeUrl
-        target_folder_url = f"{root_folder_url}/{folder_path}"
+def resolve_folder(ctx, root_url, folder_path, logger, ensure_parent):
+    """Return the server-relative URL of a library folder, creating it if needed.
 
+    A missing folder's parent is made to exist first with ensure_parent(path),
+    then only this level is created.
+    """
+    target_folder_url = f"{root_url}/{folder_path}"
+    logger.debug(f"Ensuring folder exists: {folder_path}")
+
+    try:
         # Try to get the folder
         try:
             folder = ctx.web.get_folder_by_server_relative_url(target_folder_url)
@@ -335,32 +2316,285 @@ def ensure_folder_exists(ctx, library_name, folder_path, logger):
             # Folder doesn't exist, create it
             logger.info(f"Creating folder: {folder_path}")
 
-            # Create folders recursively
-            parts = folder_path.split('/')
-            current_path = root_folder_url
-
-            for part in parts:
-                current_path = f"{current_path}/{part}"
-                try:
-                    folder = ctx.web.get_folder_by_server_relative_url(current_path)
-                    ctx.load(folder)
-                    ctx.execute_query()
-                except Exception:
-                    # Create this folder level
-                    parent_path = '/'.join(current_path.split('/')[:-1])
-                    parent_folder = ctx.web.get_folder_by_server_relative_url(parent_path)
-                    parent_folder.folders.add(part)
-                    ctx.execute_query()
-                    logger.debug(f"Created folder: {current_path}")
-
-            return target_folder_url
+        # Create the parent levels first, then this level
+        parent_path, _, name = folder_path.rpartition('/')
+        if parent_path:
+            ensure_parent(parent_path)
+        parent_folder = ctx.web.get_folder_by_server_relative_url(
+            f"{root_url}/{parent_path}" if parent_path else root_url)
+        parent_folder.folders.add(name)
+        ctx.execute_query()
+        logger.debug(f"Created folder: {target_folder_url}")
+        return target_folder_url
 
     except Exception as e:
         logger.error(f"Failed to create folder {folder_path}: {str(e)}")
         raise
 
 
-def upload_file(ctx, library_name, local_path, target_folder_url, logger):
+def get_library_root_url(ctx, library_name):
+    """Get the server-relative URL of the library root folder."""
+    library = ctx.web.lists.get_by_title(library_name)
+    ctx.load(library, ["RootFolder"])
+    ctx.execute_query()
+    return library.root_folder.properties['ServerRelativeUrl'].rstrip('/')
+
+
+def get_target_url(root_url, target_folder, file_name):
+    """Build the server-relative URL a manifest row will be uploaded to."""
+    folder = ''
+    if target_folder and not is_missing(target_folder):
+        folder = str(target_folder).strip().strip('/')
+    parts = [root_url, folder, str(file_name)] if folder else [root_url, str(file_name)]
+    return '/'.join(parts)
+
+
+def iter_library_items(ctx, library_name, select, expand=None, page_size=LISTING_PAGE_SIZE):
+    """Page through all items of a library with a single paged listing.
+
+    Yields the raw item dictionaries (OData nometadata JSON), one page at a time,
+    without keeping previous pages in memory.
+    """
+    request = ctx.pending_request()
+    list_title = library_name.replace("'", "''")
+    url = (f"{request.service_root_url}/web/lists/getbytitle('{list_title}')/items"
+           f"?$select={','.join(select)}&$top={page_size}")
+    if expand:
+        url += f"&$expand={','.join(expand)}"
+
+    while url:
+        options = RequestOptions(url)
+        options.set_header('Accept', 'application/json;odata=nometadata')
+        response = request.execute_request_direct(options)
+        data = response.json()
+        for item in data.get('value', []):
+            yield item
+        url = data.get('odata.nextLink')
+
+
+def fetch_library_index(ctx, library_name, logger):
+    """Build a local index of the files in a library from one paged listing.
+
+    Returns a dict keyed by lower-case server-relative URL (FileRef) with the
+    remote file size and last-modified time (UTC epoch seconds).
+    """
+    logger.info(f"Fetching remote file index from library: {library_name}")
+
+    index = {}
+    for item in iter_library_items(ctx, library_name,
+                                   ['FileRef', 'FSObjType', 'File/Length', 'File/TimeLastModified'],
+                                   expand=['File']):
+        if str(item.get('FSObjType')) == '1':
+            continue  # Folder
+
+        remote_file = item.get('File') or {}
+        modified = remote_file.get('TimeLastModified')
+        index[item['FileRef'].lower()] = {
+            'size': int(remote_file.get('Length') or 0),
+            'modified': datetime.fromisoformat(modified.replace('Z', '+00:00')).timestamp()
+            if modified else 0
+        }
+
+        if len(index) % 50000 == 0:
+            logger.info(f"  Indexed {len(index)} remote files...")
+
+    logger.info(f"Remote index contains {len(index)} file(s)")
+    return index
+
+
+def fetch_item_index(ctx, library_name, fields, logger):
+    """Index the list items of a library by file URL, with the current values of fields.
+
+    One paged listing; returns a dict keyed by lower-case server-relative URL
+    (FileRef) with the item ID and a dict of the field values.
+    """
+    logger.info(f"Fetching list items and current metadata from library: {library_name}")
+
+    index = {}
+    for item in iter_library_items(ctx, library_name, ['ID', 'FileRef', 'FSObjType'] + fields):
+        if str(item.get('FSObjType')) == '1':
+            continue  # Folder
+        index[item['FileRef'].lower()] = {'id': item['ID'],
+                                          'fields': {field: item.get(field) for field in fields}}
+
+        if len(index) % 50000 == 0:
+            logger.info(f"  Indexed {len(index)} list items...")
+
+    logger.info(f"Remote index contains {len(index)} file(s)")
+    return index
+
+
+def get_list_properties(ctx, library_name):
+    """Return the library Id and list item entity type name (needed to update its items)."""
+    names = ['Id', 'ListItemEntityTypeFullName']
+    library = ctx.web.lists.get_by_title(library_name)
+    ctx.load(library, names)
+    ctx.execute_query()
+    return {name: library.properties[name] for name in names}
+
+
+def get_site_utc_offsets(ctx, logger):
+    """Offsets (minutes, local = UTC + offset) of the site time zone, standard and daylight.
+
+    Listings return DateTime values in UTC while the manifest holds site-local
+    times; a value matches if it is equal under either offset. Falls back to
+    UTC if the regional settings cannot be read.
+    """
+    request = ctx.pending_request()
+    options = RequestOptions(f"{request.service_root_url}/web/RegionalSettings/TimeZone"
+                             f"?$select=Information")
+    options.set_header('Accept', 'application/json;odata=verbose')
+    try:
+        info = request.execute_request_direct(options).json()['d']['Information']
+    except Exception as e:
+        logger.warning(f"Could not read the site time zone, comparing dates as UTC: {str(e)}")
+        return [0]
+    bias = int(info.get('Bias') or 0)
+    return sorted({-(bias + int(info.get('StandardBias') or 0)),
+                   -(bias + int(info.get('DaylightBias') or 0))})
+
+
+def fetch_drive_index(ctx, root_url, logger):
+    """Build a local index of the files in a library, with content hashes.
+
+    List items do not carry a content hash, so the library is read through
+    the drive delta feed of the SharePoint v2.0 API instead (same token, one
+    paged listing of the whole library). Returns a dict keyed by lower-case
+    server-relative URL with the remote file size and QuickXorHash (base64).
+    """
+    logger.info(f"Fetching remote file hashes from library: {root_url}")
+    request = ctx.pending_request()
+
+    def get_json(url):
+        options = RequestOptions(url)
+        options.set_header('Accept', 'application/json')
+        return request.execute_request_direct(options).json()
+
+    drives = get_json(f"{request.service_root_url}/v2.0/drives?$select=id,name,webUrl")
+    drive_id = None
+    for drive in drives.get('value', []):
+        if unquote(urlparse(drive.get('webUrl', '')).path).rstrip('/').lower() == root_url.lower():
+            drive_id = drive['id']
+    if drive_id is None:
+        raise ValueError(f"No drive found for library folder {root_url}")
+
+    # Parents are not guaranteed to come before their children, so paths are
+    # resolved once the whole feed has been read
+    folders = {}  # Item ID -> (name, parent ID); the root maps to None
+    files = []
+    url = (f"{request.service_root_url}/v2.0/drives/{drive_id}/root/delta"
+           f"?$select=id,name,size,file,folder,root,deleted,parentReference&$top={DRIVE_PAGE_SIZE}")
+    while url:
+        data = get_json(url)
+        for item in data.get('value', []):
+            if 'deleted' in item:
+                continue
+            parent_id = (item.get('parentReference') or {}).get('id')
+            if 'root' in item:
+                folders[item['id']] = None
+            elif 'folder' in item:
+                folders[item['id']] = (item['name'], parent_id)
+            elif 'file' in item:
+                hashes = item['file'].get('hashes') or {}
+                files.append((item['name'], parent_id, int(item.get('size') or 0),
+                              hashes.get('quickXorHash')))
+        url = data.get('@odata.nextLink')
+
+    folder_urls = {}
+
+    def folder_url(item_id):
+        if item_id not in folder_urls:
+            entry = folders.get(item_id)
+            folder_urls[item_id] = root_url if entry is None else f"{folder_url(entry[1])}/{entry[0]}"
+        return folder_urls[item_id]
+
+    index = {}
+    for name, parent_id, size, quick_xor in files:
+        index[f"{folder_url(parent_id)}/{name}".lower()] = {'size': size, 'quick_xor': quick_xor}
+
+    logger.info(f"Remote index contains {len(index)} file(s)")
+    return index
+
+
+def classify_row(remote_index, target_url, local_path):
+    """Classify a manifest row as 'new', 'changed' or 'unchanged' against the remote index."""
+    remote = remote_index.get(target_url.lower())
+    if remote is None:
+        return 'new'
+
+    try:
+        stat_info = os.stat(local_path)
+    except OSError:
+        return 'changed'  # Let the upload step report the missing file
+
+    # Unchanged when sizes match and the remote copy was written after the
+    # local file was last modified
+    if remote['size'] == stat_info.st_size and remote['modified'] >= int(stat_info.st_mtime):
+        return 'unchanged'
+    return 'changed'
+
+
+class UploadSessionStore:
+    """Persist chunked upload session state so large uploads can be resumed.
+
+    State is kept in a JSON file keyed by the target server-relative URL. Each
+    entry records the upload ID, the local file identity (path, size, mtime)
+    and the last offset confirmed by SharePoint.
+    """
+
+    def __init__(self, state_file):
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self._sessions = json.load(f)
+            except (OSError, ValueError):
+                self._sessions = {}
+
+    def _save(self):
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._sessions, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def get(self, target_url, identity):
+        """Return saved session for target_url if it belongs to the same local file."""
+        with self._lock:
+            session = self._sessions.get(target_url)
+            if session and session.get('identity') == identity:
+                return dict(session)
+            return None
+
+    def save(self, target_url, upload_id, identity, offset):
+        with self._lock:
+            self._sessions[target_url] = {
+                'upload_id': upload_id,
+                'identity': identity,
+                'offset': offset,
+                'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self._save()
+
+    def remove(self, target_url):
+        with self._lock:
+            if self._sessions.pop(target_url, None) is not None:
+                self._save()
+
+
+def get_file_identity(local_path):
+    """Identity of a local file used to match saved upload sessions."""
+    stat_info = os.stat(local_path)
+    return {
+        'path': os.path.abspath(local_path),
+        'size': stat_info.st_size,
+        'mtime': int(stat_info.st_mtime)
+    }
+
+
+def upload_file(ctx, library_name, local_path, target_folder_url, logger, session_store=None):
     """Upload a file to SharePoint (handles large files with chunked upload)."""
     file_size = os.path.getsize(local_path)
     file_name = os.path.basename(local_path)
@@ -376,12 +2610,14 @@ def upload_file(ctx, library_name, local_path, target_folder_url, logger):
             ctx.load(library, ["RootFolder"])
             ctx.execute_query()
             target_folder = library.root_folder
+            target_folder_url = target_folder.properties['ServerRelativeUrl']
 
         # Upload based on file size
         if file_size > LARGE_FILE_THRESHOLD:
             # Chunked upload for large files
             logger.info(f"Using chunked upload for large file: {file_name}")
-            uploaded_file = upload_large_file(ctx, target_folder, local_path, file_name, logger)
+            uploaded_file = upload_large_file(ctx, target_folder, target_folder_url, local_path,
+                                              file_name, logger, session_store)
         else:
             # Standard upload
             with open(local_path, 'rb') as f:
@@ -396,95 +2632,624 @@ def upload_file(ctx, library_name, local_path, target_folder_url, logger):
         raise
 
 
-def upload_large_file(ctx, target_folder, local_path, file_name, logger):
-    """Upload large file using chunked upload."""
+def copy_file(ctx, library_name, source_url, target_folder_url, file_name, logger):
+    """Create a file as a server-side copy of a file already uploaded to the same site."""
+    from office365.runtime.queries.service_operation import ServiceOperationQuery
+
+    if not target_folder_url:
+        target_folder_url = get_library_root_url(ctx, library_name)
+    target_url = f"{target_folder_url}/{file_name}"
+
+    logger.debug(f"Copying: {source_url} -> {target_url}")
+    source_file = ctx.web.get_file_by_server_relative_url(source_url)
+    ctx.add_query(ServiceOperationQuery(source_file, "CopyTo",
+                                        {"strNewUrl": target_url, "bOverWrite": True}))
+    ctx.execute_query()
+    return ctx.web.get_file_by_server_relative_url(target_url)
+
+
+def get_server_upload_offset(ctx, target_url, upload_id, logger):
+    """Query SharePoint for the confirmed offset of an upload session.
+
+    Returns the offset, or None if the session has expired or cannot be found.
+    """
+    try:
+        target_file = ctx.web.get_file_by_server_relative_url(target_url)
+        status = target_file.get_upload_status(upload_id)
+        ctx.execute_query()
+    except Exception as e:
+        logger.debug(f"Upload session {upload_id} not available: {str(e)}")
+        return None
+
+    # ExpectedContentRange has the form "<offset>-" (next byte expected)
+    content_range = status.properties.get('ExpectedContentRange') or ''
+    offset = content_range.split('-')[0].strip()
+    if not offset.isdigit():
+        return None
+    return int(offset)
+
+
+def upload_large_file(ctx, target_folder, target_folder_url, local_path, file_name, logger,
+                      session_store=None):
+    """Upload large file using a resumable chunked upload session.
+
+    The upload ID and confirmed offset are saved to the session store after
+    every chunk. On a retry or a later run, the server offset is queried and
+    the session continues from there; a fresh upload is started only if the
+    saved session has expired.
+    """
     file_size = os.path.getsize(local_path)
     chunk_count = (file_size // CHUNK_SIZE) + 1
+    target_url = f"{target_folder_url.rstrip('/')}/{file_name}"
+    identity = get_file_identity(local_path)
 
     logger.debug(f"File size: {file_size / 1024 / 1024:.2f} MB, Chunks: {chunk_count}")
 
-    with open(local_path, 'rb') as f:
-        # First chunk - create upload session
-        first_chunk = f.read(CHUNK_SIZE)
-        upload_result = target_folder.files.create_upload_session(
-            file_name, len(first_chunk)
-        ).execute_query()
-
-        # Upload remaining chunks
-        chunk_num = 1
-        while True:
-            chunk = f.read(CHUNK_SIZE)
-            if not chunk:
-                break
-
-            chunk_num += 1
-            logger.debug(f"Uploading chunk {chunk_num}/{chunk_count}")
+    # Try to resume a saved session for the same local file
+    upload_id = None
+    offset = 0
+    saved = session_store.get(target_url, identity) if session_store else None
+    if saved:
+        server_offset = get_server_upload_offset(ctx, target_url, saved['upload_id'], logger)
+        if server_offset:
+            upload_id = saved['upload_id']
+            offset = server_offset
+            logger.info(f"Resuming upload session at {offset / 1024 / 1024:.2f} MB: {file_name}")
+        else:
+            logger.info(f"Saved upload session expired, starting fresh upload: {file_name}")
+            session_store.remove(target_url)
 
-            upload_result = upload_result.continue_upload(chunk).execute_query()
+    if upload_id is None:
+        upload_id = str(uuid.uuid4())
+        target_folder.files.add(file_name, None, True)
+        ctx.execute_query()
 
-        # Finish upload
-        uploaded_file = upload_result.finish_upload().execute_query()
+    target_file = ctx.web.get_file_by_server_relative_url(target_url)
+    attempts = 0
 
-    return uploaded_file
+    with open(local_path, 'rb') as f:
+        while True:
+            f.seek(offset)
+            chunk = f.read(CHUNK_SIZE)
+            is_last = offset + len(chunk) >= file_size
+            chunk_num = offset // CHUNK_SIZE + 1
 
+            try:
+                logger.debug(f"Uploading chunk {chunk_num}/{chunk_count}")
+                if is_last:
+                    # Finish upload
+                    target_file.finish_upload(upload_id, offset, chunk)
+                    ctx.execute_query()
+                    break
 
-def update_file_metadata(ctx, file_item, metadata, column_mapping, logger):
-    """Update file metadata in SharePoint."""
-    if not column_mapping or not metadata:
+                if offset == 0:
+                    result = target_file.start_upload(upload_id, chunk)
+                else:
+                    result = target_file.continue_upload(upload_id, offset, chunk)
+                ctx.execute_query()
+                offset = int(result.value or offset + len(chunk))
+                attempts = 0
+
+                if session_store:
+                    session_store.save(target_url, upload_id, identity, offset)
+
+            except Exception as e:
+                attempts += 1
+                if attempts > CHUNK_RETRY_ATTEMPTS:
+                    raise
+                logger.warning(f"Chunk {chunk_num}/{chunk_count} failed ({str(e)}), "
+                               f"resuming from server offset (attempt {attempts}/{CHUNK_RETRY_ATTEMPTS})")
+                server_offset = get_server_upload_offset(ctx, target_url, upload_id, logger)
+                if server_offset is None:
+                    if offset > 0:
+                        # Session is gone, so everything after byte zero is lost
+                        raise
+                else:
+                    offset = server_offset
+
+    if session_store:
+        session_store.remove(target_url)
+
+    return target_file
+
+
+def update_file_metadata(ctx, file_item, update_data, logger):
+    """Update file metadata in SharePoint with pre-converted field values."""
+    if not update_data:
         return
 
-    update_data = {}
+    logger.debug(f"Updating metadata: {update_data}")
+    try:
+        for key, value in update_data.items():
+            file_item.set_property(key, value)
+        file_item.update()
+        ctx.execute_query()
+        logger.debug("Metadata updated successfully")
+    except Exception as e:
+        logger.warning(f"Failed to update metadata: {str(e)}")
+
+
+def process_row(ctx, library_name, idx, row, total_files, folder_cache, session_store, logger,
+                copy_from=None, root_url=None):
+    """Upload one manifest row and update its metadata. Returns the row result.
+
+    With copy_from (server-relative URL of identical content uploaded by an
+    earlier row), the file is created with a server-side copy instead.
+    root_url is the library root folder, when the caller already knows it.
+    """
+    file_name = row.get('FileName', '')
+    file_path = row.get('FilePath', '')
+    target_folder = row.get('TargetFolder', '')
+
+    # Build full local path
+    local_path = os.path.join(file_path, file_name)
+
+    result = {
+        'FileName': file_name,
+        'FilePath': file_path,
+        'TargetFolder': target_folder,
+        'Status': '',
+        'Message': '',
+        'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    logger.info(f"[{idx + 1}/{total_files or '?'}] Processing: {file_name}")
+
+    # Validate file exists
+    if not os.path.exists(local_path):
+        result['Status'] = 'ERROR'
+        result['Message'] = f'File not found: {local_path}'
+        logger.error(f"  File not found: {local_path}")
+        return result
+
+    # Do not upload rows whose metadata cannot be converted
+    if row.get(ROW_INVALID):
+        result['Status'] = 'ERROR'
+        result['Message'] = f"Invalid metadata: {'; '.join(row[ROW_INVALID])}"
+        logger.error(f"  {result['Message']}")
+        return result
 
-    for excel_col, sp_col in column_mapping.items():
-        if excel_col in metadata:
-            value = metadata[excel_col]
+    try:
+        file_size = os.path.getsize(local_path)
+
+        # Ensure target folder exists
+        started = time.perf_counter()
+        target_folder_url = ensure_folder_exists(ctx, library_name, target_folder, logger, folder_cache,
+                                                 root_url)
+        folder_done = time.perf_counter()
+
+        # Upload file (or copy the identical content already on the server)
+        if copy_from:
+            uploaded_file = copy_file(ctx, library_name, copy_from, target_folder_url,
+                                      os.path.basename(local_path), logger)
+        else:
+            uploaded_file = upload_file(ctx, library_name, local_path, target_folder_url, logger,
+                                        session_store)
+        transfer_done = time.perf_counter()
 
-            # Skip NaN/None values
-            if pd.isna(value):
-                continue
+        # Get list item for metadata update
+        ctx.load(uploaded_file, ["ListItemAllFields"])
+        ctx.execute_query()
+        file_item = uploaded_file.listItemAllFields
+        item_done = time.perf_counter()
+
+        # Update metadata (values were converted per chunk before upload)
+        update_file_metadata(ctx, file_item, row.get(ROW_METADATA), logger)
+        metadata_done = time.perf_counter()
+
+        transfer_seconds = transfer_done - folder_done
+        result['Status'] = 'SUCCESS'
+        result['FolderSeconds'] = round(folder_done - started, 3)
+        result['TransferSeconds'] = round(transfer_seconds, 3)
+        result['ItemSeconds'] = round(item_done - transfer_done, 3)
+        result['MetadataSeconds'] = round(metadata_done - item_done, 3)
+        if copy_from:
+            result['Message'] = f'Copied from {copy_from} (duplicate content)'
+            result['Bytes'] = 0
+            result['DedupBytes'] = file_size
+            logger.info(f"  Copied successfully: {file_name}")
+        else:
+            result['Message'] = 'Uploaded successfully'
+            result['Bytes'] = file_size
+            result['MBps'] = round(file_size / 1024 / 1024 / transfer_seconds, 2) if transfer_seconds else 0
+            logger.info(f"  Uploaded successfully: {file_name}")
 
-            # Convert value based on type
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            elif isinstance(value, (int, float)):
-                if pd.isna(value):
-                    continue
-                # Keep as-is for Number/Currency
+    except Exception as e:
+        result['Status'] = 'ERROR'
+        result['Message'] = str(e)
+        logger.error(f"  Error: {file_name}: {str(e)}")
+
+    return result
+
+
+def run_in_pool(items, worker_fn, workers):
+    """Run worker_fn over items with a thread pool, yielding results as they complete.
+
+    At most workers * 2 items are queued at a time, so large manifests are not
+    submitted to the pool all at once.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for item in items:
+            pending.add(executor.submit(worker_fn, item))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def get_upload_lanes(workers, lane_workers=None):
+    """Build the upload lanes and their concurrency.
+
+    By default a quarter of the workers each go to the large and medium lanes
+    and the rest to small files. With fewer workers than lanes, all files
+    share one lane. lane_workers overrides the per-lane worker counts.
+    """
+    if lane_workers:
+        return [{'name': name, 'min_size': min_size, 'workers': lane_workers[name]}
+                for name, min_size in UPLOAD_LANES if lane_workers.get(name)]
+
+    if workers < len(UPLOAD_LANES):
+        return [{'name': 'all', 'min_size': 0, 'workers': workers}]
+
+    large = max(1, workers // 4)
+    medium = max(1, workers // 4)
+    counts = {'large': large, 'medium': medium, 'small': workers - large - medium}
+    return [{'name': name, 'min_size': min_size, 'workers': counts[name]}
+            for name, min_size in UPLOAD_LANES]
+
+
+def parse_lane_workers(value):
+    """Parse --lanes, e.g. "large=1,medium=2,small=8"."""
+    names = [name for name, _ in UPLOAD_LANES]
+    lane_workers = {}
+    for part in value.split(','):
+        name, _, count = part.partition('=')
+        name = name.strip().lower()
+        if name not in names or not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(
+                f"invalid lane '{part}' (expected name=workers, names: {', '.join(names)})")
+        lane_workers[name] = int(count)
+    if 'small' not in lane_workers or not lane_workers['small']:
+        raise argparse.ArgumentTypeError("the small lane needs at least one worker")
+    return lane_workers
+
+
+def run_in_lanes(sized_items, worker_fn, lanes, lookahead=LANE_LOOKAHEAD_ROWS):
+    """Run worker_fn over (size, item) pairs in size lanes, yielding results as they complete.
+
+    Up to lookahead items are queued, each in the lane for its size. Every
+    lane runs its largest queued item first (to minimise the makespan) with
+    its own number of workers. A lane with nothing queued takes work from the
+    lanes of smaller files, never larger ones, so small files are not starved.
+    Free slots are filled after every item read, so a slow producer (a --scan
+    walk) never holds up dispatch while the look-ahead window fills.
+    """
+    lanes = sorted(lanes, key=lambda lane: lane['min_size'], reverse=True)
+    queues = {lane['name']: [] for lane in lanes}
+    in_flight = {lane['name']: 0 for lane in lanes}
+    order = itertools.count()  # Tie-breaker: equal sizes keep manifest order
+    sized_items = iter(sized_items)
+    queued = 0
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=sum(lane['workers'] for lane in lanes)) as executor:
+        pending = {}
+        while True:
+            # Fill free lane slots with the largest queued item, own lane first
+            for position, lane in enumerate(lanes):
+                while in_flight[lane['name']] < lane['workers']:
+                    source = next((other['name'] for other in lanes[position:]
+                                   if queues[other['name']]), None)
+                    if source is None:
+                        break
+                    _, _, item = heapq.heappop(queues[source])
+                    queued -= 1
+                    in_flight[lane['name']] += 1
+                    pending[executor.submit(worker_fn, item)] = lane['name']
+
+            # Read one more item while the look-ahead window has room; only
+            # wait for a worker once it is full or the input is exhausted
+            if not exhausted and queued < lookahead:
+                try:
+                    size, item = next(sized_items)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    lane = next(lane for lane in lanes if size >= lane['min_size'])
+                    heapq.heappush(queues[lane['name']], (-size, next(order), item))
+                    queued += 1
+                done, _ = wait(pending, timeout=0) if pending else (set(), None)
+            elif pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
             else:
-                value = str(value)
+                break
 
-            update_data[sp_col] = value
+            for future in done:
+                in_flight[pending.pop(future)] -= 1
+                yield future.result()
+
+
+class UploadMetrics:
+    """Thread-safe run metrics: totals, per-phase latencies and periodic samples.
+
+    Per-phase latencies are kept as count/sum/max plus a fixed-size reservoir
+    sample for percentiles, so memory does not grow with the manifest.
+    """
+
+    def __init__(self, scheduler, total_files=None, total_bytes=None, bandwidth=None):
+        self.scheduler = scheduler
+        self.bandwidth = bandwidth
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.started = time.monotonic()
+        self.started_at = datetime.now()
+        self.counts = {'SUCCESS': 0, 'ERROR': 0, 'SKIPPED': 0}
+        self.bytes = 0
+        self.phases = {name: {'count': 0, 'total': 0.0, 'max': 0.0, 'samples': []}
+                       for _, name in TIMING_PHASES}
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, result):
+        """Record one completed row result."""
+        with self._lock:
+            status = result.get('Status')
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.bytes += result.get('Bytes', 0)
+
+            for column, name in TIMING_PHASES:
+                if column not in result:
+                    continue
+                value = result[column]
+                phase = self.phases[name]
+                phase['count'] += 1
+                phase['total'] += value
+                phase['max'] = max(phase['max'], value)
+                if len(phase['samples']) < METRICS_RESERVOIR_SIZE:
+                    phase['samples'].append(value)
+                else:
+                    slot = random.randrange(phase['count'])
+                    if slot < METRICS_RESERVOIR_SIZE:
+                        phase['samples'][slot] = value
+
+    def snapshot(self):
+        """Take a point-in-time sample of throughput and scheduler state."""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            done = sum(self.counts.values())
+            sample = {
+                'elapsed_seconds': round(elapsed, 1),
+                'files_done': done,
+                'bytes_done': self.bytes,
+                'files_per_second': round(done / elapsed, 2) if elapsed else 0,
+                'mb_per_second': round(self.bytes / 1024 / 1024 / elapsed, 2) if elapsed else 0,
+                'in_flight': self.scheduler.in_flight,
+                'concurrency_limit': int(self.scheduler.limit),
+                'retries': self.scheduler.retry_count,
+                'throttled': self.scheduler.throttle_count,
+                'eta_seconds': None,
+            }
 
-    if update_data:
-        logger.debug(f"Updating metadata: {update_data}")
-        try:
-            for key, value in update_data.items():
-                file_item.set_property(key, value)
-            file_item.update()
-            ctx.execute_query()
-            logger.debug("Metadata updated successfully")
-        except Exception as e:
-            logger.warning(f"Failed to update metadata: {str(e)}")
+            # ETA by bytes when the pre-flight measured them, else by file count
+            if self.total_bytes and self.bytes:
+                sample['eta_seconds'] = round(elapsed * (self.total_bytes - self.bytes) / self.bytes)
+            elif self.total_files and done:
+                sample['eta_seconds'] = round(elapsed * (self.total_files - done) / done)
+
+            # Achieved (since the previous sample) versus permitted upload rate
+            if self.bandwidth:
+                sample['sent_mb_per_second'], sample['bandwidth_limit_mbps'] = self.bandwidth.sample()
+
+            self.samples.append(sample)
+            return sample
+
+    def progress_line(self):
+        sample = self.snapshot()
+        eta = format_duration(sample['eta_seconds']) if sample['eta_seconds'] is not None else '?'
+        bandwidth = ''
+        if self.bandwidth:
+            bandwidth = (f", sending {sample['sent_mb_per_second']} MB/s of "
+                         f"{self.bandwidth.format_limit(sample['bandwidth_limit_mbps'])}")
+        return (f"Progress: {sample['files_done']}/{self.total_files or '?'} files, "
+                f"{sample['files_per_second']} files/s, {sample['mb_per_second']} MB/s{bandwidth}, "
+                f"in-flight {sample['in_flight']}/{sample['concurrency_limit']}, "
+                f"retries {sample['retries']}, throttled {sample['throttled']}, ETA {eta}")
+
+    def phase_summary(self):
+        summary = {}
+        for name, phase in self.phases.items():
+            samples = sorted(phase['samples'])
+            summary[name] = {
+                'count': phase['count'],
+                'total_seconds': round(phase['total'], 3),
+                'mean_seconds': round(phase['total'] / phase['count'], 3) if phase['count'] else 0,
+                'p50_seconds': samples[len(samples) // 2] if samples else 0,
+                'p95_seconds': samples[int(len(samples) * 0.95)] if samples else 0,
+                'max_seconds': phase['max'],
+            }
+        return summary
+
+    def write(self, metrics_file, extra=None):
+        """Write the machine-readable metrics file (JSON)."""
+        final = self.snapshot()
+        data = {
+            'started': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'finished': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed_seconds': final['elapsed_seconds'],
+            'files': dict(self.counts),
+            'bytes': self.bytes,
+            'files_per_second': final['files_per_second'],
+            'mb_per_second': final['mb_per_second'],
+            'requests': {
+                'total': self.scheduler.request_count,
+                'retries': self.scheduler.retry_count,
+                'throttled': self.scheduler.throttle_count,
+            },
+            'phases': self.phase_summary(),
+            'samples': self.samples,
+        }
+        if self.bandwidth:
+            data['bandwidth'] = {
+                'bytes_sent': self.bandwidth.bytes_sent,
+                'wait_seconds': round(self.bandwidth.wait_seconds, 1),
+                'final_limit_mbps': self.bandwidth.limit_mbps,
+            }
+        if extra:
+            data.update(extra)
+        with open(metrics_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, default=str)
+        return metrics_file
+
+
+class ProgressMonitor:
+    """Background thread that logs a throughput summary periodically."""
+
+    def __init__(self, metrics, logger, interval=PROGRESS_INTERVAL_SECONDS):
+        self.metrics = metrics
+        self.logger = logger
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.logger.info(self.metrics.progress_line())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class RunJournal:
+    """Append-only JSONL journal of per-row upload results.
+
+    Every completed row is written and flushed immediately, so a crash loses
+    at most the row in progress. The journal is shared by all runs; each entry
+    carries the run ID, target site and target library.
+    """
+
+    def __init__(self, journal_file, run_id):
+        self.journal_file = Path(journal_file)
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self._handle = open(self.journal_file, 'a', encoding='utf-8')
+
+    @staticmethod
+    def row_key(site_url, library, file_path, file_name, target_folder):
+        """Key identifying a manifest row across runs."""
+        return (site_url.lower(), str(library).lower(), str(file_path), str(file_name),
+                str(target_folder))
+
+    def completed_keys(self, default_site):
+        """Return the keys of rows already uploaded successfully, for every target.
+
+        Entries written before runs had a target site are keyed to default_site.
+        """
+        completed = set()
+        for entry in self._iter_entries():
+            if entry.get('Status') == 'SUCCESS':
+                completed.add(self.row_key(entry.get('Site') or default_site,
+                                           entry.get('Library', ''), entry.get('FilePath', ''),
+                                           entry.get('FileName', ''), entry.get('TargetFolder', '')))
+        return completed
+
+    def record(self, target, result):
+        """Append one row result for an UploadTarget to the journal."""
+        entry = {'RunId': self.run_id, 'Site': target.site_url, 'Library': target.library}
+        entry.update(result)
+        line = json.dumps(entry, default=str, ensure_ascii=False)
+        with self._lock:
+            self._handle.write(line + '\n')
+            self._handle.flush()
+
+    def iter_run(self):
+        """Yield the entries of the current run in the order they were written."""
+        for entry in self._iter_entries():
+            if entry.get('RunId') == self.run_id:
+                yield entry
+
+    def iter_run_in_row_order(self):
+        """Yield the entries of the current run in manifest row order.
+
+        Rows complete out of order (workers, size lanes), so the file offsets of
+        this run's entries are sorted by row number and read back one by one.
+        """
+        offsets = []
+        with open(self.journal_file, 'rb') as f:
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if entry and entry.get('RunId') == self.run_id:
+                    offsets.append((entry.get('Row') or 0, offset))
+                offset = f.tell()
+
+        offsets.sort()
+        with open(self.journal_file, 'rb') as f:
+            for _, offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def _iter_entries(self):
+        if not self.journal_file.exists():
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Partial last line from an interrupted run
+                    continue
+
+    def close(self):
+        with self._lock:
+            self._handle.close()
 
 
-def generate_report(results, output_dir, logger):
-    """Generate upload report."""
+def generate_report(journal, output_dir, logger):
+    """Generate upload report by streaming the current run from the journal."""
     report_file = output_dir / f"upload_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-    df = pd.DataFrame(results)
+    # First pass - collect columns and widths without holding rows in memory
+    columns = []
+    widths = {}
+    for entry in journal.iter_run():
+        for key, value in entry.items():
+            if key in JOURNAL_ONLY_FIELDS:
+                continue
+            if key not in widths:
+                columns.append(key)
+                widths[key] = len(key)
+            widths[key] = max(widths[key], len(str(value)))
+
+    # Second pass - write rows with a write-only (streaming) workbook
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
 
-    # Write to Excel with formatting
-    with pd.ExcelWriter(report_file, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Upload Results', index=False)
+    wb = Workbook(write_only=True)
+    worksheet = wb.create_sheet('Upload Results')
+    for idx, col in enumerate(columns, 1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = min(widths[col] + 2, 50)
 
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Upload Results']
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).map(len).max(),
-                len(col)
-            ) + 2
-            worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
+    worksheet.append(columns)
+    for entry in journal.iter_run_in_row_order():
+        worksheet.append([entry.get(col, '') for col in columns])
+
+    wb.save(report_file)
 
     logger.info(f"Report saved to: {report_file}")
     return report_file
@@ -499,19 +3264,84 @@ def main():
 Examples:
     python sp_upload.py --library "Documents" --source files.xlsx
     python sp_upload.py --library "Finance Documents" --source files.xlsx --config config.json
+    python sp_upload.py --library "Documents" --source files.xlsx --resume
+    python sp_upload.py --library "Documents" --source files.xlsx --sync
+    python sp_upload.py --library "Documents" --source files.xlsx --dedup
+    python sp_upload.py --library "Documents" --source files.xlsx --preflight --dry-run
+    python sp_upload.py --library "Documents" --source files.xlsx --verify
+    python sp_upload.py --library "Documents" --source files.xlsx --mapping column_mapping.json --metadata-only
+    python sp_upload.py --library "Documents" --source files.xlsx --bandwidth-schedule bandwidth_schedule.json
+    python sp_upload.py --library "Documents" --scan pipeline_rules.json --mapping column_mapping.json
+    python sp_upload.py --source department_migration.xlsx --mapping column_mapping.json
         '''
     )
-    parser.add_argument('--library', '-l', required=True,
-                        help='Target SharePoint document library name')
-    parser.add_argument('--source', '-s', required=True,
-                        help='Path to Excel file containing file list')
+    parser.add_argument('--library', '-l',
+                        help='Target SharePoint document library name (default for rows '
+                             'without a TargetLibrary column value)')
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument('--source', '-s',
+                              help='Path to manifest containing file list (.xlsx, .csv or .parquet)')
+    source_group.add_argument('--scan', metavar='RULES',
+                              help='Scan the file server folders in a pipeline rules file (JSON) '
+                                   'and upload files as they are found, without a manifest')
     parser.add_argument('--config', '-c', default='config.json',
                         help='Path to config file (default: config.json)')
     parser.add_argument('--mapping', '-m',
                         help='Path to saved column mapping JSON file (skip interactive mapping)')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                        help=f'Maximum concurrent upload workers (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--lanes', type=parse_lane_workers,
+                        help='Workers per size lane, e.g. "large=1,medium=2,small=8" '
+                             '(default: derived from --workers)')
+    parser.add_argument('--sync', action='store_true',
+                        help='Upload only new and changed files; report unchanged files as SKIPPED')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Upload identical file content once per site and create the other '
+                             'copies with server-side copies')
+    parser.add_argument('--preflight', action='store_true',
+                        help='Validate all manifest files and estimate duration before uploading')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Run pre-flight validation only, do not upload')
+    parser.add_argument('--verify', action='store_true',
+                        help='Verify uploaded files (size and QuickXorHash) instead of uploading, '
+                             'and write a re-upload manifest for missing or different files')
+    parser.add_argument('--metadata-only', action='store_true',
+                        help='Re-apply manifest metadata to files already in SharePoint (changed '
+                             'fields only, in batches) without uploading')
+    parser.add_argument('--throughput-mbps', type=float, default=DEFAULT_THROUGHPUT_MBPS,
+                        help=f'Throughput model: aggregate upload bandwidth in MB/s '
+                             f'(default: {DEFAULT_THROUGHPUT_MBPS})')
+    parser.add_argument('--file-overhead', type=float, default=DEFAULT_FILE_OVERHEAD_SECONDS,
+                        help=f'Throughput model: request overhead per file in seconds '
+                             f'(default: {DEFAULT_FILE_OVERHEAD_SECONDS})')
+    parser.add_argument('--max-mbps', type=float,
+                        help='Cap the upload bandwidth of all workers together, in MB/s '
+                             '(default: unlimited)')
+    parser.add_argument('--bandwidth-schedule', metavar='SCHEDULE',
+                        help='Bandwidth caps by weekday and time of day (JSON); re-read when '
+                             'the file changes, so the cap can be changed during a run')
+    parser.add_argument('--token-cache', action='store_true',
+                        help=f'Keep the access token in an encrypted cache (output/{TOKEN_CACHE_FILE}) '
+                             f'so back-to-back runs skip authentication')
+    parser.add_argument('--refresh-schema', action='store_true',
+                        help=f'Fetch library columns from SharePoint even if the cached schema '
+                             f'(output/{SCHEMA_CACHE_FILE}) is unchanged')
+    parser.add_argument('--journal', '-j',
+                        help=f'Path to run journal file (default: output/{JOURNAL_FILE})')
+    parser.add_argument('--resume', '-r', action='store_true',
+                        help='Skip rows already uploaded successfully according to the journal')
 
     args = parser.parse_args()
 
+    if args.metadata_only and (args.verify or args.sync or args.dedup or args.resume or args.dry_run):
+        parser.error('--metadata-only cannot be combined with --verify, --sync, --dedup, --resume '
+                     'or --dry-run')
+    if args.scan and (args.dedup or args.preflight):
+        # Both need a full pass over the rows before uploading: with --scan
+        # that is another walk of the whole share before the first upload
+        parser.error('--dedup and --preflight cannot be combined with --scan (use --dry-run to '
+                     'validate a scan, or export a manifest with file_server_audit.py first)')
+
     # Setup paths
     script_dir = Path(__file__).parent.absolute()
     output_dir = script_dir / "output"
@@ -528,26 +3358,96 @@ Examples:
     logger.info("=" * 60)
     logger.info("SHAREPOINT UPLOAD TOOL")
     logger.info("=" * 60)
-    logger.info(f"Library: {args.library}")
-    logger.info(f"Source: {args.source}")
+    logger.info(f"Library: {args.library or '(per row, TargetLibrary)'}")
+    logger.info(f"Source: {args.source or f'scan ({args.scan})'}")
     logger.info(f"Config: {config_path}")
     logger.info(f"Log file: {log_file}")
+    lanes = get_upload_lanes(args.workers, args.lanes)
+    total_workers = sum(lane['workers'] for lane in lanes)
+    lane_summary = ', '.join(f"{lane['name']}: {lane['workers']}" for lane in lanes)
+    logger.info(f"Workers: {total_workers} ({lane_summary})")
+    if args.resume:
+        logger.info("Resume: skipping rows already uploaded")
+    if args.sync:
+        logger.info("Sync: uploading only new and changed files")
+    if args.dedup:
+        logger.info("Dedup: uploading duplicate content once, copying it server-side")
+    if args.verify:
+        logger.info("Verify: checking uploaded files against SharePoint, no upload")
+    if args.metadata_only:
+        logger.info("Metadata only: updating changed fields of existing files, no upload")
+    if args.max_mbps is not None:
+        logger.info(f"Bandwidth cap: {BandwidthLimiter.format_limit(args.max_mbps)}")
+    if args.bandwidth_schedule:
+        logger.info(f"Bandwidth schedule: {args.bandwidth_schedule}")
     logger.info("=" * 60)
 
+    # Open manifest or file server scan (rows are streamed during upload)
+    if args.scan:
+        manifest = open_scan_source(args.scan, logger)
+    else:
+        manifest = open_manifest(args.source, logger)
+
+    if not args.library and 'TargetLibrary' not in manifest.columns:
+        parser.error('--library is required unless the manifest has a TargetLibrary column')
+
+    # Import what this run needs later (metadata conversion, reports, hashing)
+    # in the background while authenticating and loading the library schema
+    if args.verify:
+        preload_modules(['numpy', 'openpyxl'])
+    elif get_metadata_columns(manifest.columns):
+        preload_modules(['pandas', 'openpyxl'])
+    else:
+        preload_modules(['openpyxl'])
+
     # Load config
     config = load_config(str(config_path))
 
-    # Connect to SharePoint
-    ctx = connect_to_sharepoint(config, logger)
+    # Upload bandwidth cap shared by all workers (fixed or scheduled)
+    bandwidth = None
+    if args.max_mbps is not None or args.bandwidth_schedule:
+        try:
+            bandwidth = BandwidthLimiter(logger, args.max_mbps, args.bandwidth_schedule)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read bandwidth schedule: {str(e)}")
+            sys.exit(1)
+        if args.bandwidth_schedule:
+            logger.info(f"Bandwidth limit: {bandwidth.format_limit(bandwidth.limit_mbps)} "
+                        f"(from schedule)")
+
+    # All SharePoint requests go through one throttling-aware scheduler, over a
+    # shared keep-alive connection pool, with a shared access token
+    scheduler = RequestScheduler(total_workers, logger)
+    session = create_http_session(total_workers + POOL_EXTRA_CONNECTIONS)
+    token_cache = TokenCache(config, logger,
+                             output_dir / TOKEN_CACHE_FILE if args.token_cache else None)
+    context_pool = ContextPool(config, scheduler, session, token_cache, bandwidth)
+    schema_cache = SchemaCache(output_dir / SCHEMA_CACHE_FILE, refresh=args.refresh_schema)
 
-    # Get library columns
-    sp_columns = get_library_columns(ctx, args.library, logger)
+    # Connect to SharePoint
+    ctx = connect_to_sharepoint(config, logger, context_pool)
+
+    # Verification mode - compare the manifest with what is in SharePoint
+    if args.verify:
+        targets = UploadTargets(context_pool, {}, args.library, logger, verify=True,
+                                schema_cache=schema_cache)
+        run_verification(manifest, targets, output_dir, logger)
+        print(f"\nVerification complete. Log: {log_file}")
+        return
 
-    # Read Excel file
-    df = read_excel_file(args.source, logger)
+    # Get library columns (of --library, or of the first row's target library);
+    # each target library compiles its own converters from the same mapping
+    if args.library:
+        schema_site, schema_library = config['site_url'], args.library
+    else:
+        first_row = next(iter(manifest), {})
+        schema_site = resolve_site_url(first_row.get('TargetSite'), config['site_url'])
+        schema_library = str(first_row.get('TargetLibrary') or '').strip()
+    sp_columns = get_library_columns(context_pool.get(schema_site), schema_library, logger,
+                                     schema_cache=schema_cache)
 
-    # Get metadata columns from Excel
-    excel_metadata_cols = get_metadata_columns(df)
+    # Get metadata columns from manifest
+    excel_metadata_cols = get_metadata_columns(manifest.columns)
 
     # Column mapping
     if args.mapping and os.path.exists(args.mapping):
@@ -566,93 +3466,259 @@ Examples:
         logger.info(f"Column mapping saved to: {mapping_file}")
     else:
         column_mapping = {}
-        logger.info("No metadata columns found in Excel file")
+        logger.info("No metadata columns found in manifest")
+
+    # Metadata-only mode - update changed fields of the files already uploaded
+    if args.metadata_only:
+        if not column_mapping:
+            logger.error("No mapped metadata columns to apply")
+            sys.exit(1)
+        targets = UploadTargets(context_pool, column_mapping, args.library, logger,
+                                schema_cache=schema_cache, metadata_only=True)
+        run_metadata_update(manifest, targets, context_pool, output_dir, logger)
+        print(f"\nMetadata update complete. Log: {log_file}")
+        return
+
+    # Route rows to their site and library; each target compiles metadata
+    # converters from its own field types when it is first used
+    targets = UploadTargets(context_pool, column_mapping, args.library, logger, sync=args.sync,
+                            schema_cache=schema_cache)
+
+    plan = None
+
+    # Pre-flight validation - before any data is sent
+    if args.preflight or args.dry_run:
+        plan = run_preflight(manifest, targets, args, output_dir, logger)
+        if args.dry_run:
+            print(f"\nDry run complete. Log: {log_file}")
+            return
 
     # Process files
     logger.info("-" * 60)
     logger.info("Starting file upload...")
     logger.info("-" * 60)
 
-    results = []
-    success_count = 0
-    error_count = 0
-    total_files = len(df)
+    session_store = UploadSessionStore(output_dir / UPLOAD_SESSIONS_FILE)
 
-    for idx, row in df.iterrows():
-        file_name = row.get('FileName', '')
-        file_path = row.get('FilePath', '')
-        target_folder = row.get('TargetFolder', '')
+    # Run journal
+    journal_file = Path(args.journal) if args.journal else output_dir / JOURNAL_FILE
+    journal = RunJournal(journal_file, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    logger.info(f"Journal: {journal_file}")
 
-        # Build full local path
-        local_path = os.path.join(file_path, file_name)
+    completed_keys = set()
+    if args.resume:
+        completed_keys = journal.completed_keys(config['site_url'])
+        logger.info(f"Resume: {len(completed_keys)} row(s) already uploaded")
 
+    success_count = 0
+    error_count = 0
+    skipped_count = 0
+    copied_count = 0
+    dedup_bytes = 0
+    first_upload_seconds = None
+    total_files = manifest.total_rows
+
+    # Live throughput metrics
+    metrics = UploadMetrics(scheduler, total_files, plan['bytes'] if plan else None, bandwidth)
+    monitor = ProgressMonitor(metrics, logger)
+
+    # Content deduplication - rows sharing content with an earlier row wait for
+    # it to be uploaded, then are copied server-side
+    content_keys = find_duplicate_content(manifest, targets, logger) if args.dedup else {}
+    content_sources = {}  # Content key -> server-relative URL once uploaded (None until then)
+    deferred_rows = []
+
+    # Report the target of each row when the manifest routes rows
+    routed = any(col in manifest.columns for col in ROUTING_COLUMNS)
+
+    def add_target_columns(result, target):
+        if routed:
+            result['TargetSite'] = target.site_url
+            result['TargetLibrary'] = target.library
+        return result
+
+    def record_skipped(idx, row, message, **extra):
+        nonlocal skipped_count
+        skipped_count += 1
         result = {
-            'FileName': file_name,
-            'FilePath': file_path,
-            'TargetFolder': target_folder,
-            'Status': '',
-            'Message': '',
+            'Row': idx + 1,
+            'FileName': row.get('FileName', ''),
+            'FilePath': row.get('FilePath', ''),
+            'TargetFolder': row.get('TargetFolder', ''),
+            'Status': 'SKIPPED',
+            'Message': message,
             'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
+        result.update(extra)
+        add_target_columns(result, row[ROW_TARGET])
+        journal.record(row[ROW_TARGET], result)
+        metrics.record(result)
+
+    def pending_rows():
+        """Yield rows to upload, journaling rows skipped by --resume or --sync."""
+        for idx, row in enumerate(iter_converted_rows(manifest, targets)):
+            target = row[ROW_TARGET]
+
+            # Skip rows completed in a previous run
+            if completed_keys and RunJournal.row_key(
+                    target.site_url, target.library, row.get('FilePath', ''),
+                    row.get('FileName', ''), row.get('TargetFolder', '')) in completed_keys:
+                record_skipped(idx, row, 'Already uploaded (resume)')
+                continue
 
-        logger.info(f"[{idx + 1}/{total_files}] Processing: {file_name}")
+            change = None
+            if target.remote_index is not None:
+                change = classify_row(
+                    target.remote_index,
+                    get_target_url(target.root_url, row.get('TargetFolder', ''),
+                                   row.get('FileName', '')),
+                    os.path.join(row.get('FilePath', ''), row.get('FileName', '')))
+                if change == 'unchanged':
+                    record_skipped(idx, row, 'Unchanged (sync)', Change=change)
+                    continue
 
-        # Validate file exists
-        if not os.path.exists(local_path):
-            result['Status'] = 'ERROR'
-            result['Message'] = f'File not found: {local_path}'
-            logger.error(f"  File not found: {local_path}")
-            error_count += 1
-            results.append(result)
-            continue
+            if content_keys and not target.error:
+                content_key = content_keys.get((target.site_url.lower(), get_local_path_key(row)))
+                if content_key in content_sources:
+                    deferred_rows.append((idx, row, change, content_key))
+                    continue
+                if content_key:
+                    content_sources[content_key] = None
+                    row[ROW_CONTENT] = content_key
+            yield idx, row, change
 
+    def sized_row(item):
+        idx, row, change = item
         try:
-            # Ensure target folder exists
-            target_folder_url = ensure_folder_exists(ctx, args.library, target_folder, logger)
-
-            # Upload file
-            uploaded_file = upload_file(ctx, args.library, local_path, target_folder_url, logger)
-
-            # Get list item for metadata update
-            ctx.load(uploaded_file, ["ListItemAllFields"])
-            ctx.execute_query()
-            file_item = uploaded_file.listItemAllFields
+            size = os.path.getsize(os.path.join(row.get('FilePath', ''), row.get('FileName', '')))
+        except OSError:
+            size = 0  # Reported as missing by process_row
+        return size, item
+
+    def upload_row(item):
+        idx, row, change = item
+        target = row[ROW_TARGET]
+        if target.error:
+            result = {
+                'FileName': row.get('FileName', ''),
+                'FilePath': row.get('FilePath', ''),
+                'TargetFolder': row.get('TargetFolder', ''),
+                'Status': 'ERROR',
+                'Message': f"Target library not available: {target}: {target.error}",
+                'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+        else:
+            ctx = context_pool.get(target.site_url)
+            copy_from = row.get(ROW_COPY_FROM)
+            if copy_from:
+                # The copy starts with the source's field values: clear mapped columns
+                # this row leaves empty
+                metadata = dict.fromkeys(sp_col for _, sp_col, _, _ in target.converters)
+                metadata.update(row[ROW_METADATA])
+                row[ROW_METADATA] = metadata
+            result = process_row(ctx, target.library, idx, row, total_files,
+                                 target.folder_cache, session_store, logger, copy_from,
+                                 target.root_url)
+            if row.get(ROW_CONTENT) and result['Status'] == 'SUCCESS':
+                content_sources[row[ROW_CONTENT]] = get_target_url(
+                    target.root_url, row.get('TargetFolder', ''), row.get('FileName', ''))
+        result['Row'] = idx + 1
+        if change:
+            result['Change'] = change
+        return add_target_columns(result, target), target
+
+    monitor.start()
+    sized_rows = run_in_pool(pending_rows(), sized_row, PREFLIGHT_WORKERS)
+    for result, target in run_in_lanes(sized_rows, upload_row, lanes):
+        if result['Status'] == 'SUCCESS':
+            success_count += 1
+            if first_upload_seconds is None:
+                first_upload_seconds = round(time.monotonic() - STARTED, 2)
+                logger.info(f"Time to first upload: {first_upload_seconds}s")
+        else:
+            error_count += 1
+        journal.record(target, result)
+        metrics.record(result)
 
-            # Get metadata from row
-            metadata = {col: row.get(col) for col in excel_metadata_cols}
+    # Duplicates - copy from the uploaded content, or upload them after all if
+    # that upload failed
+    if deferred_rows:
+        logger.info(f"Creating {len(deferred_rows)} duplicate(s) with server-side copies...")
 
-            # Update metadata
-            update_file_metadata(ctx, file_item, metadata, column_mapping, logger)
+    def copy_items():
+        for idx, row, change, content_key in deferred_rows:
+            row[ROW_COPY_FROM] = content_sources[content_key]
+            yield idx, row, change
 
-            result['Status'] = 'SUCCESS'
-            result['Message'] = 'Uploaded successfully'
+    for result, target in run_in_pool(copy_items(), upload_row, total_workers):
+        if result['Status'] == 'SUCCESS':
             success_count += 1
-            logger.info(f"  Uploaded successfully")
-
-        except Exception as e:
-            result['Status'] = 'ERROR'
-            result['Message'] = str(e)
+            if result.get('DedupBytes') is not None:
+                copied_count += 1
+                dedup_bytes += result['DedupBytes']
+        else:
             error_count += 1
-            logger.error(f"  Error: {str(e)}")
-
-        results.append(result)
+        journal.record(target, result)
+        metrics.record(result)
+    monitor.stop()
 
     # Summary
     logger.info("=" * 60)
     logger.info("UPLOAD COMPLETE")
     logger.info("=" * 60)
-    logger.info(f"Total files: {total_files}")
+    logger.info(f"Total files: {success_count + error_count + skipped_count}")
     logger.info(f"Successful: {success_count}")
     logger.info(f"Errors: {error_count}")
+    if skipped_count:
+        logger.info(f"Skipped: {skipped_count}")
+    if args.dedup:
+        logger.info(f"Copied server-side: {copied_count} "
+                    f"({dedup_bytes / 1024 / 1024:.1f} MB not uploaded)")
+    logger.info(f"Requests: {scheduler.request_count} "
+                f"(retries: {scheduler.retry_count}, throttled: {scheduler.throttle_count})")
+    connections, pooled_requests = get_connection_stats(session)
+    if pooled_requests:
+        logger.info(f"Connections: {connections} opened for {pooled_requests} requests "
+                    f"(reuse: {100 * (1 - connections / pooled_requests):.1f}%)")
+    logger.info(f"Access tokens acquired: {context_pool.tokens_acquired}")
+    if bandwidth:
+        logger.info(f"Bandwidth: {bandwidth.bytes_sent / 1024 / 1024:.1f} MB sent, "
+                    f"{bandwidth.wait_seconds:.0f} worker-seconds waiting for the cap "
+                    f"(cap now {bandwidth.format_limit(bandwidth.limit_mbps)})")
+    if len(targets) > 1:
+        logger.info(f"Target libraries: {len(targets)}")
+    logger.info(metrics.progress_line())
+    for name, phase in metrics.phase_summary().items():
+        logger.info(f"  {name}: mean {phase['mean_seconds']}s, p95 {phase['p95_seconds']}s, "
+                    f"max {phase['max_seconds']}s")
     logger.info("=" * 60)
 
     # Generate report
-    report_file = generate_report(results, output_dir, logger)
+    report_file = generate_report(journal, output_dir, logger)
+    journal.close()
+
+    # Machine-readable metrics for comparing runs
+    metrics_file = metrics.write(output_dir / f"upload_metrics_{journal.run_id}.json", {
+        'run_id': journal.run_id,
+        'library': args.library,
+        'targets': [str(target) for target in targets],
+        'source': str(args.source or args.scan),
+        'workers': total_workers,
+        'lanes': lanes,
+        'connections': {'opened': connections, 'requests': pooled_requests},
+        'tokens_acquired': context_pool.tokens_acquired,
+        'time_to_first_upload_seconds': first_upload_seconds,
+        'dedup': {'copies': copied_count, 'bytes_not_uploaded': dedup_bytes},
+    })
+    logger.info(f"Metrics saved to: {metrics_file}")
 
     print(f"\nUpload complete!")
     print(f"  Success: {success_count}")
     print(f"  Errors: {error_count}")
+    if skipped_count:
+        print(f"  Skipped: {skipped_count}")
     print(f"  Report: {report_file}")
+    print(f"  Metrics: {metrics_file}")
     print(f"  Log: {log_file}")
 
 